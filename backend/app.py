@@ -1,16 +1,94 @@
 
-from flask import Flask, request, jsonify
+import gzip
+import logging
+import os
+
+from flask import Flask, Response, request, jsonify
 from flask_cors import CORS
 from used_car_evaluator.scraper import scrape_listings
 from used_car_evaluator.cleaner import clean_data
-from used_car_evaluator.analyzer import analyze_listing
+from used_car_evaluator.analyzer import analyze_listing, ENGINES
+from used_car_evaluator.sketch import SegmentSketches
+from used_car_evaluator.cache import AnalysisCache, body_version
+from used_car_evaluator.dedup import normalize_title
+from used_car_evaluator.store import LISTING_STORE, ListingStore
+from used_car_evaluator.crawler import CRAWL_QUEUE, WorkQueue
+from used_car_evaluator.streaming import StreamAnalysis, read_header
+from used_car_evaluator import metrics, wire
+
+logging.basicConfig(level=os.environ.get("LOG_LEVEL", "INFO").upper(), format="[%(levelname)s] %(name)s: %(message)s")
 
 app = Flask(__name__)
-CORS(app)
+CORS(app, expose_headers=list(wire.PAGINATION_HEADERS))
+
+# Price distribution per make/model/year/fuel of every listing scraped so far
+market_sketches = SegmentSketches()
+
+# Analysis results keyed on input car and pool version
+analysis_cache = AnalysisCache()
+
+# Recent scrape results, so the pages of a paginated scrape don't each re-scrape
+scrape_cache = AnalysisCache(maxsize=32, ttl=300)
+
+# Market-wide listings kept fresh by the crawler, used when /api/analyze isn't sent listings
+LISTING_STORE_PATH = os.environ.get("LISTING_STORE", LISTING_STORE)
+CRAWL_QUEUE_PATH = os.environ.get("CRAWL_QUEUE", CRAWL_QUEUE)
+STORE_MAX_AGE = float(os.environ.get("STORE_MAX_AGE_HOURS", "72")) * 3600
+crawl_state = {}
+
+def stored_pool(input_car):
+    """
+    (version, load) for the crawled listings of the input car, or None if there are none.
+    load() reads the listings, so a cached analysis never has to. Also bumps the car's
+    segment in the crawl queue.
+    """
+    if not os.path.exists(LISTING_STORE_PATH):
+        return None
+    if "store" not in crawl_state:
+        crawl_state["store"] = ListingStore(LISTING_STORE_PATH)
+    if "queue" not in crawl_state and os.path.exists(CRAWL_QUEUE_PATH):
+        crawl_state["queue"] = WorkQueue(CRAWL_QUEUE_PATH)
+    if "queue" in crawl_state:
+        crawl_state["queue"].bump(input_car.get("title"))
+    store = crawl_state["store"]
+    version = store.version_for(input_car, max_age=STORE_MAX_AGE)
+    if version is None:
+        return None
+    return version, lambda: store.listings_for(input_car, max_age=STORE_MAX_AGE)
+
+def analysis_pool(data, body, input_car):
+    """
+    (version, pool_id, load) for the pool an /api/analyze request is scored against, or
+    None if there is none. Listings sent in the body are versioned by the caller's
+    pool_version (and grouped by its pool_id) or else by a hash of the raw body; the
+    crawled pool by the store. Neither hashes the listings themselves.
+    """
+    listings = data.get('listings')
+    if listings:
+        version = data.get('pool_version')
+        return (f"client:{version}" if version else body_version(body)), data.get('pool_id'), lambda: listings
+    stored = stored_pool(input_car)
+    if stored is None:
+        return None
+    version, load = stored
+    return version, "store:" + normalize_title(input_car.get('title')), load
+
+def read_body():
+    """The request body, sent as JSON or MessagePack and optionally compressed. Raises ValueError."""
+    return wire.decode(request.get_data(), request.content_type, request.headers.get('Content-Encoding'))
+
+def respond(payload, headers=None):
+    """A response encoded for the client's Accept and Accept-Encoding headers."""
+    body, wire_headers = wire.encode(payload, request.headers.get('Accept'), request.headers.get('Accept-Encoding'))
+    return Response(body, headers={**wire_headers, **(headers or {})})
 
 @app.route('/api/scrape', methods=['POST'])
 def scrape():
-    data = request.get_json()
+    try:
+        data = read_body()
+        fields, pagination = wire.request_options(request.args)
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
     if not data:
         return jsonify({'error': 'Missing JSON body'}), 400
     make = data.get('make')
@@ -19,21 +97,80 @@ def scrape():
     pages = data.get('pages', 3)
     if not (make and model):
         return jsonify({'error': 'Missing make or model'}), 400
-    listings = scrape_listings(make, model, price_to=price_to, pages=pages)
-    cleaned = clean_data(listings)
-    return jsonify(cleaned)
+    key = ("scrape", make.lower(), model.lower(), price_to, pages)
+    cleaned = scrape_cache.get(key) if pagination else None
+    if cleaned is None:
+        with metrics.timer("api_scrape"):
+            listings = scrape_listings(make, model, price_to=price_to, pages=pages)
+            cleaned = clean_data(listings, sketches=market_sketches)
+        if pagination:
+            scrape_cache.put(key, cleaned)
+    headers = None
+    if pagination:
+        cleaned, headers = wire.paginate(cleaned, *pagination)
+    return respond([wire.project(car, fields) for car in cleaned], headers)
 
 @app.route('/api/analyze', methods=['POST'])
 def analyze():
-    data = request.get_json()
+    try:
+        data = read_body()
+        fields, _ = wire.request_options(request.args)
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
     if not data:
         return jsonify({'error': 'Missing JSON body'}), 400
     input_car = data.get('input_car')
-    listings = data.get('listings')
-    if not (input_car and listings):
+    if not input_car:
         return jsonify({'error': 'Missing input_car or listings'}), 400
-    result = analyze_listing(input_car, listings)
-    return jsonify(result)
+    pool = analysis_pool(data, request.get_data(), input_car)
+    if pool is None:
+        return jsonify({'error': 'Missing listings, and none crawled for this car'}), 400
+    engine = data.get('engine', 'rules')
+    if engine not in ENGINES:
+        return jsonify({'error': f"Unknown engine, expected one of: {', '.join(ENGINES)}"}), 400
+    version, pool_id, load = pool
+    with metrics.timer("api_analyze"):
+        result = analysis_cache.get_or_compute(
+            input_car, None, lambda: analyze_listing(input_car, load(), engine=engine),
+            engine=engine, version=version, pool_id=pool_id,
+        )
+    result = dict(result, market_percentiles=market_sketches.percentiles(input_car))
+    return respond(wire.project_analysis(result, fields))
+
+@app.route('/api/analyze/stream', methods=['POST'])
+def analyze_stream():
+    # NDJSON: a {"input_car": ..., "engine": ...} line, then one listing per line,
+    # cleaned and scored as they are read so the pool is never held in memory
+    try:
+        fields, _ = wire.request_options(request.args)
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+    encoding = request.headers.get('Content-Encoding', '').strip().lower()
+    if encoding not in ('', 'identity', 'gzip'):
+        return jsonify({'error': f"Unsupported Content-Encoding: {encoding}"}), 400
+    lines = iter(gzip.GzipFile(fileobj=request.stream) if encoding == 'gzip' else request.stream)
+    try:
+        header = read_header(lines)
+    except (ValueError, OSError) as e:
+        return jsonify({'error': str(e)}), 400
+    if header.get('engine', 'rules') != 'rules':
+        return jsonify({'error': 'Streamed analysis only supports the rules engine'}), 400
+    input_car = header['input_car']
+    with metrics.timer("api_analyze_stream"):
+        try:
+            result = StreamAnalysis(input_car).add_lines(lines).result()
+        except (OSError, EOFError) as e:
+            return jsonify({'error': f"Could not read request body: {e}"}), 400
+    result = dict(result, market_percentiles=market_sketches.percentiles(input_car))
+    return respond(wire.project_analysis(result, fields))
+
+@app.route('/api/cache/stats', methods=['GET'])
+def cache_stats():
+    return jsonify(analysis_cache.stats())
+
+@app.route('/metrics', methods=['GET'])
+def prometheus_metrics():
+    return Response(metrics.render(), content_type=metrics.CONTENT_TYPE)
 
 if __name__ == '__main__':
     app.run(debug=False, use_reloader=False)
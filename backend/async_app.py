@@ -0,0 +1,221 @@
+"""
+Async serving mode: the same API as app.py on Quart, with non-blocking handlers.
+
+    python async_app.py --port 5000
+    hypercorn async_app:app --bind 127.0.0.1:5000 --workers 2
+
+Scrapes run on the async Playwright API, so a slow marketplace only holds an open
+coroutine rather than a server thread. Scoring runs in a process pool (SCORING_WORKERS),
+whose workers send back the metrics they record, and cleaning on a single background
+thread that owns the market sketches. On a single CPU, or under the hypercorn CLI (whose
+workers are daemon processes that can't start children), scoring uses a thread pool instead.
+"""
+import asyncio
+import logging
+import multiprocessing
+import os
+import zlib
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+
+import click
+from hypercorn.asyncio import serve
+from hypercorn.config import Config
+from quart import Quart, Response, request, jsonify
+
+from app import analysis_cache, analysis_pool, market_sketches, scrape_cache
+from used_car_evaluator.async_scraper import scrape_listings_async
+from used_car_evaluator.cleaner import clean_data
+from used_car_evaluator.analyzer import analyze_listing, ENGINES
+from used_car_evaluator.streaming import LineSplitter, StreamAnalysis, read_header
+from used_car_evaluator import metrics, wire
+
+logger = logging.getLogger(__name__)
+
+app = Quart(__name__)
+
+SCORING_WORKERS = int(os.environ.get("SCORING_WORKERS", "0")) or None  # None: one per CPU
+SCRAPE_CONCURRENCY = int(os.environ.get("SCRAPE_CONCURRENCY", "4"))
+
+executors = {}
+
+def scoring_pool():
+    if "scoring" not in executors:
+        # A process pool only pays for its pickling with a second core to run on
+        if multiprocessing.current_process().daemon or (os.cpu_count() or 1) < 2:
+            executors["scoring"] = ThreadPoolExecutor(max_workers=SCORING_WORKERS, thread_name_prefix="score")
+        else:
+            # spawn, not fork: the server process has an event loop and threads running
+            executors["scoring"] = ProcessPoolExecutor(
+                max_workers=SCORING_WORKERS, mp_context=multiprocessing.get_context("spawn")
+            )
+    return executors["scoring"]
+
+async def score(input_car, listings, engine):
+    """analyze_listing on the scoring pool, with the metrics a pool process records merged into ours."""
+    loop = asyncio.get_running_loop()
+    pool = scoring_pool()
+    if isinstance(pool, ThreadPoolExecutor):
+        return await loop.run_in_executor(pool, analyze_listing, input_car, listings, engine)
+    result, recorded = await loop.run_in_executor(pool, metrics.recorded, analyze_listing, input_car, listings, engine)
+    metrics.REGISTRY.merge(recorded)
+    return result
+
+def cleaning_thread():
+    if "cleaning" not in executors:
+        executors["cleaning"] = ThreadPoolExecutor(max_workers=1, thread_name_prefix="clean")
+    return executors["cleaning"]
+
+@app.after_serving
+async def shutdown_executors():
+    for executor in executors.values():
+        executor.shutdown(wait=False, cancel_futures=True)
+    executors.clear()
+
+@app.after_request
+async def allow_cross_origin(response):
+    # Same open CORS policy as flask_cors' CORS(app) in app.py
+    response.headers["Access-Control-Allow-Origin"] = "*"
+    response.headers["Access-Control-Expose-Headers"] = ", ".join(wire.PAGINATION_HEADERS)
+    if request.method == "OPTIONS":
+        response.headers["Access-Control-Allow-Headers"] = request.headers.get("Access-Control-Request-Headers", "*")
+        response.headers["Access-Control-Allow-Methods"] = "GET, POST, OPTIONS"
+    return response
+
+async def read_body():
+    """The request body (JSON or MessagePack, optionally compressed), decoded off the event loop."""
+    body = await request.get_data()
+    return await asyncio.to_thread(wire.decode, body, request.content_type, request.headers.get('Content-Encoding'))
+
+async def respond(payload, headers=None):
+    """A response encoded for the client's Accept and Accept-Encoding headers, off the event loop."""
+    body, wire_headers = await asyncio.to_thread(
+        wire.encode, payload, request.headers.get('Accept'), request.headers.get('Accept-Encoding')
+    )
+    return Response(body, headers={**wire_headers, **(headers or {})})
+
+@app.route('/api/scrape', methods=['POST'])
+async def scrape():
+    try:
+        data = await read_body()
+        fields, pagination = wire.request_options(request.args)
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+    if not data:
+        return jsonify({'error': 'Missing JSON body'}), 400
+    make = data.get('make')
+    model = data.get('model')
+    price_to = data.get('price_to')
+    pages = data.get('pages', 3)
+    if not (make and model):
+        return jsonify({'error': 'Missing make or model'}), 400
+    key = ("scrape", make.lower(), model.lower(), price_to, pages)
+    cleaned = scrape_cache.get(key) if pagination else None
+    if cleaned is None:
+        loop = asyncio.get_running_loop()
+        with metrics.timer("api_scrape"):
+            listings = await scrape_listings_async(make, model, price_to=price_to, pages=pages, concurrency=SCRAPE_CONCURRENCY)
+            cleaned = await loop.run_in_executor(cleaning_thread(), clean_data, listings, market_sketches)
+        if pagination:
+            scrape_cache.put(key, cleaned)
+    headers = None
+    if pagination:
+        cleaned, headers = wire.paginate(cleaned, *pagination)
+    return await respond([wire.project(car, fields) for car in cleaned], headers)
+
+@app.route('/api/analyze', methods=['POST'])
+async def analyze():
+    try:
+        data = await read_body()
+        fields, _ = wire.request_options(request.args)
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+    if not data:
+        return jsonify({'error': 'Missing JSON body'}), 400
+    input_car = data.get('input_car')
+    if not input_car:
+        return jsonify({'error': 'Missing input_car or listings'}), 400
+    pool = await asyncio.to_thread(analysis_pool, data, await request.get_data(), input_car)
+    if pool is None:
+        return jsonify({'error': 'Missing listings, and none crawled for this car'}), 400
+    engine = data.get('engine', 'rules')
+    if engine not in ENGINES:
+        return jsonify({'error': f"Unknown engine, expected one of: {', '.join(ENGINES)}"}), 400
+    version, pool_id, load = pool
+    with metrics.timer("api_analyze"):
+        if pool_id is not None:
+            analysis_cache.observe_pool(pool_id, version)
+        key = analysis_cache.key(input_car, version, engine)
+        result = analysis_cache.get(key)
+        if result is None:
+            listings = await asyncio.to_thread(load)
+            result = await score(input_car, listings, engine)
+            analysis_cache.put(key, result)
+    result = dict(result, market_percentiles=market_sketches.percentiles(input_car))
+    return await respond(wire.project_analysis(result, fields))
+
+@app.route('/api/analyze/stream', methods=['POST'])
+async def analyze_stream():
+    # Same protocol as app.py; the body is read chunk by chunk and each chunk's
+    # complete lines are scored on a worker thread
+    try:
+        fields, _ = wire.request_options(request.args)
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+    encoding = request.headers.get('Content-Encoding', '').strip().lower()
+    if encoding not in ('', 'identity', 'gzip'):
+        return jsonify({'error': f"Unsupported Content-Encoding: {encoding}"}), 400
+    splitter = LineSplitter(gzipped=encoding == 'gzip')
+    analysis = None
+    try:
+        with metrics.timer("api_analyze_stream"):
+            async for chunk in request.body:
+                lines = splitter.feed(chunk)
+                if analysis is None:
+                    analysis, lines = start_stream_analysis(lines)
+                if analysis is not None and lines:
+                    await asyncio.to_thread(analysis.add_lines, lines)
+            lines = splitter.flush()
+            if analysis is None:
+                analysis, lines = start_stream_analysis(lines, final=True)
+            await asyncio.to_thread(analysis.add_lines, lines)
+            result = analysis.result()
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+    except zlib.error as e:
+        return jsonify({'error': f"Could not read request body: {e}"}), 400
+    result = dict(result, market_percentiles=market_sketches.percentiles(analysis.input_car))
+    return await respond(wire.project_analysis(result, fields))
+
+def start_stream_analysis(lines, final=False):
+    """
+    (StreamAnalysis, the lines after the header) once the header line has arrived,
+    (None, []) while it hasn't. Raises ValueError for a bad header, or none at all once final.
+    """
+    for i, line in enumerate(lines):
+        if line.strip():
+            header = read_header([line])
+            if header.get('engine', 'rules') != 'rules':
+                raise ValueError('Streamed analysis only supports the rules engine')
+            return StreamAnalysis(header['input_car']), lines[i + 1:]
+    if final:
+        raise ValueError("Empty stream")
+    return None, []
+
+@app.route('/api/cache/stats', methods=['GET'])
+async def cache_stats():
+    return jsonify(analysis_cache.stats())
+
+@app.route('/metrics', methods=['GET'])
+async def prometheus_metrics():
+    return Response(metrics.render(), content_type=metrics.CONTENT_TYPE)
+
+@click.command()
+@click.option('--host', default='127.0.0.1', show_default=True)
+@click.option('--port', default=5000, show_default=True)
+def main(host, port):
+    config = Config()
+    config.bind = [f"{host}:{port}"]
+    asyncio.run(serve(app, config))
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,42 @@
+"""
+Playwright stand-ins for running the scrapers against the mock marketplace without a
+browser: pages are fetched over urllib and parsed with BeautifulSoup.
+"""
+import urllib.error
+import urllib.request
+
+from playwright.sync_api import TimeoutError as PlaywrightTimeoutError
+
+from used_car_evaluator.async_scraper import HtmlPage
+
+
+class FakeResponse:
+    def __init__(self, status):
+        self.status = status
+
+
+def http_get(url):
+    try:
+        with urllib.request.urlopen(url) as r:
+            return r.status, r.read().decode("utf-8")
+    except urllib.error.HTTPError as e:
+        return e.code, e.read().decode("utf-8")
+
+
+class FakePage(HtmlPage):
+    """Just enough of a Playwright page, backed by urllib and BeautifulSoup."""
+
+    def __init__(self):
+        super().__init__("")
+
+    def goto(self, url, timeout=None):
+        status, html = http_get(url)
+        HtmlPage.__init__(self, html)
+        return FakeResponse(status)
+
+    def wait_for_selector(self, selector, timeout=None):
+        if self.query_selector(selector) is None:
+            raise PlaywrightTimeoutError(f"waiting for {selector}")
+
+    def wait_for_timeout(self, ms):
+        pass
@@ -0,0 +1,55 @@
+"""
+Bulk import throughput: rows per minute from a CSV or JSONL dump into a fresh listing store.
+
+    python -m benchmarks.import_throughput --rows 200000 --workers 1,2,4
+
+Writes a synthetic dump (a cli.py-style listings.csv of cleaned listings, or raw scraped
+listings as JSONL) to a temporary directory and imports it once per worker count.
+"""
+import json
+import os
+import tempfile
+import time
+
+import click
+import pandas as pd
+
+from used_car_evaluator import importer
+from used_car_evaluator.cleaner import clean_data
+from used_car_evaluator.store import ListingStore
+from used_car_evaluator.synthetic import generate_raw_listings
+
+
+def write_dump(path, fmt, rows, seed):
+    raw = generate_raw_listings(rows, seed)
+    if fmt == "csv":
+        pd.DataFrame(clean_data(raw)).to_csv(path, index=False)
+    else:
+        with open(path, "w", encoding="utf-8") as f:
+            for car in raw:
+                f.write(json.dumps(car, ensure_ascii=False) + "\n")
+
+
+@click.command()
+@click.option("--rows", default=200000, show_default=True)
+@click.option("--format", "fmt", type=click.Choice(["csv", "jsonl"]), default="csv", show_default=True)
+@click.option("--workers", default="1,2,4", show_default=True, help="Comma-separated worker counts.")
+@click.option("--chunk-size", default=importer.CHUNK_SIZE, show_default=True)
+@click.option("--seed", default=0, show_default=True)
+def main(rows, fmt, workers, chunk_size, seed):
+    with tempfile.TemporaryDirectory() as tmp:
+        dump = os.path.join(tmp, f"dump.{fmt}")
+        write_dump(dump, fmt, rows, seed)
+        click.echo(f"{rows} rows, {os.path.getsize(dump) / 1e6:.1f} MB of {fmt}, {os.cpu_count()} CPU(s)")
+        for n in (int(w) for w in workers.split(",")):
+            store_path = os.path.join(tmp, f"store-{n}.db")
+            store = ListingStore(store_path)
+            start = time.perf_counter()
+            counts = importer.import_file(store, dump, workers=n, chunk_size=chunk_size)
+            seconds = time.perf_counter() - start
+            store.close()
+            click.echo(f"  {n} worker(s): {seconds:7.2f}s  {60 * rows / seconds:12,.0f} rows/min  {counts}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,193 @@
+"""
+HTTP load test for the API servers: requests per second and latency percentiles.
+
+    python -m benchmarks.load_test --serve both --endpoint analyze --concurrency 32 --duration 15
+    python -m benchmarks.load_test --url http://127.0.0.1:5000 --endpoint analyze
+
+--serve starts the Flask server (app.py), the async server (async_app.py),
+or both one after the other, on a free local port. For --endpoint scrape a mock
+marketplace is started and the servers are pointed at it with MARKETPLACE_BASE_URL.
+analyze requests post a synthetic pool with input cars drawn from --distinct-cars
+variants, so most requests miss the analysis cache.
+"""
+import json
+import os
+import random
+import socket
+import subprocess
+import sys
+import threading
+import time
+import urllib.error
+import urllib.request
+from concurrent.futures import ThreadPoolExecutor
+
+import click
+
+from benchmarks.mock_marketplace import MarketplaceConfig, MockServer
+from used_car_evaluator.cleaner import clean_data
+from used_car_evaluator.synthetic import generate_input_car, generate_raw_listings
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+PERCENTILES = (0.5, 0.9, 0.99)
+
+SERVERS = {
+    "flask": lambda port: [sys.executable, "-c", f"import app; app.app.run(port={port}, threaded=True)"],
+    "async": lambda port: [sys.executable, "async_app.py", "--port", str(port)],
+}
+
+
+def free_port():
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+def start_server(kind, env=None, timeout=30):
+    """Starts a server subprocess and waits until it answers. Returns (process, base url)."""
+    port = free_port()
+    process = subprocess.Popen(
+        SERVERS[kind](port), cwd=BACKEND_DIR, env=dict(os.environ, LOG_LEVEL="WARNING", **(env or {})),
+        stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL,
+    )
+    url = f"http://127.0.0.1:{port}"
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        try:
+            urllib.request.urlopen(url + "/api/cache/stats", timeout=1).close()
+            return process, url
+        except OSError:
+            if process.poll() is not None:
+                raise click.ClickException(f"{kind} server exited with status {process.returncode}")
+            time.sleep(0.2)
+    process.terminate()
+    raise click.ClickException(f"{kind} server did not start within {timeout}s")
+
+
+def stop_server(process):
+    process.terminate()
+    try:
+        process.wait(timeout=10)
+    except subprocess.TimeoutExpired:
+        process.kill()
+
+
+def analyze_bodies(pool_size, distinct_cars, seed):
+    pool = clean_data(generate_raw_listings(pool_size, seed))
+    rng = random.Random(seed + 1)
+    return [json.dumps({"input_car": generate_input_car(rng), "listings": pool}).encode("utf-8")
+            for _ in range(distinct_cars)]
+
+
+def scrape_bodies(pages):
+    return [json.dumps({"make": "opel", "model": "corsa", "pages": pages}).encode("utf-8")]
+
+
+def post(url, body, timeout):
+    request = urllib.request.Request(url, data=body, headers={"Content-Type": "application/json"})
+    try:
+        with urllib.request.urlopen(request, timeout=timeout) as response:
+            response.read()
+            return response.status
+    except urllib.error.HTTPError as e:
+        return e.code
+    except OSError:
+        return "error"
+
+
+def run_load(url, bodies, concurrency, duration, timeout):
+    """Keeps `concurrency` requests in flight for `duration` seconds. Returns (latencies, statuses, seconds)."""
+    latencies = []
+    statuses = {}
+    lock = threading.Lock()
+    deadline = time.monotonic() + duration
+
+    def worker(n):
+        rng = random.Random(n)
+        while time.monotonic() < deadline:
+            start = time.perf_counter()
+            status = post(url, rng.choice(bodies), timeout)
+            elapsed = time.perf_counter() - start
+            with lock:
+                latencies.append(elapsed)
+                statuses[status] = statuses.get(status, 0) + 1
+
+    start = time.perf_counter()
+    with ThreadPoolExecutor(concurrency) as pool:
+        list(pool.map(worker, range(concurrency)))
+    return latencies, statuses, time.perf_counter() - start
+
+
+def percentile(sorted_values, q):
+    if not sorted_values:
+        return None
+    return sorted_values[min(len(sorted_values) - 1, int(q * len(sorted_values)))]
+
+
+def report(name, latencies, statuses, seconds):
+    latencies = sorted(latencies)
+    ok = statuses.get(200, 0)
+    result = {
+        "server": name,
+        "requests": len(latencies),
+        "ok": ok,
+        "statuses": {str(k): v for k, v in statuses.items()},
+        "seconds": round(seconds, 3),
+        "requests_per_second": round(ok / seconds, 2) if seconds else None,
+        **{f"p{round(q * 100)}_ms": round(1000 * percentile(latencies, q), 1) if latencies else None for q in PERCENTILES},
+    }
+    click.echo(f"{name:<8} {result['requests_per_second']:>9} req/s  "
+               + "  ".join(f"p{round(q * 100)}={result[f'p{round(q * 100)}_ms']}ms" for q in PERCENTILES)
+               + f"  statuses={result['statuses']}")
+    return result
+
+
+@click.command()
+@click.option("--url", default=None, help="Load an already running server instead of starting one.")
+@click.option("--serve", type=click.Choice(["flask", "async", "both"]), default="both", show_default=True)
+@click.option("--endpoint", type=click.Choice(["analyze", "scrape"]), default="analyze", show_default=True)
+@click.option("--concurrency", default=16, show_default=True, help="Requests kept in flight.")
+@click.option("--duration", default=10.0, show_default=True, help="Seconds of load per server.")
+@click.option("--timeout", default=120.0, show_default=True, help="Per-request timeout in seconds.")
+@click.option("--pool-size", default=2000, show_default=True, help="Listings posted with each analyze request.")
+@click.option("--distinct-cars", default=200, show_default=True, help="Distinct input cars across analyze requests.")
+@click.option("--pages", default=2, show_default=True, help="Results pages per scrape request.")
+@click.option("--seed", default=0, show_default=True)
+@click.option("--output", default=None, help="Also write the results as JSON to this file.")
+def main(url, serve, endpoint, concurrency, duration, timeout, pool_size, distinct_cars, pages, seed, output):
+    if endpoint == "analyze":
+        bodies = analyze_bodies(pool_size, distinct_cars, seed)
+    else:
+        bodies = scrape_bodies(pages)
+
+    market = None
+    env = {}
+    if endpoint == "scrape" and url is None:
+        market = MockServer(MarketplaceConfig(pages=pages, per_page=20)).start()
+        env["MARKETPLACE_BASE_URL"] = market.url
+
+    results = []
+    try:
+        targets = [("remote", url)] if url else [(kind, None) for kind in (("flask", "async") if serve == "both" else (serve,))]
+        for name, base in targets:
+            process = None
+            if base is None:
+                process, base = start_server(name, env)
+            try:
+                latencies, statuses, seconds = run_load(f"{base}/api/{endpoint}", bodies, concurrency, duration, timeout)
+            finally:
+                if process is not None:
+                    stop_server(process)
+            results.append(report(name, latencies, statuses, seconds))
+    finally:
+        if market is not None:
+            market.stop()
+
+    if output:
+        with open(output, "w", encoding="utf-8") as f:
+            json.dump({"endpoint": endpoint, "concurrency": concurrency, "results": results}, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,250 @@
+"""
+Local stand-in for the marketplace, for offline scraper load tests.
+
+    python -m benchmarks.mock_marketplace --port 8765 --pages 5 --detail-latency 200 --error-rate 0.02
+    MARKETPLACE_BASE_URL=http://127.0.0.1:8765 python cli.py
+
+Serves /auto-oglasi/pretraga results pages (article.classified cards and ul.pagination)
+and /auto-oglasi/<id>/<slug> detail pages built from the synthetic listing generator,
+with configurable latency, error rate, request rate limit, page counts and promoted
+ads repeated on every page.
+"""
+import html
+import json
+import random
+import threading
+import time
+import zlib
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlparse
+
+import click
+
+from used_car_evaluator.synthetic import generate_raw_listing
+
+
+class MarketplaceConfig:
+    def __init__(self, pages=5, per_page=25, results_latency=0.3, detail_latency=0.15,
+                 jitter=0.5, error_rate=0.0, max_rps=None, seed=0, promoted=0):
+        self.pages = pages
+        self.per_page = per_page
+        self.results_latency = results_latency  # seconds
+        self.detail_latency = detail_latency    # seconds
+        self.jitter = jitter                    # +/- fraction of the latency
+        self.error_rate = error_rate            # fraction of requests answered with 503
+        self.max_rps = max_rps                  # requests per second before answering 429
+        self.seed = seed
+        self.promoted = promoted                # page 1 ads repeated at the top of every page
+
+
+class MockMarketplace:
+    """The mock site: page rendering, fault injection and request statistics."""
+
+    def __init__(self, config):
+        self.config = config
+        self.lock = threading.Lock()
+        self.ads = {}
+        self.rng = random.Random(config.seed)
+        self.requests = {"results": 0, "detail": 0}
+        self.errors = 0
+        self.throttled = 0
+        self.window_start = time.monotonic()
+        self.window_count = 0
+
+    def listings_for(self, brand, model, page):
+        ads = []
+        segment = 10_000_000 * (1 + zlib.crc32(f"{brand}/{model}".encode()) % 90)
+        for i in range(self.config.per_page):
+            ad_id = segment + page * 1000 + i
+            rng = random.Random(f"{self.config.seed}|{brand}|{model}|{page}|{i}")
+            listing = generate_raw_listing(rng, ad_id)
+            variant = listing["title"].split(" ", 2)[-1]
+            listing["title"] = f"{brand.capitalize()} {model.capitalize()} {variant}"
+            listing["path"] = f"/auto-oglasi/{ad_id}/{brand}-{model}".replace(" ", "-")
+            ads.append(listing)
+            with self.lock:
+                self.ads[str(ad_id)] = listing
+        return ads
+
+    def admit(self, kind):
+        """Decides how to answer a request: 200, 429 (over the rate limit) or 503 (injected error)."""
+        with self.lock:
+            self.requests[kind] += 1
+            if self.config.max_rps:
+                now = time.monotonic()
+                if now - self.window_start >= 1:
+                    self.window_start = now
+                    self.window_count = 0
+                self.window_count += 1
+                if self.window_count > self.config.max_rps:
+                    self.throttled += 1
+                    return 429
+            if self.rng.random() < self.config.error_rate:
+                self.errors += 1
+                return 503
+        return 200
+
+    def delay(self, latency):
+        with self.lock:
+            factor = 1 + self.rng.uniform(-self.config.jitter, self.config.jitter)
+        time.sleep(max(0.0, latency * factor))
+
+    def render_results(self, brand, model, page):
+        cards = []
+        ads = self.listings_for(brand, model, page)
+        if page > 1 and self.config.promoted:
+            ads = self.listings_for(brand, model, 1)[:self.config.promoted] + ads
+        for ad in ads:
+            year = html.escape(ad["year"] or "")
+            cards.append(f"""
+<article class="classified">
+  <a class="ga-title" href="{html.escape(ad['path'])}">{html.escape(ad['title'])}</a>
+  <div class="subtitle">{html.escape(ad['title'].split(' ', 2)[-1])} | {html.escape(ad['transmission'])}</div>
+  <div class="top">{year}</div>
+  <div class="top">{html.escape(ad['mileage'])}</div>
+  <div class="city">{html.escape(ad['city'])}</div>
+  <span>{html.escape(ad['price'])}</span>
+</article>""")
+        pagination = "".join(
+            f'<li><a href="?brand={brand}&amp;model[]={model}&amp;page={n}">{n}</a></li>'
+            for n in range(1, self.config.pages + 1)
+        )
+        return f"""<!DOCTYPE html>
+<html><head><meta charset="utf-8"><title>Pretraga</title></head>
+<body>{''.join(cards)}
+<ul class="pagination">{pagination}</ul>
+</body></html>"""
+
+    def render_detail(self, ad):
+        specs = [
+            ("Gorivo", ad["fuel_type"]),
+            ("Kubikaža", ad["engine_size"]),
+            ("Menjač", ad["transmission"]),
+            ("Karoserija", ad["body_type"]),
+            ("Snaga", ad["power"]),
+            ("Boja", ad["color"]),
+            ("Broj vrata", ad["doors"]),
+            ("Broj sedišta", ad["seats"]),
+        ]
+        rows = "".join(f"<dt>{html.escape(k)}</dt><dd>{html.escape(v or '')}</dd>" for k, v in specs)
+        return f"""<!DOCTYPE html>
+<html><head><meta charset="utf-8"><title>{html.escape(ad['title'])}</title></head>
+<body>
+<h1>{html.escape(ad['title'])}</h1>
+<dl class="specifications">{rows}</dl>
+<div class="seller-info">{html.escape(ad['seller_info'].strip())}</div>
+<div class="description">{html.escape(ad['description'])}</div>
+</body></html>"""
+
+    def stats(self):
+        with self.lock:
+            return {
+                "requests": dict(self.requests),
+                "errors": self.errors,
+                "throttled": self.throttled,
+            }
+
+
+def make_handler(market):
+    class Handler(BaseHTTPRequestHandler):
+        def log_message(self, format, *args):
+            pass
+
+        def send_page(self, status, body, content_type="text/html; charset=utf-8"):
+            data = body.encode("utf-8")
+            self.send_response(status)
+            self.send_header("Content-Type", content_type)
+            self.send_header("Content-Length", str(len(data)))
+            self.end_headers()
+            self.wfile.write(data)
+
+        def do_GET(self):
+            url = urlparse(self.path)
+            parts = [p for p in url.path.split("/") if p]
+            if url.path == "/__stats":
+                return self.send_page(200, json.dumps(market.stats()), "application/json")
+            if parts[:2] == ["auto-oglasi", "pretraga"]:
+                kind = "results"
+                latency = market.config.results_latency
+            elif len(parts) >= 2 and parts[0] == "auto-oglasi" and parts[1] in market.ads:
+                kind = "detail"
+                latency = market.config.detail_latency
+            else:
+                return self.send_page(404, "<html><body>Not found</body></html>")
+
+            status = market.admit(kind)
+            market.delay(latency)
+            if status != 200:
+                return self.send_page(status, "<html><body>Try again later</body></html>")
+            if kind == "detail":
+                return self.send_page(200, market.render_detail(market.ads[parts[1]]))
+
+            query = parse_qs(url.query)
+            brand = query.get("brand", ["opel"])[0]
+            model = query.get("model[]", ["corsa"])[0]
+            try:
+                page = int(query.get("page", ["1"])[0])
+            except ValueError:
+                page = 1
+            if page > market.config.pages:
+                return self.send_page(200, "<html><body><p>Nema rezultata</p></body></html>")
+            return self.send_page(200, market.render_results(brand, model, page))
+
+    return Handler
+
+
+class MockServer:
+    """Runs a MockMarketplace on a background thread."""
+
+    def __init__(self, config=None, host="127.0.0.1", port=0):
+        self.market = MockMarketplace(config or MarketplaceConfig())
+        self.httpd = ThreadingHTTPServer((host, port), make_handler(self.market))
+        self.httpd.daemon_threads = True
+        self.thread = threading.Thread(target=self.httpd.serve_forever, daemon=True)
+
+    @property
+    def url(self):
+        host, port = self.httpd.server_address[:2]
+        return f"http://{host}:{port}"
+
+    def start(self):
+        self.thread.start()
+        return self
+
+    def stop(self):
+        self.httpd.shutdown()
+        self.httpd.server_close()
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, *exc):
+        self.stop()
+
+
+@click.command()
+@click.option("--host", default="127.0.0.1", show_default=True)
+@click.option("--port", default=8765, show_default=True)
+@click.option("--pages", default=5, show_default=True, help="Results pages per search.")
+@click.option("--per-page", default=25, show_default=True, help="Ads per results page.")
+@click.option("--results-latency", default=300, show_default=True, help="Results page latency in ms.")
+@click.option("--detail-latency", default=150, show_default=True, help="Detail page latency in ms.")
+@click.option("--jitter", default=0.5, show_default=True, help="Latency jitter as a +/- fraction.")
+@click.option("--error-rate", default=0.0, show_default=True, help="Fraction of requests answered with 503.")
+@click.option("--max-rps", default=None, type=int, help="Requests per second before answering 429.")
+@click.option("--seed", default=0, show_default=True)
+@click.option("--promoted", default=0, show_default=True, help="Page 1 ads repeated at the top of every results page.")
+def main(host, port, pages, per_page, results_latency, detail_latency, jitter, error_rate, max_rps, seed, promoted):
+    config = MarketplaceConfig(pages, per_page, results_latency / 1000, detail_latency / 1000, jitter, error_rate, max_rps, seed, promoted)
+    server = MockServer(config, host, port)
+    click.echo(f"Mock marketplace listening on {server.url} (MARKETPLACE_BASE_URL={server.url})")
+    try:
+        server.httpd.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.httpd.server_close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,290 @@
+"""
+Benchmark suite for the cleaner and analyzer over synthetic listings.
+
+    python -m benchmarks.run --scales 1k,100k,1m --output benchmarks/results/latest.json
+
+Each benchmark reports wall time, time per item and throughput. Results are written
+as JSON so runs can be compared over time with --compare.
+"""
+import atexit
+import json
+import os
+import platform
+import random
+import shutil
+import subprocess
+import sys
+import tempfile
+import time
+from datetime import datetime, timezone
+
+import click
+
+from used_car_evaluator.analyzer import analyze_listing, rank_candidates, similarity_score
+from used_car_evaluator.cleaner import clean_data, clean_data_batch, parse_int, paused_gc
+from used_car_evaluator.scraper import extract_body_type, extract_engine_info, extract_keywords, extract_transmission
+from used_car_evaluator.synthetic import generate_input_car, generate_raw_listings
+from used_car_evaluator.titles import TitleIndex
+
+SCALES = {"1k": 1_000, "10k": 10_000, "100k": 100_000, "1m": 1_000_000}
+
+RESULTS_DIR = os.path.join(os.path.dirname(__file__), "results")
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# Process launches per CLI startup benchmark
+CLI_RUNS = 5
+
+BENCHMARKS = []
+
+
+def benchmark(name, uses=("raw",)):
+    """
+    Registers fn(data) as a benchmark. fn returns the number of items it processed.
+    `uses` names the Dataset attributes it reads, which are generated before it is timed.
+    """
+    def register(fn):
+        BENCHMARKS.append((name, fn, uses))
+        return fn
+    return register
+
+
+class Dataset:
+    """Synthetic raw and cleaned listings at one scale, generated lazily and shared by the benchmarks."""
+
+    def __init__(self, size, seed):
+        self.size = size
+        self.seed = seed
+        self._raw = None
+        self._cleaned = None
+        self._snapshot_dir = None
+        rng = random.Random(seed + 1)
+        self.input_cars = [generate_input_car(rng) for _ in range(3)]
+
+    @property
+    def raw(self):
+        if self._raw is None:
+            self._raw = generate_raw_listings(self.size, self.seed)
+        return self._raw
+
+    @property
+    def cleaned(self):
+        if self._cleaned is None:
+            self._cleaned = clean_data(self.raw)
+        return self._cleaned
+
+    @property
+    def snapshot_dir(self):
+        """A temporary snapshot directory holding the cleaned listings, removed at exit."""
+        if self._snapshot_dir is None:
+            from used_car_evaluator.snapshot import write_snapshot
+            self._snapshot_dir = tempfile.mkdtemp(prefix="bench-snapshot-")
+            atexit.register(shutil.rmtree, self._snapshot_dir, ignore_errors=True)
+            write_snapshot(self.cleaned, self._snapshot_dir)
+        return self._snapshot_dir
+
+
+@benchmark("clean_data")
+def bench_clean_data(data):
+    clean_data(data.raw)
+    return data.size
+
+
+@benchmark("clean_data_batch")
+def bench_clean_data_batch(data):
+    clean_data_batch(data.raw)
+    return data.size
+
+
+@benchmark("clean_data_batch_no_gc")
+def bench_clean_data_batch_no_gc(data):
+    # As a batch job that owns its process would run it
+    with paused_gc():
+        clean_data_batch(data.raw)
+    return data.size
+
+
+@benchmark("clean_data_batch_cleaned", uses=("cleaned",))
+def bench_clean_data_batch_cleaned(data):
+    clean_data_batch(data.cleaned)
+    return data.size
+
+
+@benchmark("parse_int")
+def bench_parse_int(data):
+    n = 0
+    for item in data.raw:
+        parse_int(item["price"])
+        parse_int(item["mileage"])
+        parse_int(item["year"])
+        n += 3
+    return n
+
+
+@benchmark("extract_engine_info")
+def bench_extract_engine_info(data):
+    for item in data.raw:
+        extract_engine_info(item["title"])
+    return data.size
+
+
+@benchmark("extract_transmission")
+def bench_extract_transmission(data):
+    for item in data.raw:
+        extract_transmission(item["transmission"])
+    return data.size
+
+
+@benchmark("extract_body_type")
+def bench_extract_body_type(data):
+    for item in data.raw:
+        extract_body_type(item["title"])
+    return data.size
+
+
+@benchmark("extract_keywords")
+def bench_extract_keywords(data):
+    for item in data.raw:
+        extract_keywords(item["description"])
+    return data.size
+
+
+@benchmark("similarity_score", uses=("cleaned",))
+def bench_similarity_score(data):
+    input_car = data.cleaned[0]
+    for car in data.cleaned:
+        similarity_score(input_car, car)
+    return data.size
+
+
+@benchmark("analyze_listing", uses=("cleaned",))
+def bench_analyze_listing(data):
+    for input_car in data.input_cars:
+        analyze_listing(input_car, data.cleaned)
+    return data.size * len(data.input_cars)
+
+
+@benchmark("title_index", uses=("cleaned",))
+def bench_title_index(data):
+    TitleIndex(data.cleaned)
+    return data.size
+
+
+@benchmark("rank_candidates_indexed", uses=("cleaned",))
+def bench_rank_candidates_indexed(data):
+    # One index for the pool, shared by every query, as a long-lived pool would
+    titles = TitleIndex(data.cleaned)
+    for input_car in data.input_cars:
+        rank_candidates(input_car, data.cleaned, titles=titles)
+    return data.size * len(data.input_cars)
+
+
+def run_cli(args):
+    subprocess.run([sys.executable, "cli.py", *args], cwd=BACKEND_DIR, check=True,
+                   stdout=subprocess.DEVNULL, env=dict(os.environ, LOG_LEVEL="WARNING"))
+
+
+@benchmark("cli_startup", uses=())
+def bench_cli_startup(data):
+    for _ in range(CLI_RUNS):
+        run_cli(["--help"])
+    return CLI_RUNS
+
+
+@benchmark("cli_evaluate_offline", uses=("snapshot_dir",))
+def bench_cli_evaluate_offline(data):
+    # A whole evaluate run against the snapshot: process start, load, analyze, report
+    car = data.input_cars[0]
+    make, model = car["title"].split(" ", 1)
+    for _ in range(CLI_RUNS):
+        run_cli(["--make", make, "--model", model, "--year", str(car["year"]), "--mileage", str(car["mileage"]),
+                 "--price", str(car["price"]), "--from-snapshot", "--snapshot-dir", data.snapshot_dir])
+    return CLI_RUNS
+
+
+def run_one(fn, data, repeat):
+    best = None
+    items = 0
+    for _ in range(repeat):
+        start = time.perf_counter()
+        items = fn(data)
+        elapsed = time.perf_counter() - start
+        best = elapsed if best is None else min(best, elapsed)
+    return items, best
+
+
+def git_commit():
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True, check=True
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def compare(previous_path, results):
+    with open(previous_path, encoding="utf-8") as f:
+        previous = {(r["name"], r["scale"]): r for r in json.load(f)["results"]}
+    click.echo(f"Compared with {previous_path}:")
+    for r in results:
+        old = previous.get((r["name"], r["scale"]))
+        if old and old["per_item_us"]:
+            change = 100 * (r["per_item_us"] - old["per_item_us"]) / old["per_item_us"]
+            click.echo(f"  {r['name']:<24} {r['scale']:>5}  {old['per_item_us']:10.3f} -> {r['per_item_us']:10.3f} us/item ({change:+.1f}%)")
+
+
+@click.command()
+@click.option("--scales", default="1k,100k,1m", show_default=True, help="Comma-separated dataset sizes (1k, 10k, 100k, 1m).")
+@click.option("--only", multiple=True, help="Run only the named benchmarks (repeatable).")
+@click.option("--repeat", default=3, show_default=True, help="Runs per benchmark below 100k listings; the best time is kept.")
+@click.option("--seed", default=0, show_default=True, help="Seed for the synthetic listing generator.")
+@click.option("--output", default=None, help="Results file. Defaults to benchmarks/results/bench-<timestamp>.json.")
+@click.option("--compare", "compare_to", default=None, help="Earlier results file to compare against.")
+def main(scales, only, repeat, seed, output, compare_to):
+    started = datetime.now(timezone.utc)
+    results = []
+    for scale in scales.split(","):
+        scale = scale.strip().lower()
+        if scale not in SCALES:
+            raise click.BadParameter(f"unknown scale {scale!r}, expected one of {', '.join(SCALES)}")
+        data = Dataset(SCALES[scale], seed)
+        runs = repeat if data.size < 100_000 else 1
+        for name, fn, uses in BENCHMARKS:
+            if only and name not in only:
+                continue
+            for attr in uses:
+                getattr(data, attr)
+            items, seconds = run_one(fn, data, runs)
+            result = {
+                "name": name,
+                "scale": scale,
+                "items": items,
+                "seconds": round(seconds, 6),
+                "per_item_us": round(1e6 * seconds / items, 3) if items else None,
+                "items_per_second": round(items / seconds, 1) if seconds else None,
+            }
+            results.append(result)
+            click.echo(f"{name:<24} {scale:>5}  {seconds:9.3f}s  {result['per_item_us']:10.3f} us/item  {result['items_per_second']:>14,.0f} items/s")
+
+    report = {
+        "started_at": started.isoformat(),
+        "git_commit": git_commit(),
+        "python": sys.version.split()[0],
+        "platform": platform.platform(),
+        "seed": seed,
+        "results": results,
+    }
+    if output is None:
+        output = os.path.join(RESULTS_DIR, f"bench-{started.strftime('%Y%m%dT%H%M%S')}.json")
+    directory = os.path.dirname(output)
+    if directory:
+        os.makedirs(directory, exist_ok=True)
+    with open(output, "w", encoding="utf-8") as f:
+        json.dump(report, f, indent=2)
+    click.echo(f"Results written to {output}")
+    if compare_to:
+        compare(compare_to, results)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,115 @@
+"""
+End-to-end scraper load test against the local mock marketplace.
+
+    python -m benchmarks.scrape_load --pages 4 --per-page 20 --scrapes 2
+
+Starts the mock server (or uses --url), runs scrape_listings against it and reports
+listings per second plus results/detail page latency percentiles.
+"""
+import json
+import threading
+import time
+
+import click
+
+from benchmarks.mock_marketplace import MarketplaceConfig, MockServer
+from used_car_evaluator import metrics
+from used_car_evaluator.scraper import scrape_listings
+
+PERCENTILES = (0.5, 0.9, 0.99)
+
+
+def run_load(base_url, make, model, pages, scrapes, concurrency=1, host_rps=None):
+    """Runs `scrapes` scrape_listings calls in parallel threads and returns (listings, seconds, fetch stats)."""
+    counts = []
+    fetch_stats = []
+    lock = threading.Lock()
+
+    def worker():
+        stats = {}
+        listings = scrape_listings(make, model, pages=pages, base_url=base_url,
+                                   concurrency=concurrency, host_rps=host_rps, stats=stats)
+        with lock:
+            counts.append(len(listings))
+            fetch_stats.append(stats)
+
+    threads = [threading.Thread(target=worker) for _ in range(scrapes)]
+    start = time.perf_counter()
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    return sum(counts), time.perf_counter() - start, fetch_stats
+
+
+def latency_report():
+    report = {}
+    for stage in ("results_page_load", "detail_fetch", "detail_page_load", "parse_ad", "parse_detail"):
+        seconds, count = metrics.STAGE_SECONDS.summary(stage=stage)
+        if not count:
+            continue
+        report[stage] = {
+            "count": count,
+            "mean_ms": round(1000 * seconds / count, 1),
+            **{f"p{round(q * 100)}_ms": round(1000 * metrics.stage_quantile(stage, q), 1) for q in PERCENTILES},
+        }
+    return report
+
+
+@click.command()
+@click.option("--url", default=None, help="Use an already running marketplace instead of starting the mock.")
+@click.option("--make", default="opel", show_default=True)
+@click.option("--model", default="corsa", show_default=True)
+@click.option("--pages", default=3, show_default=True, help="Results pages served per search.")
+@click.option("--per-page", default=25, show_default=True)
+@click.option("--results-latency", default=300, show_default=True, help="Mock results page latency in ms.")
+@click.option("--detail-latency", default=150, show_default=True, help="Mock detail page latency in ms.")
+@click.option("--error-rate", default=0.0, show_default=True)
+@click.option("--max-rps", default=None, type=int)
+@click.option("--promoted", default=0, show_default=True, help="Page 1 ads repeated at the top of every page.")
+@click.option("--scrapes", default=1, show_default=True, help="Concurrent scrape_listings runs.")
+@click.option("--concurrency", default=1, show_default=True, help="Upper bound on concurrent page loads per scrape.")
+@click.option("--host-rps", default=None, type=float, help="Scraper request budget per host.")
+@click.option("--output", default=None, help="Also write the report as JSON to this file.")
+def main(url, make, model, pages, per_page, results_latency, detail_latency, error_rate, max_rps, promoted, scrapes, concurrency, host_rps, output):
+    server = None
+    if url is None:
+        config = MarketplaceConfig(pages, per_page, results_latency / 1000, detail_latency / 1000,
+                                   error_rate=error_rate, max_rps=max_rps, promoted=promoted)
+        server = MockServer(config).start()
+        url = server.url
+    metrics.REGISTRY.reset()
+    try:
+        listings, seconds, fetch_stats = run_load(url, make, model, None, scrapes, concurrency, host_rps)
+    finally:
+        if server is not None:
+            server_stats = server.market.stats()
+            server.stop()
+        else:
+            server_stats = None
+
+    report = {
+        "target": url,
+        "scrapes": scrapes,
+        "listings": listings,
+        "seconds": round(seconds, 3),
+        "listings_per_second": round(listings / seconds, 2) if seconds else None,
+        "latency": latency_report(),
+        "fetch": fetch_stats,
+        "server": server_stats,
+    }
+    click.echo(f"{listings} listings in {seconds:.2f}s ({report['listings_per_second']} listings/s) across {scrapes} scrape(s)")
+    for stage, stats in report["latency"].items():
+        click.echo(f"  {stage:<20} n={stats['count']:<6} mean={stats['mean_ms']}ms "
+                   + " ".join(f"{k}={v}ms" for k, v in stats.items() if k.startswith("p")))
+    for stats in fetch_stats:
+        click.echo(f"  fetch: {stats}")
+    if server_stats:
+        click.echo(f"  server: {server_stats}")
+    if output:
+        with open(output, "w", encoding="utf-8") as f:
+            json.dump(report, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
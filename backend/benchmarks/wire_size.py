@@ -0,0 +1,69 @@
+"""
+Payload size and serialization time of /api/scrape responses per wire format.
+
+    python -m benchmarks.wire_size --sizes 1000,10000,100000
+
+Compares Flask's jsonify output (the previous format) with the negotiated formats of
+used_car_evaluator.wire: JSON or MessagePack, uncompressed, gzip or brotli, with all
+fields or with a fields= projection.
+"""
+import json
+import time
+
+import click
+
+from used_car_evaluator import wire
+from used_car_evaluator.cleaner import clean_data
+from used_car_evaluator.synthetic import generate_raw_listings
+
+# The fields App.tsx shows in its listing summary
+SUMMARY_FIELDS = ("title", "year", "mileage", "price", "city", "url")
+
+VARIANTS = [
+    # (name, Accept, Accept-Encoding, fields)
+    ("json", None, None, None),
+    ("json+gzip", None, "gzip", None),
+    ("json+br", None, "br", None),
+    ("msgpack", "application/msgpack", None, None),
+    ("msgpack+br", "application/msgpack", "br", None),
+    ("summary fields json+br", None, "br", SUMMARY_FIELDS),
+    ("summary fields msgpack+br", "application/msgpack", "br", SUMMARY_FIELDS),
+]
+
+
+def jsonify_body(payload):
+    """What flask.jsonify sends outside debug mode: compact JSON with ASCII escapes."""
+    return json.dumps(payload, separators=(",", ":")).encode("utf-8")
+
+
+def best_time(fn, repeat):
+    best = None
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = fn()
+        elapsed = time.perf_counter() - start
+        best = elapsed if best is None else min(best, elapsed)
+    return result, best
+
+
+@click.command()
+@click.option("--sizes", default="1000,10000,100000", show_default=True, help="Comma-separated pool sizes.")
+@click.option("--repeat", default=3, show_default=True)
+@click.option("--seed", default=0, show_default=True)
+def main(sizes, repeat, seed):
+    for size in (int(s) for s in sizes.split(",")):
+        listings = clean_data(generate_raw_listings(size, seed))
+        baseline, baseline_seconds = best_time(lambda: jsonify_body(listings), repeat)
+        click.echo(f"{size} listings")
+        click.echo(f"  {'jsonify (before)':<28} {len(baseline):>12,} B  {1000 * baseline_seconds:9.1f} ms")
+        for name, accept, encoding, fields in VARIANTS:
+            def run():
+                projected = [wire.project(car, fields) for car in listings]
+                return wire.encode(projected, accept, encoding)[0]
+            body, seconds = best_time(run, repeat)
+            click.echo(f"  {name:<28} {len(body):>12,} B  {1000 * seconds:9.1f} ms"
+                       f"  ({100 * len(body) / len(baseline):5.1f}% of the bytes)")
+
+
+if __name__ == "__main__":
+    main()
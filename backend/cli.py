@@ -1,8 +1,39 @@
+import logging
+import os
+
 import click
-from used_car_evaluator.scraper import scrape_listings
-from used_car_evaluator.cleaner import clean_data
 from used_car_evaluator.analyzer import analyze_listing
-import pandas as pd
+from used_car_evaluator.profiling import Profiler
+from used_car_evaluator.snapshot import SNAPSHOT_DIR
+from used_car_evaluator.store import LISTING_STORE, ListingStore
+
+# Playwright, pandas and pyarrow take most of a second to import, so the scraper,
+# cleaner and CSV writing modules are imported by the stages that use them (and
+# snapshot.py only imports pyarrow once a snapshot is read or written)
+
+logging.basicConfig(level=os.environ.get("LOG_LEVEL", "WARNING").upper(), format="[%(levelname)s] %(name)s: %(message)s")
+
+# Stages of an evaluate run, in order; load replaces scrape, clean and write in
+# offline runs. browser_launch is timed inside scrape, once per browser, so with
+# several browsers launching in parallel it is their total time, not wall time
+STAGES = ("scrape", "clean", "write", "load", "analyze")
+NESTED_STAGES = ("browser_launch",)
+
+
+def print_profile_report(profiler, out_prefix, top):
+    click.echo("")
+    click.echo("Stage breakdown:")
+    for name, seconds in profiler.breakdown(NESTED_STAGES):
+        label = f"{name} (total across browsers)" if name in NESTED_STAGES else name
+        click.echo(f"  {label:<32} {seconds:9.3f}s")
+    paths = profiler.finish(out_prefix)
+    if not paths:
+        return
+    click.echo(f"Top {top} functions by cumulative time:")
+    click.echo(f"  {'calls':>9} {'own s':>9} {'cum s':>9}  function")
+    for name, calls, tottime, cumtime in profiler.top_functions(top):
+        click.echo(f"  {calls:>9} {tottime:9.3f} {cumtime:9.3f}  {name}")
+    click.echo(f"Profile written to {paths[0]} (pstats/snakeviz) and {paths[1]} (flamegraph.pl/speedscope folded stacks)")
 
 @click.command()
 @click.option('--make', prompt='Car make')
@@ -10,19 +41,68 @@ import pandas as pd
 @click.option('--year', prompt='Year', type=int)
 @click.option('--mileage', prompt='Mileage (km)', type=int)
 @click.option('--price', prompt='Price (EUR)', type=int)
-def evaluate(make, model, year, mileage, price):
+@click.option('--snapshot-dir', default=SNAPSHOT_DIR, show_default=True, help='Directory the typed Parquet snapshot of each run is appended to.')
+@click.option('--concurrency', default=1, show_default=True, help='Upper bound on concurrent page loads; the scraper adapts below it.')
+@click.option('--host-rps', default=None, type=float, help='Request budget per host, in requests per second.')
+@click.option('--listings-file', default=None, help='Analyze the NDJSON listings in this file (.gz, or - for stdin) instead of scraping.')
+@click.option('--from-snapshot', is_flag=True, help='Analyze the listings for this make/model in --snapshot-dir instead of scraping.')
+@click.option('--offline', is_flag=True, help='Analyze the listings for this make/model in the listing store (see --store) instead of scraping.')
+@click.option('--store', 'store_path', default=LISTING_STORE, show_default=True, help='Listing store filled by the crawler or importer, for --offline.')
+@click.option('--profile', is_flag=True, help='Profile the run and print a stage breakdown and top functions.')
+@click.option('--profile-stage', 'profile_stages', multiple=True, type=click.Choice(STAGES), help='Only profile these stages (repeatable). Defaults to the whole run.')
+@click.option('--profile-out', default='profile', show_default=True, help='Path prefix for the .prof and .folded profile outputs.')
+@click.option('--profile-top', default=20, show_default=True, help='Number of functions in the profile summary.')
+def evaluate(make, model, year, mileage, price, snapshot_dir, concurrency, host_rps, listings_file, from_snapshot, offline, store_path, profile, profile_stages, profile_out, profile_top):
+    profiler = Profiler(enabled=profile, stages=profile_stages)
     title = f"{make} {model}"
     click.echo(f"Evaluating: {title}, {year}, {mileage}km, {price}€")
-    click.echo("Scraping listings from polovniautomobili.com...")
+    input_car = {"title": title, "year": year, "mileage": mileage, "price": price}
     try:
-        # Only scrape relevant listings for this make/model/price
-        raw_listings = scrape_listings(make, model, price_to=price, pages=None)
-        cleaned_listings = clean_data(raw_listings)
-        df = pd.DataFrame(cleaned_listings)
-        df.to_csv("listings.csv", index=False)
+        if listings_file:
+            from used_car_evaluator.streaming import StreamAnalysis, check_input_car, open_ndjson
+            check_input_car(input_car)
+            # Listings are cleaned and scored line by line, so the file can be any size
+            click.echo(f"Reading listings from {listings_file}...")
+            with profiler.stage("analyze"), open_ndjson(listings_file) as lines:
+                result = StreamAnalysis(input_car).add_lines(lines).result()
+            click.echo(f"Read {result['listings_read']} listings ({result['invalid_records']} invalid).")
+        elif from_snapshot or offline:
+            # Capped at the input price like a scrape, so offline and online runs see the same listings
+            with profiler.stage("load"):
+                if from_snapshot:
+                    from used_car_evaluator.snapshot import load_snapshot
+                    source = snapshot_dir
+                    pool = load_snapshot(snapshot_dir, title=title, price_to=price)
+                else:
+                    if not os.path.exists(store_path):
+                        raise FileNotFoundError(f"No listing store at {store_path}")
+                    source = store_path
+                    store = ListingStore(store_path)
+                    try:
+                        pool = store.listings_for(input_car, price_to=price)
+                    finally:
+                        store.close()
+            click.echo(f"Loaded {len(pool)} stored listings from {source}.")
+            with profiler.stage("analyze"):
+                result = analyze_listing(input_car, pool)
+        else:
+            from used_car_evaluator.scraper import scrape_listings
+            from used_car_evaluator.cleaner import clean_data
+            click.echo("Scraping listings from polovniautomobili.com...")
+            # Only scrape relevant listings for this make/model/price
+            with profiler.stage("scrape"):
+                raw_listings = scrape_listings(make, model, price_to=price, pages=None, concurrency=concurrency, host_rps=host_rps)
+            with profiler.stage("clean"):
+                cleaned_listings = clean_data(raw_listings)
+            with profiler.stage("write"):
+                import pandas as pd
+                from used_car_evaluator.snapshot import write_snapshot
+                df = pd.DataFrame(cleaned_listings)
+                df.to_csv("listings.csv", index=False)
+                write_snapshot(cleaned_listings, snapshot_dir)
+            with profiler.stage("analyze"):
+                result = analyze_listing(input_car, cleaned_listings)
         print("")
-        input_car = {"title": title, "year": year, "mileage": mileage, "price": price}
-        result = analyze_listing(input_car, cleaned_listings)
         if "error" in result:
             click.echo(f"[!] {result['error']}")
             if "sample_titles" in result:
@@ -51,6 +131,8 @@ def evaluate(make, model, year, mileage, price):
                     click.echo(f"  - {car['title']} | {car['year']} | {car['mileage']}km | {car['price']}€ | Engine: {car.get('engine','')} | Transmission: {car.get('transmission','')} | Fuel: {car.get('fuel_type','')} | City: {car.get('city','')} | Seller: {car.get('seller_type','')} | Seller info: {car.get('seller_info','')} | [View Ad]({car.get('url','')}) | Similarity score: {car['score']}")
     except Exception as e:
         click.echo(f"[!] Error: {e}")
+    if profile:
+        print_profile_report(profiler, profile_out, profile_top)
 
 if __name__ == "__main__":
     evaluate()
@@ -0,0 +1,83 @@
+import asyncio
+import random
+
+from playwright.async_api import TimeoutError as PlaywrightTimeoutError
+
+import async_app
+from benchmarks.fake_browser import FakeResponse, http_get
+from benchmarks.mock_marketplace import MarketplaceConfig, MockServer
+from used_car_evaluator.analyzer import analyze_listing
+from used_car_evaluator.async_scraper import HtmlPage, scrape_listings_async
+from used_car_evaluator.cleaner import clean_data
+from used_car_evaluator.synthetic import generate_input_car, generate_raw_listings
+
+
+class FakeAsyncPage(HtmlPage):
+    """Just enough of an async Playwright page, fetching over urllib on a thread."""
+
+    def __init__(self):
+        super().__init__("")
+
+    async def goto(self, url, timeout=None):
+        status, html = await asyncio.to_thread(http_get, url)
+        HtmlPage.__init__(self, html)
+        return FakeResponse(status)
+
+    async def wait_for_selector(self, selector, timeout=None):
+        if self.query_selector(selector) is None:
+            raise PlaywrightTimeoutError(f"waiting for {selector}")
+
+    async def wait_for_timeout(self, ms):
+        pass
+
+    async def content(self):
+        return self.html
+
+
+class FakeAsyncBrowser:
+    async def new_page(self):
+        return FakeAsyncPage()
+
+
+def test_async_scraper_against_mock_marketplace(monkeypatch):
+    """The async scraper retries injected errors, skips repeated ads and loads each detail page once"""
+    monkeypatch.setattr("used_car_evaluator.async_scraper.DETAIL_SETTLE_MS", 0)
+    config = MarketplaceConfig(pages=3, per_page=5, results_latency=0, detail_latency=0, error_rate=0.2, promoted=1, seed=2)
+    with MockServer(config) as server:
+        stats = {}
+        listings = asyncio.run(scrape_listings_async(
+            "opel", "corsa", base_url=server.url, concurrency=4, max_retries=10, stats=stats, browser=FakeAsyncBrowser()
+        ))
+    assert len(listings) == 15
+    assert len({car["url"] for car in listings}) == 15
+    assert all(car["engine_type"] and car["seller_info"] for car in listings)
+    assert stats["retries"] > 0 and stats["duplicates_by_id"] == 2
+    assert stats["pages_lost"] == 0 and stats["details_lost"] == 0
+
+
+def test_async_endpoints(monkeypatch):
+    """The async server scrapes through the async scraper and scores like analyze_listing"""
+    config = MarketplaceConfig(pages=2, per_page=4, results_latency=0, detail_latency=0)
+    with MockServer(config) as server:
+        async def scrape(make, model, **kwargs):
+            return await scrape_listings_async(make, model, base_url=server.url, browser=FakeAsyncBrowser(), **kwargs)
+        monkeypatch.setattr(async_app, "scrape_listings_async", scrape)
+        monkeypatch.setattr("used_car_evaluator.async_scraper.DETAIL_SETTLE_MS", 0)
+
+        async def run():
+            client = async_app.app.test_client()
+            scraped = await client.post("/api/scrape", json={"make": "opel", "model": "corsa", "pages": 2})
+            pool = clean_data(generate_raw_listings(500, seed=4))
+            car = generate_input_car(random.Random(4))
+            analyzed = await client.post("/api/analyze", json={"input_car": car, "listings": pool})
+            assert scraped.headers["Access-Control-Expose-Headers"] == "X-Total-Count, X-Page, X-Per-Page, X-Total-Pages"
+            return await scraped.get_json(), await analyzed.get_json(), car, pool
+
+        try:
+            scraped, analyzed, car, pool = asyncio.run(run())
+        finally:
+            asyncio.run(async_app.shutdown_executors())
+    assert len(scraped) == 8 and all(isinstance(c["price"], int) for c in scraped)
+    expected = analyze_listing(car, pool)
+    assert {k: analyzed[k] for k in expected} == expected
+    assert "market_percentiles" in analyzed
@@ -0,0 +1,100 @@
+import app
+from used_car_evaluator.cache import AnalysisCache, car_key, pool_version
+from used_car_evaluator.analyzer import analyze_listing, similarity_score
+from used_car_evaluator.store import ListingStore
+
+POOL = [
+    {"title": "Opel Corsa 1.6", "year": 2010, "mileage": 150000, "price": 5500},
+    {"title": "Opel Corsa 1.4", "year": 2011, "mileage": 120000, "price": 6000},
+]
+
+
+def test_canonical_key_ignores_trivial_edits():
+    a = {"title": "Opel Corsa", "year": 2010, "mileage": 150000, "price": 5000}
+    b = {"title": "  opel   CORSA ", "year": 2010, "mileage": 150000, "price": 5000, "color": "", "keywords": []}
+    assert car_key(a) == car_key(b)
+    assert car_key(dict(a, color="Bela", keywords=["klima", "abs"])) == car_key(dict(a, color="bela", keywords=["abs", "klima", "abs"]))
+    assert car_key(a) != car_key(dict(a, price=5100))
+
+
+def test_cars_that_score_differently_get_different_keys():
+    candidate = {"title": "Opel Corsa 1.3", "year": 2010, "mileage": 150000, "price": 5000, "city": "Beograd",
+                 "engine_type": "diesel", "transmission": "manual", "seller_type": "Private", "fuel_type": "dizel"}
+    car = {"title": "Opel Corsa", "year": 2010, "mileage": 150000, "price": 5000}
+    for field in ("city", "engine_type", "transmission", "seller_type", "fuel_type"):
+        a, b = dict(car, **{field: candidate[field]}), dict(car, **{field: candidate[field].swapcase()})
+        assert similarity_score(a, candidate) != similarity_score(b, candidate)
+        assert car_key(a) != car_key(b)
+    assert car_key(car) != car_key(dict(car, year="2010"))
+    assert car_key(car) != car_key(dict(car, mileage=150000.0))
+
+
+def test_cache_hits_evicts_and_invalidates():
+    now = [0.0]
+    cache = AnalysisCache(maxsize=2, ttl=10, clock=lambda: now[0])
+    calls = []
+
+    def analyze(car, pool):
+        return cache.get_or_compute(car, pool, lambda: calls.append(1) or analyze_listing(car, pool), pool_id="market")
+
+    car = {"title": "Opel Corsa", "year": 2010, "mileage": 150000, "price": 5000}
+    first = analyze(car, POOL)
+    assert analyze(dict(car, title="opel corsa"), POOL) == first
+    assert len(calls) == 1
+
+    # A changed pool is a miss and drops results for the old version
+    analyze(car, POOL + [{"title": "Opel Corsa", "year": 2012, "mileage": 90000, "price": 7000}])
+    assert len(calls) == 2
+    assert cache.stats()["invalidations"] == 1
+
+    # LRU eviction and TTL expiry
+    cache.clear()
+    for price in (1, 2, 3):
+        cache.get_or_compute(dict(car, price=price), POOL, lambda: {"price": price})
+    assert cache.stats()["evictions"] == 1
+    assert cache.get_or_compute(dict(car, price=3), POOL, lambda: None) == {"price": 3}
+    now[0] = 11
+    assert cache.get_or_compute(dict(car, price=3), POOL, lambda: {"fresh": True}) == {"fresh": True}
+    stats = cache.stats()
+    assert stats["expirations"] == 1
+    assert stats["hits"] == 2 and stats["misses"] == 6
+    assert pool_version(POOL) == pool_version([dict(c) for c in POOL])
+
+
+def test_analyze_endpoint_versions_pools_without_hashing_them(tmp_path, monkeypatch):
+    """Requests are versioned by the raw body, a client pool_version or the store, never by hashing the pool"""
+    monkeypatch.setattr(app, "analysis_cache", AnalysisCache())
+    monkeypatch.setattr("used_car_evaluator.cache.pool_version", lambda listings: 1 / 0)
+    monkeypatch.setattr(app, "LISTING_STORE_PATH", str(tmp_path / "listings.db"))
+    monkeypatch.setattr(app, "CRAWL_QUEUE_PATH", str(tmp_path / "missing-queue.db"))
+    monkeypatch.setattr(app, "crawl_state", {})
+    client = app.app.test_client()
+    car = {"title": "Opel Corsa", "year": 2010, "mileage": 150000, "price": 5000}
+    expected = analyze_listing(car, POOL)
+
+    def analyze(**body):
+        result = client.post("/api/analyze", json={"input_car": car, **body}).get_json()
+        return {k: result[k] for k in expected}
+
+    assert analyze(listings=POOL) == analyze(listings=POOL) == expected
+    assert analyze(listings=POOL, pool_id="mine", pool_version="v1") == expected
+    assert analyze(listings=POOL[:1], pool_id="mine", pool_version="v1") == expected  # same version: cached
+    assert analyze(listings=POOL[:1], pool_id="mine", pool_version="v2") == analyze_listing(car, POOL[:1])
+    stats = app.analysis_cache.stats()
+    assert (stats["hits"], stats["misses"], stats["invalidations"]) == (2, 3, 1)
+
+    # The crawled pool is versioned by the store: a write makes the next request a miss
+    now = [1000.0]
+    store = ListingStore(app.LISTING_STORE_PATH, clock=lambda: now[0])
+    stored = [dict(c, url=f"https://www.polovniautomobili.com/auto-oglasi/{i}/opel-corsa") for i, c in enumerate(POOL, 1)]
+    store.upsert(stored[:1], "opel", "corsa")
+    version = store.version_for(car)
+    assert version == store.version_for(car) and store.version_for({"title": "Audi A4"}) is None
+    app.crawl_state["store"] = store
+    monkeypatch.setattr(app, "STORE_MAX_AGE", None)
+    assert analyze() == analyze() == analyze_listing(car, stored[:1])
+    now[0] += 1
+    store.upsert(stored[1:], "opel", "corsa")
+    assert store.version_for(car) != version
+    assert analyze() == analyze_listing(car, stored)
+    store.close()
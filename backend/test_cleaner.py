@@ -0,0 +1,72 @@
+import gc
+
+from used_car_evaluator.cleaner import clean_data, clean_data_batch, paused_gc
+from used_car_evaluator.sketch import SegmentSketches
+from used_car_evaluator.synthetic import generate_raw_listings
+
+EDGE_CASES = [
+    {},
+    {"title": "Golf 2008 karavan", "year": None, "price": "Po dogovoru", "mileage": ""},
+    {"title": "BMW 320d", "year": "0", "mileage": "1.250.000 km", "price": 12500, "keywords": []},
+    {"title": None, "year": 2011, "keywords": None, "transmission": "  AUTOMATSKI "},
+    {"title": "Opel Astra", "keywords": [" Klima ", "  ", "NAVIGACIJA"], "city": " novi sad", "engine": "1.6 tdi"},
+    {"title": "Škoda Octavia", "transmission": "Manuel", "seller_type": "", "color": "ČRNA", "url": None},
+    {"title": "Fiat Punto 1999", "year": "", "power": " 44/60 (kW/KS) ", "doors": "4/5 vrata ", "extra": 1},
+]
+
+
+def test_clean_data_batch_matches_clean_data():
+    """The column-wise cleaner gives exactly clean_data's output, on raw and already-cleaned listings"""
+    raw = generate_raw_listings(3000, seed=31) + EDGE_CASES
+    expected = clean_data(raw)
+    assert clean_data_batch(raw) == expected
+    assert clean_data_batch(expected) == clean_data(expected) == expected
+    assert clean_data_batch(EDGE_CASES) == clean_data(EDGE_CASES)
+    assert clean_data_batch([]) == []
+
+
+def test_clean_data_batch_falls_back_on_unexpected_types():
+    raw = generate_raw_listings(20, seed=32) + [{"title": "Audi A4", "price": 9000.0, "keywords": ("a",)}]
+    try:
+        clean_data(raw)
+        assert False, "expected clean_data to reject a float price"
+    except AttributeError:
+        pass
+    try:
+        clean_data_batch(raw)
+        assert False, "expected clean_data_batch to reject a float price"
+    except AttributeError:
+        pass
+    tuples = [{"title": "Audi A4", "keywords": ("Klima",), "mileage": True}]
+    assert clean_data_batch(tuples) == clean_data(tuples)
+
+
+def test_clean_data_batch_records_sketches():
+    raw = generate_raw_listings(500, seed=33)
+    one, batch = SegmentSketches(), SegmentSketches()
+    clean_data(raw, sketches=one)
+    clean_data_batch(raw, sketches=batch)
+    car = clean_data(raw[:1])[0]
+    assert one.percentiles(car) == batch.percentiles(car)
+
+
+class GcProbe:
+    """Stands in for SegmentSketches, noting whether GC is enabled while the batch is cleaned."""
+
+    def __init__(self):
+        self.states = []
+
+    def add(self, car):
+        self.states.append(gc.isenabled())
+
+
+def test_clean_data_batch_leaves_gc_alone():
+    """The batch cleaner can run inside a server, so pausing GC is left to the caller"""
+    raw = generate_raw_listings(50, seed=34)
+    probe = GcProbe()
+    clean_data_batch(raw, sketches=probe)
+    assert probe.states and all(probe.states) and gc.isenabled()
+    with paused_gc():
+        assert not gc.isenabled()
+        assert clean_data_batch(raw) == clean_data(raw)
+    assert gc.isenabled()
@@ -0,0 +1,51 @@
+import os
+import subprocess
+import sys
+
+from click.testing import CliRunner
+
+import cli
+from used_car_evaluator.analyzer import analyze_listing
+from used_car_evaluator.cleaner import clean_data
+from used_car_evaluator.snapshot import load_snapshot, write_snapshot
+from used_car_evaluator.store import ListingStore
+from used_car_evaluator.synthetic import generate_raw_listings
+
+BACKEND_DIR = os.path.dirname(os.path.abspath(__file__))
+
+CAR = ["--make", "Volkswagen", "--model", "Golf", "--year", "2012", "--mileage", "180000", "--price", "7000"]
+INPUT_CAR = {"title": "Volkswagen Golf", "year": 2012, "mileage": 180000, "price": 7000}
+
+
+def test_cli_import_does_not_load_heavy_modules():
+    """Starting the CLI loads neither the browser driver nor pandas/pyarrow"""
+    code = "import sys, cli; print(sorted(m for m in ('playwright', 'pandas', 'pyarrow', 'numpy') if m in sys.modules))"
+    out = subprocess.run([sys.executable, "-c", code], cwd=BACKEND_DIR, capture_output=True, text=True, check=True)
+    assert out.stdout.strip() == "[]"
+
+
+def test_evaluate_offline_from_snapshot_and_store(tmp_path, monkeypatch):
+    pool = clean_data(generate_raw_listings(600, seed=41))
+    write_snapshot(pool, str(tmp_path / "snapshots"))
+    store = ListingStore(str(tmp_path / "listings.db"))
+    store.upsert(pool, "all", "all")
+    store.close()
+    monkeypatch.setattr("used_car_evaluator.scraper.scrape_listings", lambda *args, **kwargs: 1 / 0)
+    monkeypatch.chdir(tmp_path)
+
+    # Capped at the input price, as scraping with price_to=price is
+    golfs = [car for car in pool if car["title"].startswith("Volkswagen Golf ") and car["price"] and car["price"] <= 7000]
+    assert 0 < len(golfs) < sum(car["title"].startswith("Volkswagen Golf ") for car in pool)
+    assert load_snapshot("snapshots", title="Volkswagen Golf", price_to=7000) == golfs
+    expected = analyze_listing(INPUT_CAR, golfs)
+    verdict = f"the average of {expected['count_similar']} most similar listings (avg: {expected['average_price']}€)"
+
+    for flags in (["--from-snapshot"], ["--offline"]):
+        result = CliRunner().invoke(cli.evaluate, CAR + flags)
+        assert result.exit_code == 0
+        assert f"Loaded {len(golfs)} stored listings" in result.output
+        assert verdict in result.output
+    assert not (tmp_path / "listings.csv").exists()
+
+    missing = CliRunner().invoke(cli.evaluate, CAR + ["--offline", "--store", "missing.db"])
+    assert "[!] Error: No listing store at missing.db" in missing.output
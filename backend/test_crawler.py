@@ -0,0 +1,99 @@
+from benchmarks.fake_browser import FakePage
+from benchmarks.mock_marketplace import MarketplaceConfig, MockServer
+import app
+from used_car_evaluator import crawler
+from used_car_evaluator.crawler import CrawlWorker, WorkQueue
+from used_car_evaluator.store import ListingStore
+
+
+class Clock:
+    def __init__(self):
+        self.now = 1000.0
+
+    def __call__(self):
+        return self.now
+
+
+def test_queue_leases_priorities_and_retries(tmp_path):
+    clock = Clock()
+    queue = WorkQueue(str(tmp_path / "queue.db"), clock=clock)
+    queue.add_segment("Opel", "Corsa")
+    queue.add_segment("VW", "Golf")
+    assert queue.bump("VW Golf 1.9 TDI") == [("vw", "golf")]
+
+    unit = queue.claim("a")
+    assert (unit["make"], unit["page"]) == ("vw", 1)
+    queue.complete(unit, total_pages=3)
+    page2, page3 = queue.claim("a"), queue.claim("a")
+    assert (page2["page"], page3["page"]) == (2, 3)
+    queue.complete(page3)
+    opel = queue.claim("b")
+    assert opel["make"] == "opel"
+    queue.complete(opel, total_pages=1)
+    assert queue.claim("b") is None
+
+    # The lease of a crashed worker expires and its unit is handed out again
+    clock.now += 301
+    unit = queue.claim("c")
+    assert (unit["page"], unit["attempts"]) == (2, 2)
+    queue.fail(unit, "timeout", max_attempts=3, backoff=10)
+    assert queue.claim("c") is None
+    clock.now += 21
+    queue.fail(queue.claim("c"), "timeout", max_attempts=3)
+    assert queue.stats() == {"segments": 2, "pending": 0, "leased": 0, "done": 3, "failed": 1}
+
+    # The hot segment comes round for a refresh before the cold one
+    clock.now += 601
+    assert queue.refresh(max_age=1200) == 3
+    assert [queue.claim("d")["make"] for _ in range(3)] == ["vw"] * 3
+    assert queue.claim("d") is None
+
+def test_store_upserts_by_ad_id(tmp_path):
+    clock = Clock()
+    store = ListingStore(str(tmp_path / "listings.db"), clock=clock)
+    car = {"title": "Opel Corsa 1.2", "year": 2010, "price": 3500, "url": "https://x/auto-oglasi/1/opel-corsa"}
+    store.upsert([car, dict(car, title="Opel Corsavan", url="https://x/auto-oglasi/2/opel-corsavan")], "Opel", "Corsa")
+    clock.now += 100
+    store.upsert([dict(car, price=3300, url=car["url"] + "?p=2")], "Opel", "Corsa")
+    assert len(store) == 2
+    assert [c["price"] for c in store.listings_for({"title": "opel  corsa"})] == [3300]
+    assert len(store.listings("opel", "corsa", max_age=50)) == 1
+    assert store.prune(max_age=50) == 1
+    assert store.segments() == [("opel", "corsa", 1)]
+
+
+def test_worker_drains_queue_into_store(tmp_path, monkeypatch):
+    """A worker crawls every page of each seeded segment and the store can be queried by title"""
+    monkeypatch.setattr(crawler, "open_browser", lambda: {"page": FakePage(), "detail_page": FakePage()})
+    monkeypatch.setattr(crawler, "close_browser", lambda ctx: None)
+    queue_path, store_path = str(tmp_path / "queue.db"), str(tmp_path / "listings.db")
+    queue = WorkQueue(queue_path)
+    queue.add_segment("Opel", "Corsa")
+    queue.add_segment("Audi", "A4")
+    config = MarketplaceConfig(pages=3, per_page=4, results_latency=0, detail_latency=0)
+    with MockServer(config) as server:
+        counts = CrawlWorker(queue_path, store_path, "w", base_url=server.url).run(idle_exit=True)
+    assert counts == {"units": 6, "failed": 0, "listings": 24}
+    assert queue.stats()["done"] == 6
+    store = ListingStore(store_path)
+    assert len(store.listings_for({"title": "Opel Corsa"})) == 12
+
+
+def test_analyze_falls_back_to_store(tmp_path, monkeypatch):
+    store_path = str(tmp_path / "listings.db")
+    store = ListingStore(store_path)
+    store.upsert([
+        {"title": "Opel Corsa 1.2", "year": 2010, "mileage": 150000, "price": 3500 + 100 * i,
+         "url": f"https://x/auto-oglasi/{i}/opel-corsa"}
+        for i in range(5)
+    ], "opel", "corsa")
+    monkeypatch.setattr(app, "LISTING_STORE_PATH", store_path)
+    monkeypatch.setattr(app, "CRAWL_QUEUE_PATH", str(tmp_path / "missing.db"))
+    monkeypatch.setattr(app, "crawl_state", {})
+    client = app.app.test_client()
+    car = {"title": "Opel Corsa", "year": 2010, "mileage": 150000, "price": 3000}
+    response = client.post("/api/analyze", json={"input_car": car})
+    assert response.status_code == 200
+    assert response.get_json()["count_similar"] == 5
+    response = client.post("/api/analyze", json={"input_car": dict(car, title="Fiat Punto")})
+    assert response.status_code == 400
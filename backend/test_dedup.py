@@ -0,0 +1,28 @@
+from used_car_evaluator.dedup import Deduplicator, ad_id_from_url, listing_fingerprint
+
+
+def test_ad_id_ignores_slug_and_query():
+    a = ad_id_from_url("https://www.polovniautomobili.com/auto-oglasi/25123456/opel-corsa-1.3?attp=p1_pv0_pc1")
+    b = ad_id_from_url("https://www.polovniautomobili.com/auto-oglasi/25123456/opel-corsa-13-cdti")
+    assert a == b == "25123456"
+    assert ad_id_from_url("https://Example.com/ads/7/") == ad_id_from_url("https://example.com/ads/7")
+    assert ad_id_from_url(None) is None
+
+
+def test_fingerprint_normalizes_formatting():
+    a = {"title": "Škoda  Octavia 1.6 TDI", "year": "2012.", "mileage": "185.000 km", "price": "6.450 €"}
+    b = {"title": "skoda octavia 1.6-tdi", "year": 2012, "mileage": 185000, "price": 6450}
+    assert listing_fingerprint(a) == listing_fingerprint(b)
+    assert listing_fingerprint(dict(b, price=6500)) != listing_fingerprint(b)
+    assert listing_fingerprint({"title": "Opel Corsa", "year": "2010"}) is None
+
+
+def test_deduplicator_counts_by_kind():
+    dedup = Deduplicator()
+    car = {"title": "Opel Corsa 1.2", "year": "2010", "mileage": "150.000 km", "price": "3.500 €",
+           "url": "https://example.com/auto-oglasi/1/opel-corsa"}
+    promoted_again = dict(car, url="https://example.com/auto-oglasi/1/opel-corsa?page=2")
+    reposted = dict(car, url="https://example.com/auto-oglasi/2/opel-corsa")
+    other = dict(car, price="3.400 €", url="https://example.com/auto-oglasi/3/opel-corsa")
+    assert dedup.filter([car, promoted_again, reposted, other]) == [car, other]
+    assert dedup.stats() == {"duplicates_by_id": 1, "duplicates_by_fingerprint": 1, "duplicates": 2}
@@ -0,0 +1,105 @@
+from benchmarks.fake_browser import FakePage
+from benchmarks.mock_marketplace import MarketplaceConfig, MockServer
+from used_car_evaluator import scraper
+from used_car_evaluator.fetcher import AdaptiveLimiter, FetchLost, FetchScheduler, TransientFetchError
+
+
+def test_retries_then_gives_up():
+    sleeps = []
+    scheduler = FetchScheduler(max_retries=2, sleep=sleeps.append)
+    failures = {"http://a/1": 1, "http://a/2": 5}
+
+    def fetch(url):
+        if failures[url]:
+            failures[url] -= 1
+            raise TransientFetchError("503", 503)
+        return url
+
+    assert scheduler.call(fetch, "http://a/1") == "http://a/1"
+    try:
+        scheduler.call(fetch, "http://a/2")
+        assert False, "expected FetchLost"
+    except FetchLost:
+        pass
+    stats = scheduler.stats()
+    assert stats["retries"] == 3
+    assert stats["pages_retried"] == 2 and stats["pages_lost"] == 1
+    assert len(sleeps) == 3 and all(0 < s <= 3 for s in sleeps)
+
+
+def test_non_transient_errors_are_not_retried():
+    scheduler = FetchScheduler(sleep=lambda s: None)
+    try:
+        scheduler.call(lambda url: 1 / 0, "http://a/1")
+    except FetchLost:
+        pass
+    assert scheduler.stats()["retries"] == 0
+
+
+def test_worker_init_is_retried_then_fails_the_run():
+    launches = []
+
+    def flaky_launch():
+        launches.append(1)
+        if len(launches) == 1:
+            raise RuntimeError("browser crashed")
+        return "browser"
+
+    with FetchScheduler(sleep=lambda s: None).start(flaky_launch) as scheduler:
+        assert scheduler.map(["http://a/1"], lambda ctx, url: ctx) == {"http://a/1": "browser"}
+
+    def broken_launch():
+        raise RuntimeError("executable not found")
+
+    with FetchScheduler(concurrency=2, sleep=lambda s: None).start(broken_launch) as scheduler:
+        try:
+            scheduler.map(["http://a/1", "http://a/2"], lambda ctx, url: ctx)
+            assert False, "expected the launch error"
+        except RuntimeError as e:
+            assert str(e) == "executable not found"
+        assert scheduler.stats()["pages_lost"] == 0
+
+
+def test_aimd_limit():
+    limiter = AdaptiveLimiter(max_limit=8, target_latency=1.0)
+    for _ in range(40):
+        limiter.acquire()
+        limiter.release(0.1, ok=True)
+    assert limiter.limit == 8
+    limiter.acquire()
+    limiter.release(0.1, ok=False)
+    assert limiter.limit == 4
+    limiter.acquire()
+    limiter.release(5.0, ok=True)
+    assert limiter.limit == 2
+
+
+def test_scrape_listings_against_mock_marketplace(monkeypatch):
+    """Pages lost to injected 503s are retried and every listing is scraped once"""
+    monkeypatch.setattr(scraper, "open_browser", lambda: {"page": FakePage(), "detail_page": FakePage()})
+    monkeypatch.setattr(scraper, "close_browser", lambda ctx: None)
+    monkeypatch.setattr(scraper.FetchScheduler, "backoff", lambda self, attempt: 0.001)
+    config = MarketplaceConfig(pages=4, per_page=5, results_latency=0, detail_latency=0, error_rate=0.2, seed=1)
+    with MockServer(config) as server:
+        stats = {}
+        listings = scraper.scrape_listings("opel", "corsa", base_url=server.url, concurrency=3, max_retries=10, stats=stats)
+    assert len(listings) == 20
+    assert len({car["url"] for car in listings}) == 20
+    assert all(car["title"].startswith("Opel Corsa") and car["engine_type"] for car in listings)
+    assert stats["retries"] > 0
+    assert stats["pages_lost"] == 0 and stats["details_lost"] == 0
+
+
+def test_scrape_skips_repeated_ads(monkeypatch):
+    """Promoted ads repeated on every page are kept once and their detail page is loaded once"""
+    monkeypatch.setattr(scraper, "open_browser", lambda: {"page": FakePage(), "detail_page": FakePage()})
+    monkeypatch.setattr(scraper, "close_browser", lambda ctx: None)
+    config = MarketplaceConfig(pages=3, per_page=5, results_latency=0, detail_latency=0, promoted=2)
+    with MockServer(config) as server:
+        stats = {}
+        listings = scraper.scrape_listings("opel", "corsa", base_url=server.url, concurrency=2, stats=stats)
+        detail_requests = server.market.stats()["requests"]["detail"]
+    assert len(listings) == 15
+    assert len({car["url"] for car in listings}) == 15
+    assert stats["duplicates_by_id"] == 4
+    assert detail_requests == 15
@@ -0,0 +1,74 @@
+import gzip
+import json
+
+import pandas as pd
+
+from used_car_evaluator import importer
+from used_car_evaluator.cleaner import clean_data
+from used_car_evaluator.store import ListingStore
+from used_car_evaluator.synthetic import generate_raw_listings
+
+
+def test_import_csv_written_by_cli(tmp_path):
+    """A listings.csv as cli.py writes it imports back to the same cleaned listings"""
+    cleaned = clean_data(generate_raw_listings(300, seed=21))
+    cleaned[0]["mileage"] = None  # pandas then writes the column as floats
+    path = tmp_path / "listings.csv"
+    pd.DataFrame(cleaned + cleaned[:10]).to_csv(path, index=False)
+    store = ListingStore(str(tmp_path / "listings.db"))
+
+    counts = importer.import_file(store, str(path), workers=1, chunk_size=64)
+    assert counts == {"read": 310, "written": 300, "updated": 0, "duplicates": 10, "invalid": 0, "skipped": 0}
+    by_url = {car["url"]: car for car in store.listings()}
+    assert all(by_url[car["url"]] == car for car in cleaned)
+    make, model = importer.title_segment(cleaned[0]["title"])
+    assert by_url[cleaned[0]["url"]] in store.listings(make, model)
+
+
+def test_import_resumes_from_checkpoint(tmp_path, monkeypatch):
+    raw = generate_raw_listings(500, seed=22)
+    path = tmp_path / "dump.jsonl.gz"
+    with gzip.open(path, "wt", encoding="utf-8") as f:
+        for i, car in enumerate(raw):
+            f.write(("{not json" if i == 7 else json.dumps(car)) + "\n")
+    store = ListingStore(str(tmp_path / "listings.db"))
+
+    write = store.write
+    calls = []
+    def crash_on_third_chunk(*args, **kwargs):
+        calls.append(1)
+        if len(calls) == 3:
+            raise KeyboardInterrupt
+        return write(*args, **kwargs)
+    monkeypatch.setattr(store, "write", crash_on_third_chunk)
+    try:
+        importer.import_file(store, str(path), workers=2, chunk_size=100)
+        assert False, "expected the import to be interrupted"
+    except KeyboardInterrupt:
+        pass
+    assert len(store) == 199 and store.checkpoint(str(path))[1] == 200
+
+    counts = importer.import_file(store, str(path), workers=2, chunk_size=100)
+    assert counts == {"read": 300, "written": 300, "updated": 0, "duplicates": 0, "invalid": 0, "skipped": 0}
+    assert len(store) == 499
+    assert sorted(car["url"] for car in store.listings()) == sorted(car["url"] for i, car in enumerate(raw) if i != 7)
+
+    assert importer.import_file(store, str(path), workers=1, restart=True)["duplicates"] == 499
+
+
+def test_replace_keeps_the_last_copy_and_counts_it_as_updated(tmp_path):
+    cleaned = clean_data(generate_raw_listings(50, seed=23))
+    cleaned[0]["title"] = "VW Golf Plus 1.6 TDI"
+    repeated = [dict(car, price=(car["price"] or 0) + 1) for car in cleaned[:5]]
+    path = tmp_path / "dump.jsonl"
+    path.write_text("".join(json.dumps(car) + "\n" for car in cleaned + repeated), encoding="utf-8")
+    store = ListingStore(str(tmp_path / "listings.db"))
+
+    counts = importer.import_file(store, str(path), workers=1, chunk_size=20, replace=True)
+    assert counts == {"read": 55, "written": 50, "updated": 5, "duplicates": 0, "invalid": 0, "skipped": 0}
+    by_url = {car["url"]: car for car in store.listings()}
+    assert all(by_url[car["url"]]["price"] == car["price"] for car in repeated)
+    assert len(store.listings("volkswagen", "golf plus")) == 1
+
+    counts = importer.import_file(store, str(path), workers=1, restart=True)
+    assert counts["written"] == counts["updated"] == 0 and counts["duplicates"] == 55
@@ -0,0 +1,55 @@
+import random
+
+from used_car_evaluator.knn import KnnIndex, compare_engines
+from used_car_evaluator.analyzer import analyze_listing
+
+
+def make_pool(n, seed=7):
+    rng = random.Random(seed)
+    models = [("Opel", "Corsa"), ("VW", "Golf"), ("Audi", "A4")]
+    pool = []
+    for i in range(n):
+        make, model = rng.choice(models)
+        pool.append({
+            "title": f"{make} {model} {rng.choice(['1.4', '1.6', '2.0'])}",
+            "year": rng.randint(2000, 2020),
+            "mileage": rng.randint(20000, 300000),
+            "price": rng.randint(1500, 20000),
+            "engine_type": rng.choice(["diesel", "petrol", None]),
+            "transmission": rng.choice(["manual", "automatic"]),
+            "body_type": rng.choice(["hatchback", "sedan", "wagon"]),
+            "engine_size": rng.choice(["1.4", "1.6", "2.0", None]),
+            "power": f"{rng.randint(50, 150)} kW",
+            "url": f"https://example.com/{i}",
+        })
+    return pool
+
+
+def test_knn_matches_brute_force():
+    """The KD-tree returns the same neighbours as an exhaustive scan"""
+    pool = make_pool(2000)
+    index = KnnIndex(pool)
+    input_car = {"title": "VW Golf", "year": 2012, "mileage": 140000, "price": 7000,
+                 "transmission": "manual", "power": "77 kW"}
+    vector, active = index.space.embed(input_car, impute=False)
+    brute = []
+    for car in index.listings:
+        if car["title"].split()[:2] != ["VW", "Golf"]:
+            continue
+        point, _ = index.space.embed(car)
+        brute.append(sum((q - p) ** 2 for q, p, on in zip(vector, point, active) if on))
+    brute.sort()
+    found = [d for d, _ in index.nearest(input_car, 10)]
+    assert [round(d, 9) for d in found] == [round(d, 9) for d in brute[:10]]
+    assert all(car["title"].startswith("VW Golf") for _, car in index.nearest(input_car, 10))
+
+
+def test_knn_engine_in_analyze_listing():
+    pool = make_pool(500)
+    input_car = {"title": "Opel Corsa", "year": 2010, "mileage": 150000, "price": 5000}
+    result = analyze_listing(input_car, pool, engine="knn")
+    assert result["count_similar"] == 5
+    assert all(car["title"].startswith("Opel Corsa") for car in result["top_similar"])
+
+    report = compare_engines([input_car], pool)
+    assert 0 <= report["mean_topk_overlap"] <= 1
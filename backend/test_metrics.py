@@ -0,0 +1,61 @@
+import multiprocessing
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+from used_car_evaluator import metrics
+from used_car_evaluator.cleaner import clean_data
+from used_car_evaluator.analyzer import analyze_listing
+from used_car_evaluator.async_scraper import HtmlPage
+from used_car_evaluator.scraper import scrape_detail_page
+
+
+def test_stages_are_timed_and_rendered():
+    metrics.REGISTRY.reset()
+    cleaned = clean_data([{"title": "Opel Corsa", "year": "2010", "mileage": "150.000 km", "price": "5.000 €"}])
+    analyze_listing({"title": "Opel Corsa", "year": 2010, "mileage": 150000, "price": 4500}, cleaned)
+
+    breakdown = metrics.stage_breakdown()
+    assert {"clean", "score", "sort"} <= set(breakdown)
+    assert breakdown["clean"][1] == 1
+
+    text = metrics.render()
+    assert '# TYPE used_car_stage_seconds histogram' in text
+    assert 'used_car_stage_seconds_count{stage="score"} 1' in text
+    assert 'used_car_listings_total{stage="cleaned"} 1' in text
+    assert 'used_car_stage_seconds_bucket{stage="clean",le="+Inf"} 1' in text
+
+
+class SlowDetailPage(HtmlPage):
+    """A detail page whose load takes a while, as a network fetch would."""
+
+    def goto(self, url, timeout=None):
+        time.sleep(0.05)
+
+    def wait_for_selector(self, selector, timeout=None):
+        pass
+
+    def wait_for_timeout(self, ms):
+        pass
+
+
+def test_detail_fetch_is_timed_apart_from_parsing():
+    metrics.REGISTRY.reset()
+    page = SlowDetailPage("<html><body><div class='classified-content'>Klima</div></body></html>")
+    scrape_detail_page(page, "https://example.com/ad")
+    breakdown = metrics.stage_breakdown()
+    assert breakdown["detail_fetch"][0] >= 0.05
+    assert breakdown["parse_detail"][0] < 0.05
+
+
+def test_metrics_recorded_in_a_process_pool_are_merged_back():
+    metrics.REGISTRY.reset()
+    cleaned = clean_data([{"title": "Opel Corsa", "year": "2010", "mileage": "150.000 km", "price": "5.000 €"}])
+    input_car = {"title": "Opel Corsa", "year": 2010, "mileage": 150000, "price": 4500}
+    with ProcessPoolExecutor(1, mp_context=multiprocessing.get_context("spawn")) as pool:
+        for _ in range(2):
+            result, recorded = pool.submit(metrics.recorded, analyze_listing, input_car, cleaned).result()
+            metrics.REGISTRY.merge(recorded)
+    assert result["count_similar"] == 1
+    breakdown = metrics.stage_breakdown()
+    assert breakdown["score"][1] == 2 and breakdown["clean"][1] == 1
+    assert 'used_car_stage_seconds_bucket{stage="score",le="+Inf"} 2' in metrics.render()
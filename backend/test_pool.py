@@ -0,0 +1,48 @@
+from used_car_evaluator.pool import CompactPool
+from used_car_evaluator.analyzer import analyze_listing
+
+
+def make_listings(n):
+    listings = []
+    for i in range(n):
+        listings.append({
+            "title": f"Opel Corsa 1.{i % 6} TDI", "year": 2005 + i % 10, "mileage": 100000 + i * 1000,
+            "price": 3000 + (i % 20) * 150 if i % 7 else None, "engine": None,
+            "engine_type": ["diesel", "petrol"][i % 2], "engine_size": "1.6",
+            "transmission": "manual", "body_type": "hatchback", "power": "66 kW", "color": "Bela",
+            "doors": "5", "seats": "5", "city": ["Beograd", "Novi sad", "Nis"][i % 3],
+            "seller_type": "Private", "fuel_type": None, "seller_info": f"Seller {i}",
+            "keywords": ["klima", "registrovan"][: i % 3] if i % 5 else None,
+            "url": f"https://example.com/{i}",
+        })
+    return listings
+
+
+def test_compact_pool_round_trip():
+    """The compact pool gives back the same listings and the same analysis"""
+    listings = make_listings(200)
+    pool = CompactPool(listings)
+    assert len(pool) == 200
+    assert list(pool) == listings
+    assert pool[-1] == listings[-1]
+    assert pool[:5] == listings[:5]
+
+    input_car = {"title": "Opel Corsa", "year": 2010, "mileage": 150000, "price": 4000, "engine_type": "diesel"}
+    assert analyze_listing(input_car, pool) == analyze_listing(input_car, listings)
+
+
+def test_compact_pool_keeps_keyword_order_and_duplicates():
+    listings = make_listings(10)
+    listings[1]["keywords"] = ["registrovan", "klima"]
+    listings[2]["keywords"] = ["klima", "klima", "servisna knjiga"]
+    listings[3]["keywords"] = []
+    pool = CompactPool(listings)
+    assert list(pool) == listings
+    assert 2 in pool.keyword_order and 3 not in pool.keyword_order
+
+
+def test_compact_pool_saves_memory():
+    listings = make_listings(1000)
+    report = CompactPool(listings).memory_report()
+    assert report["saved_bytes_per_listing"] > 0
+    assert report["compact_bytes_per_listing"] < report["dict_bytes_per_listing"] / 2
@@ -0,0 +1,73 @@
+import pstats
+import time
+
+from used_car_evaluator import metrics
+from used_car_evaluator.cleaner import clean_data
+from used_car_evaluator.fetcher import FetchScheduler
+from used_car_evaluator.profiling import Profiler
+from used_car_evaluator.synthetic import generate_raw_listings
+
+
+def busy_loop(seconds):
+    end = time.perf_counter() + seconds
+    n = 0
+    while time.perf_counter() < end:
+        n += 1
+    return n
+
+
+def test_stage_breakdown_counts_each_stage_once():
+    """A stage whose code records the same metrics stage (clean_data's "clean") isn't counted twice"""
+    metrics.REGISTRY.reset()
+    raw = generate_raw_listings(2000, seed=61)
+    profiler = Profiler()
+    start = time.perf_counter()
+    with profiler.stage("clean"):
+        clean_data(raw)
+    wall = time.perf_counter() - start
+    with profiler.stage("analyze"):
+        with metrics.timer("score"):
+            busy_loop(0.01)
+
+    breakdown = profiler.breakdown(extra_stages=("score", "never_run"))
+    assert [name for name, _ in breakdown] == ["clean", "analyze", "score"]
+    seconds = dict(breakdown)
+    assert seconds["clean"] <= wall
+    assert metrics.stage_breakdown()["clean"][1] == 1
+    assert seconds["score"] <= seconds["analyze"]
+    assert profiler.finish("unused") == []
+
+
+def test_profile_and_folded_stacks_cover_selected_stages(tmp_path):
+    profiler = Profiler(enabled=True, stages=["analyze"])
+    with profiler.stage("clean"):
+        busy_loop(0.05)
+    with profiler.stage("analyze"):
+        busy_loop(0.2)
+    prof_path, folded_path = profiler.finish(str(tmp_path / "out" / "profile"))
+
+    with open(folded_path, encoding="utf-8") as f:
+        lines = f.read().splitlines()
+    assert lines and all(line.rsplit(" ", 1)[1].isdigit() for line in lines)
+    assert any("busy_loop (test_profiling.py:" in line for line in lines)
+
+    functions = {name: calls for name, calls, _, _ in profiler.top_functions(50)}
+    assert any(name.startswith("busy_loop") and calls == 1 for name, calls in functions.items())
+    assert pstats.Stats(prof_path).total_calls > 0
+
+
+def test_profile_covers_stages_running_on_worker_threads(tmp_path):
+    """scrape_listings runs on FetchScheduler workers, not on the thread that profiles"""
+    profiler = Profiler(enabled=True, stages=["scrape"])
+    with profiler.stage("scrape"):
+        with FetchScheduler(concurrency=2).start() as scheduler:
+            scheduler.map(["a", "b"], lambda ctx, url: busy_loop(0.1))
+    prof_path, folded_path = profiler.finish(str(tmp_path / "profile"))
+
+    with open(folded_path, encoding="utf-8") as f:
+        lines = f.read().splitlines()
+    assert any(line.startswith("fetch-worker-") and "busy_loop (test_profiling.py:" in line for line in lines)
+
+    functions = {name: calls for name, calls, _, _ in profiler.top_functions(50)}
+    assert any(name.startswith("busy_loop") and calls == 2 for name, calls in functions.items())
+    assert any("busy_loop" in func for _, _, func in pstats.Stats(prof_path).stats)
@@ -0,0 +1,48 @@
+import random
+
+from used_car_evaluator.sketch import KllSketch, SegmentSketches
+from used_car_evaluator.cleaner import clean_data
+
+
+def test_kll_quantiles_and_merge():
+    """Sketch quantiles stay close to the exact ones and merging matches a single sketch"""
+    rng = random.Random(1)
+    values = [rng.randint(1000, 30000) for _ in range(50000)]
+    a, b = KllSketch(seed=1), KllSketch(seed=2)
+    for v in values[:25000]:
+        a.update(v)
+    for v in values[25000:]:
+        b.update(v)
+    merged = a.merge(b)
+    assert merged.n == len(values)
+    assert sum(len(c) for c in merged.compactors) < 1000
+    exact = sorted(values)
+    for q in (0.1, 0.5, 0.9):
+        true_rank = exact.index(merged.quantile(q)) / len(exact)
+        assert abs(true_rank - q) < 0.03
+
+
+def test_segment_sketches_from_clean_data():
+    sketches = SegmentSketches()
+    raw = [{"title": "Opel Corsa 1.3 CDTI", "year": "2010", "price": f"{p}.000 €", "engine_type": "Dizel"} for p in range(2, 12)]
+    raw.append({"title": "Opel Corsa 1.2", "year": "2010", "price": "20.000 €", "engine_type": "Benzin"})
+    raw.append({"title": "Opel Astra", "year": "2010", "price": "9.000 €"})
+    clean_data(raw, sketches=sketches)
+
+    result = sketches.percentiles({"title": "Opel Corsa", "year": 2010, "price": 6000, "engine_type": "dizel"})
+    assert result["segment_size"] == 10
+    assert result["percentiles"]["p50"] in (6000, 7000)
+    assert 40 <= result["input_percentile"] <= 60
+
+    # Without a fuel every fuel for the make/model/year is merged
+    assert sketches.percentiles({"title": "Opel Corsa", "year": 2010, "price": 6000})["segment_size"] == 11
+    assert sketches.percentiles({"title": "Opel Corsa", "year": 2015, "price": 6000}) is None
+
+
+def test_segments_normalize_year_and_fuel():
+    sketches = SegmentSketches()
+    sketches.add({"title": "Opel Corsa", "year": "2010", "price": 5000, "engine_type": " Dizel"})
+    sketches.add({"title": "Opel Corsa", "year": 2010, "price": 6000, "engine_type": "dizel"})
+    sketches.add({"title": "Opel Corsa", "year": 2010, "price": 7000, "fuel_type": "DIZEL "})
+    assert len(sketches.sketches) == 1
+    assert sketches.percentiles({"title": "Opel Corsa", "year": "2010", "price": 6000, "engine_type": "Dizel"})["segment_size"] == 3
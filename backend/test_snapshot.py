@@ -0,0 +1,49 @@
+import os
+from datetime import datetime
+
+from used_car_evaluator.cleaner import clean_data
+from used_car_evaluator.snapshot import write_snapshot, load_snapshot, load_snapshot_table, snapshot_files
+from used_car_evaluator.analyzer import analyze_listing
+
+RAW = [
+    {"title": "Opel Corsa 1.6 TDI", "year": "2010", "mileage": "150.000 km", "price": "5.500 €",
+     "engine_type": "Diesel", "transmission": "Manuelni", "city": "beograd", "doors": "5",
+     "keywords": ["klima", "registrovan"], "url": "https://example.com/1"},
+    {"title": "Opel Corsa 1.4", "year": "2011", "mileage": "160.000 km", "price": "4.800 €",
+     "engine_type": "Benzin", "city": "novi sad", "keywords": [], "url": "https://example.com/2"},
+]
+
+
+def test_snapshot_round_trip(tmp_path):
+    """Snapshot runs are appended and load back exactly as clean_data produced them"""
+    cleaned = clean_data(RAW)
+    write_snapshot(cleaned[:1], str(tmp_path))
+    write_snapshot(cleaned[1:], str(tmp_path))
+    assert write_snapshot([], str(tmp_path)) is None
+    assert len(snapshot_files(str(tmp_path))) == 2
+
+    loaded = load_snapshot(str(tmp_path))
+    assert loaded == cleaned
+
+    table = load_snapshot_table(str(tmp_path))
+    assert str(table.schema.field("city").type).startswith("dictionary")
+    assert str(table.schema.field("keywords").type).startswith("list")
+
+    input_car = {"title": "Opel Corsa", "year": 2010, "mileage": 150000, "price": 5000}
+    assert analyze_listing(input_car, loaded) == analyze_listing(input_car, cleaned)
+
+
+def test_runs_in_the_same_microsecond_load_in_write_order(tmp_path, monkeypatch):
+    class FrozenDatetime:
+        @staticmethod
+        def now(tz=None):
+            return datetime(2026, 1, 2, 3, 4, 5, 678901, tzinfo=tz)
+
+    monkeypatch.setattr("used_car_evaluator.snapshot.datetime", FrozenDatetime)
+    cleaned = clean_data(RAW) * 6
+    for i, car in enumerate(cleaned):
+        write_snapshot([dict(car, price=1000 + i)], str(tmp_path))
+    names = [os.path.basename(path) for path in snapshot_files(str(tmp_path))]
+    assert names[:3] == ["run-20260102T030405678901.parquet", "run-20260102T030405678901-1.parquet",
+                         "run-20260102T030405678901-2.parquet"]
+    assert [car["price"] for car in load_snapshot(str(tmp_path))] == list(range(1000, 1012))
@@ -0,0 +1,110 @@
+import asyncio
+import gzip
+import json
+import random
+
+from click.testing import CliRunner
+
+import app
+import async_app
+import cli
+from used_car_evaluator.analyzer import analyze_listing
+from used_car_evaluator.cleaner import clean_data
+from used_car_evaluator.streaming import LineSplitter, analyze_stream
+from used_car_evaluator.synthetic import generate_input_car, generate_raw_listings
+
+
+def ndjson(header, listings):
+    lines = [json.dumps(header)] + [json.dumps(car) for car in listings]
+    return ("\n".join(lines) + "\n").encode("utf-8")
+
+
+def same_analysis(streamed, expected):
+    return {k: streamed[k] for k in expected} == json.loads(json.dumps(expected))
+
+
+def test_stream_matches_analyze_listing():
+    """Scoring listings one at a time into a top-k heap gives analyze_listing's result, on raw or cleaned listings"""
+    raw = generate_raw_listings(1500, seed=11)
+    cleaned = clean_data(raw)
+    rng = random.Random(11)
+    for _ in range(20):
+        car = generate_input_car(rng)
+        expected = analyze_listing(car, cleaned)
+        for pool in (raw, cleaned):
+            streamed = analyze_stream(car, iter(pool))
+            assert {k: streamed[k] for k in expected} == expected
+            assert streamed["listings_read"] == len(pool) and streamed["invalid_records"] == 0
+
+
+def test_line_splitter_handles_split_and_gzipped_chunks():
+    body = gzip.compress(b'{"a": 1}\n{"b": 2}\n{"c"')
+    splitter = LineSplitter(gzipped=True)
+    lines = []
+    for i in range(0, len(body), 5):
+        lines.extend(splitter.feed(body[i:i + 5]))
+    lines.extend(splitter.flush())
+    assert lines == [b'{"a": 1}', b'{"b": 2}', b'{"c"']
+
+
+def test_stream_endpoints():
+    pool = clean_data(generate_raw_listings(800, seed=12))
+    car = generate_input_car(random.Random(12))
+    expected = analyze_listing(car, pool)
+    body = ndjson({"input_car": car}, pool) + b"not json\n"
+    client = app.app.test_client()
+
+    for data, headers in [(body, {}), (gzip.compress(body), {"Content-Encoding": "gzip"})]:
+        result = client.post("/api/analyze/stream", data=data, headers=headers, content_type="application/x-ndjson").get_json()
+        assert same_analysis(result, expected)
+        assert result["listings_read"] == 800 and result["invalid_records"] == 1
+        assert "market_percentiles" in result
+
+    assert client.post("/api/analyze/stream", data=ndjson({"input_car": car, "engine": "knn"}, pool)).status_code == 400
+    assert client.post("/api/analyze/stream", data=b"[1, 2]\n").status_code == 400
+    assert client.post("/api/analyze/stream", data=b"").status_code == 400
+
+    async def run():
+        client = async_app.app.test_client()
+        return await (await client.post("/api/analyze/stream", data=gzip.compress(body),
+                                        headers={"Content-Encoding": "gzip"})).get_json()
+    assert same_analysis(asyncio.run(run()), expected)
+
+
+def test_stream_rejects_a_bad_input_car():
+    """A bad input car is a 400, not a stream of invalid listings or a 500"""
+    pool = clean_data(generate_raw_listings(20, seed=14))
+    car = generate_input_car(random.Random(14))
+    client = app.app.test_client()
+    for bad in ({k: v for k, v in car.items() if k != "price"}, dict(car, price="9000"), dict(car, title=""),
+                dict(car, year="2015"), {k: v for k, v in car.items() if k != "mileage"}):
+        response = client.post("/api/analyze/stream", data=ndjson({"input_car": bad}, pool))
+        assert response.status_code == 400
+        assert "input_car" in response.get_json()["error"]
+
+    async def run():
+        client = async_app.app.test_client()
+        return await client.post("/api/analyze/stream", data=ndjson({"input_car": dict(car, price=None)}, pool))
+    assert asyncio.run(run()).status_code == 400
+
+    result = client.post("/api/analyze/stream", data=ndjson({"input_car": dict(car, year=None)}, pool)).get_json()
+    assert result["listings_read"] == 20 and result["invalid_records"] == 0
+
+
+def test_cli_listings_file(tmp_path, monkeypatch):
+    pool = clean_data(generate_raw_listings(300, seed=13))
+    path = tmp_path / "listings.ndjson.gz"
+    with gzip.open(path, "wt", encoding="utf-8") as f:
+        for car in pool:
+            f.write(json.dumps(car) + "\n")
+    monkeypatch.setattr("used_car_evaluator.scraper.scrape_listings", lambda *args, **kwargs: 1 / 0)
+    monkeypatch.chdir(tmp_path)
+
+    result = CliRunner().invoke(cli.evaluate, [
+        "--make", "Volkswagen", "--model", "Golf", "--year", "2015", "--mileage", "150000", "--price", "9000",
+        "--listings-file", str(path),
+    ])
+    assert result.exit_code == 0
+    assert "Read 300 listings (0 invalid)." in result.output
+    assert "[!] Error" not in result.output
+    assert not (tmp_path / "listings.csv").exists()
@@ -0,0 +1,57 @@
+import random
+
+from used_car_evaluator.analyzer import rank_candidates, similarity_score
+from used_car_evaluator.cleaner import clean_data
+from used_car_evaluator.knn import segment_key
+from used_car_evaluator.streaming import StreamAnalysis
+from used_car_evaluator.synthetic import generate_input_car, generate_raw_listings
+from used_car_evaluator.titles import TitleIndex, make_model, title_points
+
+
+def test_make_model():
+    assert make_model("VW Golf Plus 1.6") == ("volkswagen", "golf plus")
+    assert make_model("Mercedes-Benz C 220 CDI") == ("mercedes benz", "c")
+    assert make_model("Mercedes C klasa") == ("mercedes benz", "c")
+    assert make_model("BMW 320d Touring") == ("bmw", "320")
+    assert make_model("Mercedes-Benz C220 CDI") == ("mercedes benz", "c")
+    assert make_model("Mercedes ML350") == ("mercedes benz", "ml")
+    assert make_model("Fiat 500L") == ("fiat", "500l")
+    assert make_model("Škoda Octavia 1.9 TDI") == ("skoda", "octavia")
+    assert make_model("Audi") == ("audi", None)
+    assert make_model("") == (None, None)
+
+
+def test_title_points_match_whole_tokens():
+    """Make and model are compared as tokens: no more substring hits on longer names"""
+    assert title_points("Audi A4", "Audi A4 2.0 TDI") == 10
+    assert title_points("Audi A4", "Audi A40") == 5
+    assert title_points("Volkswagen Golf", "Volkswagen Golf Plus 1.9") == 5
+    assert title_points("Volkswagen Golf", "VW Golf 1.6") == 10
+    assert title_points("BMW 320", "BMW 320d") == 10
+    assert title_points("Mercedes Benz C 220", "Mercedes-Benz C220 CDI") == 10
+    assert title_points("Fiat 500", "Fiat 500L") == 5
+    assert title_points("Fiat 500", "Fiat 500X") == 5
+    assert title_points("Peugeot 206", "Peugeot 206cc") == 5
+    assert title_points("Kia Ceed", "Kia Pro Ceed") == 5
+    assert title_points("Opel Astra", "Fiat Punto") == 0
+
+
+def test_title_index_matches_per_candidate_scoring():
+    """Index lookups give the same points, ranking and streamed top-k as scoring titles candidate by candidate"""
+    pool = clean_data(generate_raw_listings(1500, seed=51)) + [{"title": None, "price": 5000, "year": 2010, "mileage": 1}]
+    titles = TitleIndex(pool)
+    rng = random.Random(51)
+    for _ in range(20):
+        car = generate_input_car(rng)
+        points = titles.points_for(car["title"])
+        assert all(similarity_score(car, c, points.get(i, 0)) == similarity_score(car, c) for i, c in enumerate(pool) if c["title"])
+        ranked = rank_candidates(car, pool, titles=titles)
+        assert ranked == rank_candidates(car, pool)
+        # The streaming scorer has no index and scores titles one candidate at a time
+        assert StreamAnalysis(car).add_all(pool).top() == ranked[:5]
+
+
+def test_engines_segment_on_the_same_make_model():
+    assert segment_key("VW Golf 1.9 TDI") == segment_key("Volkswagen Golf") == ("volkswagen", "golf")
+    assert segment_key("Mercedes-Benz C220") == segment_key("Mercedes Benz C 200") == ("mercedes benz", "c")
+    assert segment_key("Audi") == ("audi",) and segment_key(None) == ()
@@ -0,0 +1,72 @@
+import random
+
+from used_car_evaluator.watchlist import Watchlist
+from used_car_evaluator.analyzer import analyze_listing
+
+
+def random_listing(rng, i):
+    return {
+        "title": rng.choice(["Opel Corsa 1.3", "Opel Astra 1.6", "VW Golf 1.9"]),
+        "year": rng.randint(2005, 2015),
+        "mileage": rng.randint(50000, 250000),
+        "price": rng.randint(2000, 9000),
+        "transmission": rng.choice(["manual", "automatic"]),
+        "url": f"https://example.com/{i}",
+    }
+
+
+def test_watchlist_tracks_full_analysis():
+    """Incremental refreshes give the same results as re-analysing the whole pool"""
+    rng = random.Random(3)
+    pool = [random_listing(rng, i) for i in range(300)]
+    events = []
+    watchlist = Watchlist(pool, on_event=events.append)
+    cars = {
+        "corsa": {"title": "Opel Corsa", "year": 2010, "mileage": 150000, "price": 4000},
+        "golf": {"title": "VW Golf", "year": 2008, "mileage": 200000, "price": 6000, "transmission": "manual"},
+    }
+    for watch_id, car in cars.items():
+        watchlist.add(watch_id, car)
+
+    next_id = 300
+    for _ in range(20):
+        removed = rng.sample(pool, 15)
+        added = [random_listing(rng, next_id + j) for j in range(15)]
+        next_id += 15
+        pool = [car for car in pool if car not in removed] + added
+        watchlist.apply(added=added, removed=removed)
+        for watch_id, car in cars.items():
+            assert watchlist.result(watch_id) == analyze_listing(car, pool)
+
+    # Refreshes score roughly the change, not the pool
+    assert watchlist.stats()["listings_scored"] < 2 * (300 + 20 * 15 * 3)
+
+
+def test_watchlist_sync_emits_verdict_change():
+    pool = [{"title": "Opel Corsa", "year": 2010, "mileage": 150000, "price": 5000, "url": "a"}]
+    watchlist = Watchlist(pool)
+    watchlist.add("mine", {"title": "Opel Corsa", "year": 2010, "mileage": 150000, "price": 4500})
+    assert watchlist.verdict("mine") == "cheaper"
+
+    events = watchlist.sync([dict(pool[0], price=4000)])
+    assert [(e["watch_id"], e["previous"], e["verdict"]) for e in events] == [("mine", "cheaper", "more_expensive")]
+    assert watchlist.sync([])[0]["verdict"] == "no_matches"
+
+
+def test_watchlist_rescans_when_removals_expose_dropped_candidates():
+    """Entries pushed into a heap with room after removals can't stand in for ones it dropped"""
+    pool = [{"title": "Opel Corsa", "year": 2010, "mileage": 150000, "price": price, "url": str(price)}
+            for price in range(5000, 5007)]
+    car = {"title": "Opel Corsa", "year": 2010, "mileage": 150000, "price": 5000}
+    watchlist = Watchlist(pool, depth=6)
+    watchlist.add("mine", car)
+
+    added = [dict(pool[0], price=9000, url="9000")]
+    pool = pool[1:] + added
+    watchlist.apply(added=added, removed=["5000"])
+    assert watchlist.result("mine") == analyze_listing(car, pool)
+
+    pool = pool[1:]
+    watchlist.apply(removed=["5001"])
+    assert watchlist.result("mine") == analyze_listing(car, pool)
+    assert watchlist.stats()["full_rescans"] == 1
@@ -0,0 +1,73 @@
+import gzip
+
+import brotli
+import msgpack
+
+import app
+from used_car_evaluator import wire
+from used_car_evaluator.cleaner import clean_data
+from used_car_evaluator.synthetic import generate_raw_listings
+
+
+def test_negotiation():
+    assert wire.negotiate_format(None) == "json"
+    assert wire.negotiate_format("application/json, application/msgpack;q=0.5") == "json"
+    assert wire.negotiate_format("application/x-msgpack, */*;q=0.1") == "msgpack"
+    assert wire.negotiate_encoding("gzip, deflate, br") == "br"
+    assert wire.negotiate_encoding("gzip, br;q=0.5") == "gzip"
+    assert wire.negotiate_encoding("identity") is None
+
+
+def test_encode_decode_round_trip():
+    payload = clean_data(generate_raw_listings(50, seed=1))
+    for accept, encoding in [(None, None), ("application/msgpack", "br"), ("application/json", "gzip")]:
+        body, headers = wire.encode(payload, accept, encoding)
+        assert headers.get("Content-Encoding") == encoding
+        assert wire.decode(body, headers["Content-Type"], encoding) == payload
+    try:
+        wire.decode(b"not json", "application/json")
+        assert False, "expected ValueError"
+    except ValueError:
+        pass
+
+
+def test_scrape_fields_pagination_and_formats(monkeypatch):
+    raw = generate_raw_listings(25, seed=2)
+    calls = []
+    monkeypatch.setattr(app, "scrape_listings", lambda *args, **kwargs: calls.append(args) or raw)
+    monkeypatch.setattr(app, "scrape_cache", app.AnalysisCache(maxsize=4, ttl=60))
+    client = app.app.test_client()
+    query = {"make": "opel", "model": "corsa", "pages": 2}
+
+    full = client.post("/api/scrape", json=query).get_json()
+    assert len(full) == 25 and set(full[0]) == set(wire.LISTING_FIELDS)
+
+    pages = []
+    for page in (1, 2, 3):
+        response = client.post(f"/api/scrape?fields=title,price&page={page}&per_page=10", json=query,
+                               headers={"Accept": "application/msgpack", "Accept-Encoding": "br"})
+        body = response.data
+        if response.headers.get("Content-Encoding") == "br":
+            body = brotli.decompress(body)
+        pages.extend(msgpack.unpackb(body))
+        assert response.headers["X-Total-Count"] == "25" and response.headers["X-Total-Pages"] == "3"
+        exposed = {h.strip().lower() for h in response.headers["Access-Control-Expose-Headers"].split(",")}
+        assert {h.lower() for h in wire.PAGINATION_HEADERS} <= exposed
+    assert pages == [{"title": car["title"], "price": car["price"]} for car in full]
+    assert len(calls) == 2  # the plain request, then one scrape shared by the three pages
+
+    assert client.post("/api/scrape?fields=title,vin", json=query).status_code == 400
+    assert client.post("/api/scrape?per_page=0", json=query).status_code == 400
+
+
+def test_analyze_projects_top_similar():
+    pool = clean_data(generate_raw_listings(200, seed=3))
+    car = {"title": pool[0]["title"], "year": pool[0]["year"] or 2010, "mileage": 150000, "price": 5000}
+    client = app.app.test_client()
+    body = gzip.compress(msgpack.packb({"input_car": car, "listings": pool}))
+    response = client.post("/api/analyze?fields=title,price,url", data=body, headers={
+        "Content-Type": "application/msgpack", "Content-Encoding": "gzip",
+    })
+    result = response.get_json()
+    assert result["top_similar"]
+    assert all(set(similar) == {"title", "price", "url", "score", "match_quality"} for similar in result["top_similar"])
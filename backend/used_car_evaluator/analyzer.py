@@ -1,6 +1,13 @@
 import re
 
-def similarity_score(input_car, candidate):
+from used_car_evaluator.metrics import timer, count_listings
+from used_car_evaluator.titles import TitleIndex, title_points
+
+def similarity_score(input_car, candidate, title_match=None):
+    """
+    Scores how comparable candidate is to input_car. title_match is the candidate's
+    make/model points when already known, e.g. from a TitleIndex.
+    """
     score = 0
     match_quality = {
         'engine_type': False,
@@ -15,14 +22,10 @@ def similarity_score(input_car, candidate):
         'mileage': False
     }
     
-    # Make/model (assume in title) - highest weight
-    if input_car['title'] and candidate['title']:
-        input_parts = input_car['title'].lower().split()
-        cand_title = candidate['title'].lower()
-        if input_parts[0] in cand_title:
-            score += 5
-        if len(input_parts) > 1 and input_parts[1] in cand_title:
-            score += 5
+    # Make/model (assume in title) - highest weight, matched as whole normalized tokens
+    if title_match is None:
+        title_match = title_points(input_car['title'], candidate['title']) if input_car['title'] and candidate['title'] else 0
+    score += title_match
     
     # Engine type - very important for comparison
     if input_car.get('engine_type') and candidate.get('engine_type'):
@@ -149,25 +152,64 @@ def similarity_score(input_car, candidate):
     return score, match_quality
 
 
-def analyze_listing(input_car, listing_pool):
+TOP_K = 5
+
+ENGINES = ("rules", "knn")
+
+
+def rank_candidates(input_car, listing_pool, titles=None):
+    """
+    Scores every priced listing against input_car and returns (score, car, match_quality) tuples, best first.
+    titles is listing_pool's TitleIndex; pass a prebuilt one to reuse it across queries.
+    """
+    if titles is None:
+        with timer("title_index"):
+            titles = TitleIndex(listing_pool)
+    points = titles.points_for(input_car['title']) if input_car['title'] else {}
     # Score all candidates
     scored = []
-    for car in listing_pool:
-        score, match_quality = similarity_score(input_car, car)
-        if score > 0 and car['price']:
-            scored.append((score, car, match_quality))
+    considered = 0
+    with timer("score"):
+        for i, car in enumerate(listing_pool):
+            considered += 1
+            score, match_quality = similarity_score(input_car, car, points.get(i, 0) if car['title'] else 0)
+            if score > 0 and car['price']:
+                scored.append((score, car, match_quality))
+    count_listings("scored", considered)
+    
+    # Sort by score descending, then by price difference
+    with timer("sort"):
+        scored.sort(key=lambda x: (-x[0], abs((x[1]['price'] or 0) - (input_car['price'] or 0))))
+    return scored
+
+
+def analyze_listing(input_car, listing_pool, engine="rules", index=None):
+    """
+    Compares input_car against the most similar listings in listing_pool.
+    engine selects how the top matches are found: "rules" scores every listing with
+    similarity_score, "knn" queries a KnnIndex. Pass the engine's prebuilt index for
+    listing_pool (a TitleIndex or a KnnIndex) as index to reuse it.
+    """
+    if engine == "rules":
+        top = rank_candidates(input_car, listing_pool, titles=index)[:TOP_K]
+    elif engine == "knn":
+        from used_car_evaluator.knn import KnnIndex
+        if index is None:
+            index = KnnIndex(listing_pool)
+        top = index.top_matches(input_car, TOP_K)
+    else:
+        raise ValueError(f"Unknown analysis engine: {engine}")
     
-    if not scored:
+    if not top:
         return {
             "error": "No similar cars found (using similarity scoring).",
             "sample_listings": listing_pool[:5]
         }
-    
-    # Sort by score descending, then by price difference
-    scored.sort(key=lambda x: (-x[0], abs((x[1]['price'] or 0) - (input_car['price'] or 0))))
-    
-    # Get top matches
-    top = scored[:5]
+    return summarize_matches(input_car, top)
+
+
+def summarize_matches(input_car, top):
+    """Builds the analysis result from the top (score, car, match_quality) matches."""
     avg_price = sum(car['price'] for _, car, _ in top) / len(top)
     percent_diff = 100 * (avg_price - input_car['price']) / avg_price
     is_cheaper = input_car['price'] < avg_price
@@ -0,0 +1,221 @@
+import asyncio
+import logging
+import random
+
+from bs4 import BeautifulSoup
+from playwright.async_api import async_playwright, TimeoutError as PlaywrightTimeoutError
+
+from used_car_evaluator.dedup import Deduplicator
+from used_car_evaluator.fetcher import FetchLost, TransientFetchError
+from used_car_evaluator.metrics import timer, count_page, count_listings
+from used_car_evaluator.scraper import (
+    build_listing, build_url, check_response, empty_details, get_total_pages, is_transient_error,
+    parse_card, parse_detail_page,
+)
+
+logger = logging.getLogger(__name__)
+
+LOAD_STAGES = {"results": "results_page_load", "detail": "detail_page_load"}
+
+# Detail pages fill in some fields after load, as in scrape_detail_page
+DETAIL_SETTLE_MS = 2000
+
+
+class HtmlElement:
+    """
+    A parsed HTML element with the read-only subset of Playwright's element API the
+    scraper's parsers use (query_selector, query_selector_all, inner_text, get_attribute),
+    so they can run on HTML fetched elsewhere. CSS selectors only: XPath selectors
+    ("//...") match nothing.
+    """
+
+    def __init__(self, tag):
+        self.tag = tag
+
+    def inner_text(self):
+        return self.tag.get_text()
+
+    def get_attribute(self, name):
+        return self.tag.get(name)
+
+    def query_selector(self, selector):
+        if selector.startswith("//"):
+            return None
+        found = self.tag.select_one(selector)
+        return HtmlElement(found) if found is not None else None
+
+    def query_selector_all(self, selector):
+        if selector.startswith("//"):
+            return []
+        return [HtmlElement(tag) for tag in self.tag.select(selector)]
+
+
+class HtmlPage(HtmlElement):
+    """A whole page's HTML, standing in for a loaded Playwright page."""
+
+    def __init__(self, html):
+        super().__init__(BeautifulSoup(html, "html.parser"))
+        self.html = html
+
+    def content(self):
+        return self.html
+
+
+async def load_html(page, url, kind, selector, settle_ms=0):
+    """Loads a page in a browser tab and returns its HTML as an HtmlPage. Raises on timeout or error."""
+    try:
+        with timer(LOAD_STAGES[kind]):
+            response = await page.goto(url, timeout=60000)
+            check_response(response, url)
+            await page.wait_for_selector(selector, timeout=15000)
+            if settle_ms:
+                await page.wait_for_timeout(settle_ms)
+            html = await page.content()
+    except TransientFetchError as e:
+        count_page(kind, f"http_{e.status}")
+        raise
+    except PlaywrightTimeoutError:
+        count_page(kind, "timeout")
+        raise
+    except Exception:
+        count_page(kind, "error")
+        raise
+    count_page(kind, "ok")
+    return HtmlPage(html)
+
+
+class AsyncFetcher:
+    """
+    Page loads on a pool of at most `concurrency` browser tabs, retrying transient
+    failures with the same jittered exponential backoff as FetchScheduler.
+    """
+
+    def __init__(self, browser, concurrency=4, max_retries=3, backoff_base=1.0, backoff_cap=30.0,
+                 sleep=asyncio.sleep, rng=None):
+        self.browser = browser
+        self.concurrency = concurrency
+        self.max_retries = max_retries
+        self.backoff_base = backoff_base
+        self.backoff_cap = backoff_cap
+        self.sleep = sleep
+        self.rng = rng or random.Random()
+        self.tabs = asyncio.Queue()
+        self.opened = 0
+        self.counts = {"requests": 0, "retries": 0, "pages_retried": 0, "pages_lost": 0,
+                       "details_retried": 0, "details_lost": 0}
+
+    async def _tab(self):
+        if self.tabs.empty() and self.opened < self.concurrency:
+            self.opened += 1
+            return await self.browser.new_page()
+        return await self.tabs.get()
+
+    def backoff(self, attempt):
+        delay = min(self.backoff_cap, self.backoff_base * 2 ** (attempt - 1))
+        return delay * self.rng.uniform(0.5, 1.5)
+
+    async def fetch(self, url, kind, selector, settle_ms=0):
+        """Returns the page as an HtmlPage. Raises FetchLost once it gives up."""
+        label = "pages" if kind == "results" else "details"
+        attempt = 0
+        while True:
+            tab = await self._tab()
+            try:
+                self.counts["requests"] += 1
+                return await load_html(tab, url, kind, selector, settle_ms)
+            except Exception as e:
+                if not is_transient_error(e) or attempt >= self.max_retries:
+                    self.counts[f"{label}_lost"] += 1
+                    raise FetchLost(f"{kind} {url}: {e}") from e
+                attempt += 1
+                self.counts["retries"] += 1
+                if attempt == 1:
+                    self.counts[f"{label}_retried"] += 1
+            finally:
+                self.tabs.put_nowait(tab)
+            await self.sleep(self.backoff(attempt))
+
+    def stats(self):
+        return {**self.counts, "tabs": self.opened}
+
+
+async def scrape_listings_async(make, model, price_to=None, pages=None, base_url=None,
+                                concurrency=4, max_retries=3, stats=None, browser=None):
+    """
+    Async counterpart of scrape_listings for the async server: results and detail pages
+    are loaded concurrently on up to `concurrency` tabs of one browser, and parsed from
+    their HTML with the same card, detail and dedup logic. Launches a headless Chromium
+    unless a browser is passed in.
+    """
+    if browser is None:
+        async with async_playwright() as playwright:
+            with timer("browser_launch"):
+                browser = await playwright.chromium.launch(headless=True)
+            try:
+                return await scrape_listings_async(make, model, price_to, pages, base_url,
+                                                   concurrency, max_retries, stats, browser)
+            finally:
+                await browser.close()
+
+    fetcher = AsyncFetcher(browser, concurrency, max_retries)
+    dedup = Deduplicator()
+
+    async def scrape_ad(card):
+        details = empty_details()
+        if card["url"]:
+            try:
+                with timer("detail_fetch"):
+                    page = await fetcher.fetch(card["url"], "detail", "body", DETAIL_SETTLE_MS)
+                with timer("parse_detail"):
+                    details = parse_detail_page(page)
+            except FetchLost as e:
+                logger.warning("Gave up on detail page: %s", e)
+            except Exception as e:
+                logger.debug("Error parsing detail page %s: %s", card["url"], e)
+        return build_listing(card, details)
+
+    async def scrape_page(number):
+        page = await fetcher.fetch(build_url(make, model, price_to, number, base_url), "results", "a.ga-title")
+        cards = []
+        for ad in page.query_selector_all("article.classified"):
+            try:
+                with timer("parse_ad"):
+                    card = parse_card(ad, base_url)
+            except Exception as e:
+                logger.debug("Error parsing ad: %s", e)
+                continue
+            if dedup.check(card):
+                logger.debug("Skipping duplicate ad %s", card["url"])
+                continue
+            cards.append(card)
+        listings = await asyncio.gather(*(scrape_ad(card) for card in cards))
+        return list(listings), get_total_pages(page)
+
+    all_listings = []
+    try:
+        # The first page also tells us how many pages there are
+        first_listings, detected_pages = await scrape_page(1)
+    except FetchLost as e:
+        logger.warning("Could not load first page: %s", e)
+    else:
+        total_pages = detected_pages if pages is None else pages
+        logger.debug("Detected %s pages of results.", total_pages)
+        if total_pages >= 1:
+            all_listings.extend(first_listings)
+        numbers = range(2, total_pages + 1)
+        results = await asyncio.gather(*(scrape_page(n) for n in numbers), return_exceptions=True)
+        for number, result in zip(numbers, results):
+            if isinstance(result, BaseException):
+                logger.warning("Lost page %s after retries: %s", number, result)
+            else:
+                all_listings.extend(result[0])
+
+    run_stats = dict(fetcher.stats(), **dedup.stats())
+    count_page("results", "lost", run_stats["pages_lost"])
+    count_page("detail", "lost", run_stats["details_lost"])
+    count_listings("duplicate", run_stats["duplicates"])
+    if stats is not None:
+        stats.update(run_stats)
+        stats["listings"] = len(all_listings)
+    count_listings("scraped", len(all_listings))
+    return all_listings
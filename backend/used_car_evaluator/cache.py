@@ -0,0 +1,161 @@
+import hashlib
+import json
+import threading
+import time
+from collections import OrderedDict
+
+DEFAULT_MAXSIZE = 512
+DEFAULT_TTL = 600  # seconds
+
+
+# Fields similarity_score reads as input_car[name], so a missing one isn't the same as an empty one
+REQUIRED_FIELDS = ("title", "year", "mileage", "price")
+
+
+def canonical_car(input_car):
+    """
+    Normalizes an input car only where the scorer can't tell the difference, so trivially
+    different submissions share a cache key but cars that score differently never do:
+    the title ignores case and extra whitespace, the color ignores case, keywords are
+    compared as a set, and empty optional fields count as missing.
+    """
+    canonical = {}
+    for key, value in input_car.items():
+        if key not in REQUIRED_FIELDS and not value:
+            continue
+        if key == "title" and isinstance(value, str):
+            value = " ".join(value.split()).lower()
+        elif key == "color" and isinstance(value, str):
+            value = value.lower()
+        elif key == "keywords" and isinstance(value, list):
+            value = sorted(set(value), key=str)
+        canonical[key] = value
+    return canonical
+
+
+def car_key(input_car):
+    blob = json.dumps(canonical_car(input_car), sort_keys=True, ensure_ascii=False, default=str)
+    return hashlib.sha256(blob.encode("utf-8")).hexdigest()
+
+
+def pool_version(listings):
+    """
+    Content version of a listing pool: a hash of every listing, in order. It serializes
+    the whole pool, which can cost more than analyzing it, so it is only the fallback for
+    callers with no cheaper version (a caller-supplied one, body_version, or ListingStore.version_for).
+    """
+    h = hashlib.sha256()
+    h.update(json.dumps(list(listings), sort_keys=True, ensure_ascii=False, default=str).encode("utf-8"))
+    return h.hexdigest()
+
+
+def body_version(body):
+    """Version of a pool sent in a request body: a hash of the raw body bytes, already in memory."""
+    return "body:" + hashlib.sha256(body).hexdigest()
+
+
+class AnalysisCache:
+    """
+    Bounded LRU cache of analyze_listing results with a per-entry TTL.
+    Entries are keyed on the canonical input car, the pool version and the engine,
+    so a changed pool never serves a stale result. For named pools (pool_id), entries
+    of the previous version are dropped as soon as a new version of that pool is seen.
+    """
+
+    def __init__(self, maxsize=DEFAULT_MAXSIZE, ttl=DEFAULT_TTL, clock=time.monotonic):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self.clock = clock
+        self.entries = OrderedDict()
+        self.lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.expirations = 0
+        self.invalidations = 0
+        self.pool_versions = {}
+
+    def key(self, input_car, version, engine="rules"):
+        return (car_key(input_car), version, engine)
+
+    def get(self, key):
+        with self.lock:
+            entry = self.entries.get(key)
+            if entry is None:
+                self.misses += 1
+                return None
+            expires, result = entry
+            if expires <= self.clock():
+                del self.entries[key]
+                self.expirations += 1
+                self.misses += 1
+                return None
+            self.entries.move_to_end(key)
+            self.hits += 1
+            return result
+
+    def put(self, key, result):
+        with self.lock:
+            self.entries[key] = (self.clock() + self.ttl, result)
+            self.entries.move_to_end(key)
+            while len(self.entries) > self.maxsize:
+                self.entries.popitem(last=False)
+                self.evictions += 1
+
+    def invalidate_pool(self, version):
+        """Drops every cached result computed against the given pool version."""
+        with self.lock:
+            return self._invalidate(version)
+
+    def _invalidate(self, version):
+        stale = [key for key in self.entries if key[1] == version]
+        for key in stale:
+            del self.entries[key]
+        self.invalidations += len(stale)
+        return len(stale)
+
+    def observe_pool(self, pool_id, version):
+        """Records the current version of a named pool, dropping results for its previous version."""
+        with self.lock:
+            previous = self.pool_versions.get(pool_id)
+            if previous != version:
+                self.pool_versions[pool_id] = version
+                if previous is not None:
+                    self._invalidate(previous)
+
+    def get_or_compute(self, input_car, listings, compute, engine="rules", version=None, pool_id=None):
+        """
+        Returns the cached result for input_car against listings, calling compute() on a miss.
+        Pass a cheap version of the pool where there is one (listings is then not read);
+        it defaults to the content hash of listings.
+        """
+        if version is None:
+            version = pool_version(listings)
+        if pool_id is not None:
+            self.observe_pool(pool_id, version)
+        key = self.key(input_car, version, engine)
+        result = self.get(key)
+        if result is None:
+            result = compute()
+            self.put(key, result)
+        return result
+
+    def clear(self):
+        with self.lock:
+            self.entries.clear()
+            self.pool_versions.clear()
+
+    def stats(self):
+        with self.lock:
+            lookups = self.hits + self.misses
+            return {
+                "size": len(self.entries),
+                "maxsize": self.maxsize,
+                "ttl": self.ttl,
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_rate": round(self.hits / lookups, 3) if lookups else None,
+                "evictions": self.evictions,
+                "expirations": self.expirations,
+                "invalidations": self.invalidations,
+            }
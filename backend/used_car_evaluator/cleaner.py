@@ -1,6 +1,22 @@
+import gc
+import itertools
 import re
+from contextlib import contextmanager
+
+from used_car_evaluator.metrics import timer, count_listings
+
+# Output fields of clean_listing, in order
+CLEANED_FIELDS = (
+    "title", "year", "mileage", "price", "engine", "engine_type", "engine_size",
+    "transmission", "body_type", "power", "color", "doors", "seats", "city",
+    "seller_type", "fuel_type", "seller_info", "keywords", "url",
+)
+
+YEAR_IN_TITLE_RE = re.compile(r"(19|20)\d{2}")
 
 def parse_int(value):
+    if isinstance(value, int):
+        return value
     if not value:
         return None
     value = value.replace(".", "").replace(",", "").replace("€", "").replace("km", "").strip()
@@ -9,113 +25,262 @@ def parse_int(value):
         return int(digits[0])
     return None
 
-def clean_data(raw_listings):
+def clean_data(raw_listings, sketches=None):
     """
     Cleans raw listings: parses price, mileage, year into integers.
     Also normalizes engine, transmission, city, seller_type, fuel_type, seller_info, url.
+    If sketches (a SegmentSketches) is given, each cleaned listing's price is recorded in it.
     Returns a list of dicts with cleaned fields.
     """
+    with timer("clean"):
+        cleaned = _clean_listings(raw_listings, sketches)
+    count_listings("cleaned", len(cleaned))
+    return cleaned
+
+
+def _clean_listings(raw_listings, sketches):
     cleaned = []
     for item in raw_listings:
-        title = item.get("title")
-        year = parse_int(item.get("year"))
-        mileage = parse_int(item.get("mileage"))
-        price = parse_int(item.get("price"))
-        
-        # Clean engine info
-        engine = item.get("engine")
-        if engine:
-            engine = engine.strip().upper()
-        
-        engine_type = item.get("engine_type")
-        if engine_type:
-            engine_type = engine_type.strip().lower()
-        
-        engine_size = item.get("engine_size")
-        if engine_size:
-            engine_size = engine_size.strip()
-        
-        # Clean transmission
-        transmission = item.get("transmission")
-        if transmission:
-            transmission = transmission.strip().lower()
-            if transmission in ['automatski', 'automatic', 'auto']:
-                transmission = 'automatic'
-            elif transmission in ['manuelni', 'manual', 'manuel']:
-                transmission = 'manual'
-        
-        # Clean body type
-        body_type = item.get("body_type")
-        if body_type:
-            body_type = body_type.strip().lower()
-        
-        # Clean other fields
-        city = item.get("city")
-        if city:
-            city = city.strip().capitalize()
-        
-        seller_type = item.get("seller_type")
-        if seller_type:
-            seller_type = seller_type.strip().capitalize()
-        
-        fuel_type = item.get("fuel_type")
-        if fuel_type:
-            fuel_type = fuel_type.strip().lower()
-        
-        seller_info = item.get("seller_info")
-        if seller_info:
-            seller_info = seller_info.strip()
-        
-        url = item.get("url")
-        
-        # Clean new fields
-        power = item.get("power")
-        if power:
-            power = power.strip()
-        
-        color = item.get("color")
-        if color:
-            color = color.strip().capitalize()
-        
-        doors = item.get("doors")
-        if doors:
-            doors = doors.strip()
-        
-        seats = item.get("seats")
-        if seats:
-            seats = seats.strip()
-        
-        # Clean keywords
-        keywords = item.get("keywords", [])
-        if keywords:
-            keywords = [kw.strip().lower() for kw in keywords if kw.strip()]
-        
-        # Try to extract year from title if missing
-        if not year and title:
-            year_match = re.search(r"(19|20)\d{2}", title)
-            if year_match:
-                year = int(year_match.group(0))
-        
-        cleaned.append({
-            "title": title,
-            "year": year,
-            "mileage": mileage,
-            "price": price,
-            "engine": engine,
-            "engine_type": engine_type,
-            "engine_size": engine_size,
-            "transmission": transmission,
-            "body_type": body_type,
-            "power": power,
-            "color": color,
-            "doors": doors,
-            "seats": seats,
-            "city": city,
-            "seller_type": seller_type,
-            "fuel_type": fuel_type,
-            "seller_info": seller_info,
-            "keywords": keywords,
-            "url": url
-        })
+        cleaned.append(clean_listing(item))
+        if sketches is not None:
+            sketches.add(cleaned[-1])
     return cleaned
 
+
+def clean_listing(item):
+    """Cleans one raw listing. Already-cleaned listings pass through unchanged."""
+    title = item.get("title")
+    year = parse_int(item.get("year"))
+    mileage = parse_int(item.get("mileage"))
+    price = parse_int(item.get("price"))
+    
+    # Clean engine info
+    engine = item.get("engine")
+    if engine:
+        engine = engine.strip().upper()
+    
+    engine_type = item.get("engine_type")
+    if engine_type:
+        engine_type = engine_type.strip().lower()
+    
+    engine_size = item.get("engine_size")
+    if engine_size:
+        engine_size = engine_size.strip()
+    
+    # Clean transmission
+    transmission = item.get("transmission")
+    if transmission:
+        transmission = transmission.strip().lower()
+        if transmission in ['automatski', 'automatic', 'auto']:
+            transmission = 'automatic'
+        elif transmission in ['manuelni', 'manual', 'manuel']:
+            transmission = 'manual'
+    
+    # Clean body type
+    body_type = item.get("body_type")
+    if body_type:
+        body_type = body_type.strip().lower()
+    
+    # Clean other fields
+    city = item.get("city")
+    if city:
+        city = city.strip().capitalize()
+    
+    seller_type = item.get("seller_type")
+    if seller_type:
+        seller_type = seller_type.strip().capitalize()
+    
+    fuel_type = item.get("fuel_type")
+    if fuel_type:
+        fuel_type = fuel_type.strip().lower()
+    
+    seller_info = item.get("seller_info")
+    if seller_info:
+        seller_info = seller_info.strip()
+    
+    url = item.get("url")
+    
+    # Clean new fields
+    power = item.get("power")
+    if power:
+        power = power.strip()
+    
+    color = item.get("color")
+    if color:
+        color = color.strip().capitalize()
+    
+    doors = item.get("doors")
+    if doors:
+        doors = doors.strip()
+    
+    seats = item.get("seats")
+    if seats:
+        seats = seats.strip()
+    
+    # Clean keywords
+    keywords = item.get("keywords", [])
+    if keywords:
+        keywords = [kw.strip().lower() for kw in keywords if kw.strip()]
+    
+    # Try to extract year from title if missing
+    if not year and title:
+        year_match = YEAR_IN_TITLE_RE.search(title)
+        if year_match:
+            year = int(year_match.group(0))
+    
+    return {
+        "title": title,
+        "year": year,
+        "mileage": mileage,
+        "price": price,
+        "engine": engine,
+        "engine_type": engine_type,
+        "engine_size": engine_size,
+        "transmission": transmission,
+        "body_type": body_type,
+        "power": power,
+        "color": color,
+        "doors": doors,
+        "seats": seats,
+        "city": city,
+        "seller_type": seller_type,
+        "fuel_type": fuel_type,
+        "seller_info": seller_info,
+        "keywords": keywords,
+        "url": url
+    }
+
+
+
+def _strip_upper(value):
+    return value.strip().upper() if value else value
+
+def _strip_lower(value):
+    return value.strip().lower() if value else value
+
+def _strip_capitalize(value):
+    return value.strip().capitalize() if value else value
+
+def _strip(value):
+    return value.strip() if value else value
+
+def _transmission(value):
+    if not value:
+        return value
+    value = value.strip().lower()
+    if value in ['automatski', 'automatic', 'auto']:
+        return 'automatic'
+    if value in ['manuelni', 'manual', 'manuel']:
+        return 'manual'
+    return value
+
+def _year_from_title(title):
+    year_match = YEAR_IN_TITLE_RE.search(title)
+    return int(year_match.group(0)) if year_match else None
+
+# How clean_listing treats each string field, and the raw value types it accepts
+NUMERIC_CLEANERS = {"year": parse_int, "mileage": parse_int, "price": parse_int}
+STRING_CLEANERS = {
+    "engine": _strip_upper, "engine_type": _strip_lower, "engine_size": _strip,
+    "transmission": _transmission, "body_type": _strip_lower, "power": _strip,
+    "color": _strip_capitalize, "doors": _strip, "seats": _strip, "city": _strip_capitalize,
+    "seller_type": _strip_capitalize, "fuel_type": _strip_lower, "seller_info": _strip,
+}
+NONE_TYPE = type(None)
+
+
+def _map_distinct(values, fn):
+    """[fn(v) for v in values], calling fn once per distinct value."""
+    # Imported here so the scraper and CLI don't pay for pandas at startup
+    import numpy as np
+    import pandas as pd
+    codes, uniques = pd.factorize(np.array(values, dtype=object))
+    # None gets code -1, which take() reads from the last slot
+    mapped = np.empty(len(uniques) + 1, dtype=object)
+    mapped[:] = [fn(value) for value in uniques] + [fn(None) if (codes < 0).any() else None]
+    return mapped.take(codes).tolist()
+
+
+def _batch_columns(raw_listings):
+    """
+    Cleaned columns {field: values} for raw listings, or None if some value has a type
+    clean_listing doesn't expect (it would raise, or treat it in ways the batch path doesn't).
+    """
+    columns = {}
+    titles = [item.get("title") for item in raw_listings]
+    if not set(map(type, titles)) <= {str, NONE_TYPE}:
+        return None
+    for name, fn in NUMERIC_CLEANERS.items():
+        values = [item.get(name) for item in raw_listings]
+        if not set(map(type, values)) <= {str, int, NONE_TYPE}:
+            return None
+        columns[name] = _map_distinct(values, fn)
+    for name, fn in STRING_CLEANERS.items():
+        values = [item.get(name) for item in raw_listings]
+        if not set(map(type, values)) <= {str, NONE_TYPE}:
+            return None
+        columns[name] = _map_distinct(values, fn)
+
+    keywords = [item.get("keywords", []) for item in raw_listings]
+    if not set(map(type, keywords)) <= {list, NONE_TYPE}:
+        return None
+    distinct = set(itertools.chain.from_iterable(kws for kws in keywords if kws))
+    if not set(map(type, distinct)) <= {str}:
+        return None
+    # Each distinct keyword cleaned once; "" marks the ones clean_listing drops
+    cleaned_keywords = {kw: kw.strip().lower() if kw.strip() else "" for kw in distinct}
+    if all(cleaned == kw for kw, cleaned in cleaned_keywords.items()):
+        # Already clean, as in re-cleaned archives and most scrapes: copying the lists is enough
+        columns["keywords"] = [kws[:] if kws else kws for kws in keywords]
+    else:
+        lookup = cleaned_keywords.__getitem__
+        columns["keywords"] = [list(filter(None, map(lookup, kws))) if kws else kws for kws in keywords]
+
+    # Backfill missing years from the title, once per distinct title
+    years = columns["year"]
+    missing = [i for i, year in enumerate(years) if not year and titles[i]]
+    if missing:
+        for i, year in zip(missing, _map_distinct([titles[i] for i in missing], _year_from_title)):
+            if year:
+                years[i] = year
+    columns["title"] = titles
+    columns["url"] = [item.get("url") for item in raw_listings]
+    return columns
+
+
+@contextmanager
+def paused_gc():
+    """
+    Pauses the cyclic garbage collector for the block. Building millions of listing dicts
+    otherwise triggers a GC pass every few hundred of them, none of which frees anything.
+    The pause is process-wide, so it's for batch jobs that own their process (the bulk
+    importer, benchmarks), never for code running inside a server.
+    """
+    was_enabled = gc.isenabled()
+    gc.disable()
+    try:
+        yield
+    finally:
+        if was_enabled:
+            gc.enable()
+
+
+def clean_data_batch(raw_listings, sketches=None):
+    """
+    clean_data for large batches: each field is cleaned column-wise, once per distinct value,
+    and the results broadcast back to the rows. Output is identical to clean_data's.
+    Batches with values of unexpected types are cleaned by clean_data instead.
+    Batch jobs can run it under paused_gc() for a further speedup.
+    """
+    raw_listings = list(raw_listings)
+    with timer("clean"):
+        columns = _batch_columns(raw_listings) if raw_listings else {name: [] for name in CLEANED_FIELDS}
+        if columns is None:
+            cleaned = [clean_listing(item) for item in raw_listings]
+        else:
+            cleaned = [dict(zip(CLEANED_FIELDS, row)) for row in zip(*(columns[name] for name in CLEANED_FIELDS))]
+        if sketches is not None:
+            for car in cleaned:
+                sketches.add(car)
+    count_listings("cleaned", len(cleaned))
+    return cleaned
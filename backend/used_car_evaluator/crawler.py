@@ -0,0 +1,344 @@
+"""
+Catalog-wide background crawler.
+
+    python -m used_car_evaluator.crawler seed --catalog catalog.csv
+    python -m used_car_evaluator.crawler run --workers 4 --refresh-hours 12
+    python -m used_car_evaluator.crawler status
+
+The catalog is split into make/model/page work units kept in a SQLite queue. Worker
+processes lease units, scrape them and write the cleaned listings to a ListingStore,
+which /api/analyze reads when it is not sent listings. A worker that dies leaves its
+lease to expire, after which the unit is handed out again.
+"""
+import csv
+import logging
+import multiprocessing
+import os
+import threading
+import time
+
+import click
+
+from used_car_evaluator.cleaner import clean_data
+from used_car_evaluator.dedup import Deduplicator, normalize_title
+from used_car_evaluator.fetcher import FetchScheduler
+from used_car_evaluator.scraper import build_url, close_browser, open_browser, scrape_results_page
+from used_car_evaluator.store import LISTING_STORE, ListingStore, connect, transaction
+
+logger = logging.getLogger(__name__)
+
+CRAWL_QUEUE = "crawl_queue.db"
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS segments (
+    make TEXT NOT NULL,
+    model TEXT NOT NULL,
+    priority REAL NOT NULL DEFAULT 0,
+    pages INTEGER,
+    PRIMARY KEY (make, model)
+);
+CREATE TABLE IF NOT EXISTS work_units (
+    id INTEGER PRIMARY KEY,
+    make TEXT NOT NULL,
+    model TEXT NOT NULL,
+    page INTEGER NOT NULL,
+    state TEXT NOT NULL DEFAULT 'pending',
+    attempts INTEGER NOT NULL DEFAULT 0,
+    lease_owner TEXT,
+    lease_until REAL,
+    not_before REAL NOT NULL DEFAULT 0,
+    done_at REAL,
+    last_error TEXT,
+    UNIQUE (make, model, page)
+);
+CREATE INDEX IF NOT EXISTS work_units_state ON work_units (state, not_before);
+"""
+
+UNIT_FIELDS = ("id", "make", "model", "page", "attempts")
+
+
+class WorkQueue:
+    """
+    Persistent make/model/page work queue with leases, retries and segment priorities.
+
+    Units are pending, leased, done or failed. claim() hands out the pending unit of the
+    highest-priority segment (lowest page first), or a leased one whose lease has expired.
+    Completing page 1 of a segment enqueues its remaining pages.
+    """
+
+    def __init__(self, path=CRAWL_QUEUE, clock=time.time):
+        self.path = path
+        self.clock = clock
+        self.conn = connect(path)
+        self.conn.executescript(SCHEMA)
+        self.lock = threading.Lock()
+
+    def add_segment(self, make, model, priority=0):
+        """Adds a make/model to the catalog with its first results page. Existing segments are left as they are."""
+        make, model = make.strip().lower(), model.strip().lower()
+        with self.lock, transaction(self.conn):
+            self.conn.execute(
+                "INSERT OR IGNORE INTO segments (make, model, priority) VALUES (?, ?, ?)", (make, model, priority)
+            )
+            self.conn.execute("INSERT OR IGNORE INTO work_units (make, model, page) VALUES (?, ?, 1)", (make, model))
+
+    def bump(self, title, amount=1):
+        """
+        Raises the priority of the segments an input car title belongs to (e.g. "Opel Corsa 1.3"),
+        so their pages are crawled and refreshed ahead of colder ones. Returns the segments bumped.
+        """
+        key = normalize_title(title)
+        with self.lock, transaction(self.conn):
+            segments = self.conn.execute("SELECT make, model FROM segments").fetchall()
+            hot = [(make, model) for make, model in segments
+                   if (key + " ").startswith(normalize_title(f"{make} {model}") + " ")]
+            self.conn.executemany(
+                "UPDATE segments SET priority = priority + ? WHERE make = ? AND model = ?",
+                [(amount, make, model) for make, model in hot],
+            )
+        return hot
+
+    def claim(self, worker, lease=300.0):
+        """Leases the next unit to `worker` for `lease` seconds. Returns the unit as a dict, or None."""
+        now = self.clock()
+        with self.lock, transaction(self.conn):
+            row = self.conn.execute(
+                """SELECT w.id, w.make, w.model, w.page, w.attempts FROM work_units w
+                   JOIN segments s ON s.make = w.make AND s.model = w.model
+                   WHERE (w.state = 'pending' AND w.not_before <= ?)
+                      OR (w.state = 'leased' AND w.lease_until < ?)
+                   ORDER BY s.priority DESC, w.page, w.id
+                   LIMIT 1""",
+                (now, now),
+            ).fetchone()
+            if row is None:
+                return None
+            self.conn.execute(
+                """UPDATE work_units SET state = 'leased', lease_owner = ?, lease_until = ?, attempts = attempts + 1
+                   WHERE id = ?""",
+                (worker, now + lease, row[0]),
+            )
+        unit = dict(zip(UNIT_FIELDS, row))
+        unit["attempts"] += 1
+        return unit
+
+    def complete(self, unit, total_pages=None):
+        """
+        Marks a unit done. For page 1, total_pages (from the pagination) sets the segment's
+        page count: missing pages are enqueued and pages past the end are dropped.
+        """
+        now = self.clock()
+        with self.lock, transaction(self.conn):
+            self.conn.execute(
+                """UPDATE work_units SET state = 'done', done_at = ?, attempts = 0, lease_owner = NULL,
+                       lease_until = NULL, last_error = NULL
+                   WHERE id = ?""",
+                (now, unit["id"]),
+            )
+            if unit["page"] == 1 and total_pages:
+                make, model = unit["make"], unit["model"]
+                self.conn.execute(
+                    "UPDATE segments SET pages = ? WHERE make = ? AND model = ?", (total_pages, make, model)
+                )
+                self.conn.executemany(
+                    "INSERT OR IGNORE INTO work_units (make, model, page) VALUES (?, ?, ?)",
+                    [(make, model, page) for page in range(2, total_pages + 1)],
+                )
+                self.conn.execute(
+                    "DELETE FROM work_units WHERE make = ? AND model = ? AND page > ?", (make, model, total_pages)
+                )
+
+    def fail(self, unit, error, max_attempts=5, backoff=60.0):
+        """Puts a failed unit back with exponential backoff, or marks it failed after max_attempts."""
+        now = self.clock()
+        with self.lock, transaction(self.conn):
+            if unit["attempts"] >= max_attempts:
+                self.conn.execute(
+                    """UPDATE work_units SET state = 'failed', done_at = ?, lease_owner = NULL,
+                           lease_until = NULL, last_error = ?
+                       WHERE id = ?""",
+                    (now, str(error), unit["id"]),
+                )
+                return
+            self.conn.execute(
+                """UPDATE work_units SET state = 'pending', lease_owner = NULL, lease_until = NULL,
+                       not_before = ?, last_error = ?
+                   WHERE id = ?""",
+                (now + backoff * 2 ** (unit["attempts"] - 1), str(error), unit["id"]),
+            )
+
+    def refresh(self, max_age):
+        """
+        Requeues done and failed units last finished more than max_age seconds ago; hot segments
+        come round sooner, after max_age / (1 + priority). Returns the count.
+        """
+        now = self.clock()
+        with self.lock, transaction(self.conn):
+            return self.conn.execute(
+                """UPDATE work_units SET state = 'pending', attempts = 0, not_before = 0
+                   WHERE state IN ('done', 'failed')
+                     AND done_at < ? - ? / (1 + (SELECT MAX(priority, 0) FROM segments s
+                                               WHERE s.make = work_units.make AND s.model = work_units.model))""",
+                (now, max_age),
+            ).rowcount
+
+    def stats(self):
+        with self.lock:
+            states = dict(self.conn.execute("SELECT state, COUNT(*) FROM work_units GROUP BY state").fetchall())
+            segments = self.conn.execute("SELECT COUNT(*) FROM segments").fetchone()[0]
+        return {
+            "segments": segments,
+            **{state: states.get(state, 0) for state in ("pending", "leased", "done", "failed")},
+        }
+
+    def close(self):
+        self.conn.close()
+
+
+def read_catalog(path):
+    """(make, model) pairs from a CSV file with make and model columns."""
+    with open(path, newline="", encoding="utf-8") as f:
+        return [(row["make"], row["model"]) for row in csv.DictReader(f) if row.get("make") and row.get("model")]
+
+
+class CrawlWorker:
+    """
+    One crawler worker: leases units from the queue, scrapes them with its own browser
+    and upserts the cleaned listings into the store. Meant to run in its own process.
+    """
+
+    def __init__(self, queue_path=CRAWL_QUEUE, store_path=LISTING_STORE, worker_id=None, base_url=None,
+                 lease=300.0, host_rps=None, max_retries=3, max_attempts=5, refresh_age=None, poll=5.0):
+        self.queue_path = queue_path
+        self.store_path = store_path
+        self.worker_id = worker_id or f"{os.uname().nodename}:{os.getpid()}"
+        self.base_url = base_url
+        self.lease = lease
+        self.host_rps = host_rps
+        self.max_retries = max_retries
+        self.max_attempts = max_attempts
+        self.refresh_age = refresh_age
+        self.poll = poll
+        self.counts = {"units": 0, "failed": 0, "listings": 0}
+
+    def process(self, ctx, queue, store, unit):
+        url = build_url(unit["make"], unit["model"], None, unit["page"], self.base_url)
+        scheduler = FetchScheduler(host_rps=self.host_rps, max_retries=self.max_retries)
+        listings, total_pages = scrape_results_page(ctx, url, self.base_url, scheduler, Deduplicator())
+        written = store.upsert(clean_data(listings), unit["make"], unit["model"])
+        queue.complete(unit, total_pages if unit["page"] == 1 else None)
+        logger.info("%s: %s %s page %s, %s listings", self.worker_id, unit["make"], unit["model"], unit["page"], written)
+        return written
+
+    def run(self, max_units=None, idle_exit=False):
+        """Works until max_units are processed, or (with idle_exit) until the queue is drained."""
+        queue = WorkQueue(self.queue_path)
+        store = ListingStore(self.store_path)
+        ctx = None
+        try:
+            while max_units is None or self.counts["units"] < max_units:
+                unit = queue.claim(self.worker_id, self.lease)
+                if unit is None:
+                    if self.refresh_age is not None and queue.refresh(self.refresh_age):
+                        continue
+                    # Another worker may still be on a page 1 that will enqueue more pages
+                    if idle_exit and not queue.stats()["leased"]:
+                        break
+                    time.sleep(self.poll)
+                    continue
+                if ctx is None:
+                    ctx = open_browser()
+                try:
+                    self.counts["listings"] += self.process(ctx, queue, store, unit)
+                except Exception as e:
+                    logger.warning("%s: %s %s page %s failed: %s", self.worker_id, unit["make"], unit["model"], unit["page"], e)
+                    queue.fail(unit, e, self.max_attempts)
+                    self.counts["failed"] += 1
+                self.counts["units"] += 1
+        finally:
+            if ctx is not None:
+                close_browser(ctx)
+            queue.close()
+            store.close()
+        return self.counts
+
+
+def _worker_main(kwargs, idle_exit):
+    logging.basicConfig(level=os.environ.get("LOG_LEVEL", "INFO").upper(), format="[%(levelname)s] %(name)s: %(message)s")
+    CrawlWorker(**kwargs).run(idle_exit=idle_exit)
+
+
+def run_crawler(workers=2, idle_exit=False, **worker_kwargs):
+    """Runs `workers` CrawlWorker processes until they finish (idle_exit) or are interrupted."""
+    processes = [
+        multiprocessing.Process(target=_worker_main, args=(dict(worker_kwargs, worker_id=f"worker-{i}"), idle_exit))
+        for i in range(workers)
+    ]
+    for p in processes:
+        p.start()
+    try:
+        for p in processes:
+            p.join()
+    except KeyboardInterrupt:
+        # Leased units are picked up again once their leases expire
+        for p in processes:
+            p.terminate()
+        for p in processes:
+            p.join()
+
+
+@click.group()
+def main():
+    logging.basicConfig(level=os.environ.get("LOG_LEVEL", "INFO").upper(), format="[%(levelname)s] %(name)s: %(message)s")
+
+
+@main.command()
+@click.option("--queue", "queue_path", default=CRAWL_QUEUE, show_default=True)
+@click.option("--catalog", default=None, help="CSV file with make and model columns.")
+@click.option("--segment", "segments", multiple=True, help="A make/model to add, e.g. 'Opel/Corsa' (repeatable).")
+@click.option("--priority", default=0.0, show_default=True)
+def seed(queue_path, catalog, segments, priority):
+    """Adds make/model segments to the crawl queue."""
+    pairs = read_catalog(catalog) if catalog else []
+    for segment in segments:
+        make, _, model = segment.partition("/")
+        if not model:
+            raise click.BadParameter(f"expected make/model, got {segment!r}")
+        pairs.append((make, model))
+    queue = WorkQueue(queue_path)
+    for make, model in pairs:
+        queue.add_segment(make, model, priority)
+    click.echo(f"Seeded {len(pairs)} segment(s): {queue.stats()}")
+
+
+@main.command()
+@click.option("--queue", "queue_path", default=CRAWL_QUEUE, show_default=True)
+@click.option("--store", "store_path", default=LISTING_STORE, show_default=True)
+@click.option("--workers", default=2, show_default=True, help="Worker processes, each with its own browser.")
+@click.option("--base-url", default=None, help="Marketplace site, e.g. the local mock server.")
+@click.option("--host-rps", default=None, type=float, help="Request budget per worker.")
+@click.option("--lease", default=300.0, show_default=True, help="Seconds before an unfinished unit is handed out again.")
+@click.option("--refresh-hours", default=None, type=float, help="Re-crawl units older than this once the queue is drained.")
+@click.option("--once", is_flag=True, help="Exit when the queue is drained instead of waiting for work.")
+def run(queue_path, store_path, workers, base_url, host_rps, lease, refresh_hours, once):
+    """Drains the crawl queue with parallel worker processes."""
+    run_crawler(
+        workers, idle_exit=once, queue_path=queue_path, store_path=store_path, base_url=base_url,
+        host_rps=host_rps, lease=lease, refresh_age=refresh_hours * 3600 if refresh_hours else None,
+    )
+
+
+@main.command()
+@click.option("--queue", "queue_path", default=CRAWL_QUEUE, show_default=True)
+@click.option("--store", "store_path", default=LISTING_STORE, show_default=True)
+def status(queue_path, store_path):
+    """Shows queue progress and stored listings per segment."""
+    click.echo(f"Queue: {WorkQueue(queue_path).stats()}")
+    store = ListingStore(store_path)
+    click.echo(f"Store: {len(store)} listings")
+    for make, model, count in store.segments():
+        click.echo(f"  {make} {model}: {count}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,79 @@
+import re
+import threading
+import unicodedata
+from urllib.parse import urlsplit
+
+from used_car_evaluator.cleaner import parse_int
+
+# Ad URLs look like /auto-oglasi/<ad id>/<slug>; the slug and query string vary between pages
+AD_ID_RE = re.compile(r"/auto-oglasi/(\d+)(?:/|$)")
+
+
+def ad_id_from_url(url):
+    """Canonical ad identity: the numeric ad ID if the URL has one, otherwise host + path."""
+    if not url:
+        return None
+    parts = urlsplit(url.strip())
+    m = AD_ID_RE.search(parts.path)
+    if m:
+        return m.group(1)
+    return parts.netloc.lower() + parts.path.rstrip("/").lower()
+
+
+def normalize_title(title):
+    """Lowercased, without diacritics or punctuation, single-spaced ("Škoda  Octavia 1.6-TDI" -> "skoda octavia 1 6 tdi")."""
+    text = unicodedata.normalize("NFKD", title or "")
+    text = "".join(c for c in text if not unicodedata.combining(c)).lower()
+    return " ".join(re.findall(r"[a-z0-9]+", text))
+
+
+def listing_fingerprint(listing):
+    """
+    Fingerprint for spotting re-posted ads: normalized title, year, mileage and price.
+    None when there is too little to go on (no title, or neither mileage nor price).
+    """
+    title = normalize_title(listing.get("title"))
+    year = parse_int(str(listing["year"])) if listing.get("year") else None
+    mileage = parse_int(str(listing["mileage"])) if listing.get("mileage") else None
+    price = parse_int(str(listing["price"])) if listing.get("price") else None
+    if not title or (mileage is None and price is None):
+        return None
+    return (title, year, mileage, price)
+
+
+class Deduplicator:
+    """
+    Remembers the ads seen during one scrape. check() is safe to call from several
+    worker threads; the first copy of an ad to be checked is the one kept.
+    """
+
+    def __init__(self):
+        self.ids = set()
+        self.fingerprints = set()
+        self.lock = threading.Lock()
+        self.counts = {"duplicates_by_id": 0, "duplicates_by_fingerprint": 0}
+
+    def check(self, listing):
+        """Returns None for a new ad, or "id" / "fingerprint" naming what it duplicated."""
+        ad_id = ad_id_from_url(listing.get("url"))
+        fingerprint = listing_fingerprint(listing)
+        with self.lock:
+            if ad_id is not None and ad_id in self.ids:
+                self.counts["duplicates_by_id"] += 1
+                return "id"
+            if fingerprint is not None and fingerprint in self.fingerprints:
+                self.counts["duplicates_by_fingerprint"] += 1
+                return "fingerprint"
+            if ad_id is not None:
+                self.ids.add(ad_id)
+            if fingerprint is not None:
+                self.fingerprints.add(fingerprint)
+        return None
+
+    def filter(self, listings):
+        """The listings that are not duplicates of one seen earlier, in order."""
+        return [listing for listing in listings if self.check(listing) is None]
+
+    def stats(self):
+        with self.lock:
+            return {**self.counts, "duplicates": sum(self.counts.values())}
@@ -0,0 +1,259 @@
+import queue
+import random
+import threading
+import time
+from urllib.parse import urlparse
+
+# HTTP statuses worth retrying; 429 additionally tells the limiter to back off
+TRANSIENT_STATUSES = {408, 425, 429, 500, 502, 503, 504}
+
+# Further attempts at a worker's worker_init (a browser launch, say) before the run fails
+INIT_RETRIES = 1
+
+
+class TransientFetchError(Exception):
+    """A fetch failure that may succeed if retried (timeouts, throttling, 5xx)."""
+
+    def __init__(self, message, status=None):
+        super().__init__(message)
+        self.status = status
+
+
+class FetchLost(Exception):
+    """Raised when a fetch still fails after all retries, or fails with a non-transient error."""
+
+
+def default_is_transient(exc):
+    return isinstance(exc, (TransientFetchError, TimeoutError, ConnectionError))
+
+
+class TokenBucket:
+    """Request budget for one host: `rate` requests per second with bursts of up to `burst`."""
+
+    def __init__(self, rate, burst=None, clock=time.monotonic, sleep=time.sleep):
+        self.rate = rate
+        self.burst = burst or max(1.0, rate)
+        self.tokens = self.burst
+        self.clock = clock
+        self.sleep = sleep
+        self.updated = clock()
+        self.lock = threading.Lock()
+
+    def acquire(self):
+        while True:
+            with self.lock:
+                now = self.clock()
+                self.tokens = min(self.burst, self.tokens + (now - self.updated) * self.rate)
+                self.updated = now
+                if self.tokens >= 1:
+                    self.tokens -= 1
+                    return
+                wait = (1 - self.tokens) / self.rate
+            self.sleep(wait)
+
+
+class AdaptiveLimiter:
+    """
+    AIMD concurrency limit. Each fast success adds 1/limit (about +1 per round trip
+    of requests); a transient failure or a response slower than target_latency halves it.
+    """
+
+    def __init__(self, max_limit, min_limit=1, initial=None, target_latency=10.0):
+        self.max_limit = max_limit
+        self.min_limit = min_limit
+        self.limit = float(initial or min_limit)
+        self.target_latency = target_latency
+        self.in_flight = 0
+        self.peak = 0
+        self.cond = threading.Condition()
+
+    def acquire(self):
+        with self.cond:
+            while self.in_flight >= int(self.limit):
+                self.cond.wait()
+            self.in_flight += 1
+            self.peak = max(self.peak, self.in_flight)
+
+    def release(self, latency, ok):
+        with self.cond:
+            self.in_flight -= 1
+            if ok and latency <= self.target_latency:
+                self.limit = min(self.max_limit, self.limit + 1 / self.limit)
+            else:
+                self.limit = max(self.min_limit, self.limit / 2)
+            self.cond.notify_all()
+
+
+class FetchScheduler:
+    """
+    Runs fetches with adaptive concurrency, jittered exponential backoff on transient
+    failures and optional per-host request budgets.
+
+    call() performs one request under the retry, budget and concurrency policy.
+    The scheduler is also a worker pool: start() launches `concurrency` worker threads,
+    each with its own context from worker_init (e.g. a browser), and map() runs a task
+    per URL on them. Tasks make their requests through call(), so the adaptive limit
+    applies to requests in flight rather than to whole tasks. A worker_init that still
+    fails after INIT_RETRIES fails the run: map() raises its error.
+    """
+
+    def __init__(self, concurrency=1, min_concurrency=1, target_latency=10.0, max_retries=3,
+                 backoff_base=1.0, backoff_cap=30.0, host_rps=None, is_transient=default_is_transient,
+                 sleep=time.sleep, rng=None):
+        self.concurrency = concurrency
+        self.limiter = AdaptiveLimiter(concurrency, min_concurrency, target_latency=target_latency)
+        self.max_retries = max_retries
+        self.backoff_base = backoff_base
+        self.backoff_cap = backoff_cap
+        self.host_rps = host_rps
+        self.is_transient = is_transient
+        self.sleep = sleep
+        self.rng = rng or random.Random()
+        self.budgets = {}
+        self.lock = threading.Lock()
+        self.counts = {"requests": 0, "retries": 0, "throttled": 0}
+        self.retried = {}
+        self.lost = {}
+        self.tasks = queue.Queue()
+        self.workers = []
+        self.init_error = None
+
+    def _budget(self, url):
+        if not self.host_rps:
+            return None
+        host = urlparse(url).netloc
+        with self.lock:
+            bucket = self.budgets.get(host)
+            if bucket is None:
+                bucket = self.budgets[host] = TokenBucket(self.host_rps, sleep=self.sleep)
+            return bucket
+
+    def backoff(self, attempt):
+        """Delay before retry number `attempt`: capped exponential with +/-50% jitter."""
+        delay = min(self.backoff_cap, self.backoff_base * 2 ** (attempt - 1))
+        return delay * self.rng.uniform(0.5, 1.5)
+
+    def call(self, fetch, url, kind="page"):
+        """Calls fetch(url), retrying transient failures. Raises FetchLost once it gives up."""
+        attempt = 0
+        while True:
+            budget = self._budget(url)
+            if budget is not None:
+                budget.acquire()
+            self.limiter.acquire()
+            start = time.perf_counter()
+            try:
+                result = fetch(url)
+            except Exception as e:
+                self.limiter.release(time.perf_counter() - start, ok=False)
+                transient = self.is_transient(e)
+                with self.lock:
+                    self.counts["requests"] += 1
+                    if getattr(e, "status", None) == 429:
+                        self.counts["throttled"] += 1
+                    if not transient or attempt >= self.max_retries:
+                        self.lost[url] = kind
+                        raise FetchLost(f"{kind} {url}: {e}") from e
+                    attempt += 1
+                    self.counts["retries"] += 1
+                    self.retried[url] = kind
+                self.sleep(self.backoff(attempt))
+                continue
+            self.limiter.release(time.perf_counter() - start, ok=True)
+            with self.lock:
+                self.counts["requests"] += 1
+            return result
+
+    def start(self, worker_init=None, worker_close=None):
+        """Starts the worker threads. worker_init() is called lazily on a worker's first task."""
+        for i in range(self.concurrency):
+            t = threading.Thread(target=self._work, args=(worker_init, worker_close), name=f"fetch-worker-{i}", daemon=True)
+            t.start()
+            self.workers.append(t)
+        return self
+
+    def _work(self, worker_init, worker_close):
+        ctx = None
+        started = False
+        try:
+            while True:
+                item = self.tasks.get()
+                if item is None:
+                    return
+                url, task, kind, results, latch = item
+                try:
+                    if not started:
+                        started = True
+                        ctx = self._init_worker(worker_init) if worker_init else None
+                    if self.init_error is None:
+                        results[url] = task(ctx, url)
+                except FetchLost:
+                    pass
+                except Exception as e:
+                    with self.lock:
+                        self.lost[url] = kind
+                    results[url] = e
+                finally:
+                    latch.release()
+        finally:
+            if started and worker_close and ctx is not None:
+                worker_close(ctx)
+
+    def _init_worker(self, worker_init):
+        """worker_init(), retried INIT_RETRIES times. On failure, records the error for map() and returns None."""
+        attempt = 0
+        while True:
+            try:
+                return worker_init()
+            except Exception as e:
+                if attempt >= INIT_RETRIES:
+                    with self.lock:
+                        if self.init_error is None:
+                            self.init_error = e
+                    return None
+                attempt += 1
+                self.sleep(self.backoff(attempt))
+
+    def map(self, urls, task, kind="page"):
+        """
+        Runs task(ctx, url) for every URL on the worker threads.
+        Returns {url: result} for the tasks that completed. Raises the error of a
+        worker_init that failed, as no task can run without its context.
+        """
+        urls = list(urls)
+        results = {}
+        latch = threading.Semaphore(0)
+        for url in urls:
+            self.tasks.put((url, task, kind, results, latch))
+        for _ in urls:
+            latch.acquire()
+        if self.init_error is not None:
+            raise self.init_error
+        return {url: r for url, r in results.items() if not isinstance(r, Exception)}
+
+    def close(self):
+        for _ in self.workers:
+            self.tasks.put(None)
+        for t in self.workers:
+            t.join()
+        self.workers = []
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def stats(self):
+        with self.lock:
+            lost = list(self.lost.values())
+            retried = list(self.retried.values())
+            return {
+                **self.counts,
+                "pages_retried": retried.count("page"),
+                "pages_lost": lost.count("page"),
+                "details_retried": retried.count("detail"),
+                "details_lost": lost.count("detail"),
+                "concurrency": round(self.limiter.limit, 2),
+                "peak_concurrency": self.limiter.peak,
+            }
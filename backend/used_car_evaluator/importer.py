@@ -0,0 +1,241 @@
+"""
+Bulk import of listing dumps into the ListingStore.
+
+    python -m used_car_evaluator.importer listings.csv exports/*.jsonl.gz --workers 4
+
+CSV files (such as the listings.csv written by cli.py) and JSONL files, optionally
+gzip-compressed, are read in chunks. Worker processes clean each chunk and turn it into
+store rows; the parent writes the chunks in file order, one transaction each, and records
+how far into the file it got in the same transaction, so an interrupted import resumes
+after the last chunk written. Ads are deduplicated on the ID in their URL: the first copy
+wins, and ads already in the store are kept. With --replace the last copy wins instead,
+over stored ads too, and the ads it overwrites are counted as updated.
+"""
+import ast
+import collections
+import csv
+import gzip
+import itertools
+import json
+import logging
+import os
+import re
+from concurrent.futures import ProcessPoolExecutor
+
+import click
+
+from used_car_evaluator.cleaner import clean_listing, paused_gc
+from used_car_evaluator.pool import NUMERIC_FIELDS
+from used_car_evaluator.store import LISTING_STORE, ListingStore, listing_row
+from used_car_evaluator.streaming import open_ndjson
+from used_car_evaluator.titles import make_model
+
+logger = logging.getLogger(__name__)
+
+CHUNK_SIZE = 20000
+
+# Chunks cleaned ahead of the writer, per worker
+PREFETCH = 2
+
+# How pandas writes an integer column with gaps, e.g. "150000.0"
+FLOAT_INT = re.compile(r"^\d+\.0$")
+
+# The items of a list repr with only single-quoted strings, e.g. "['klima', 'navigacija']"
+QUOTED_ITEM = re.compile(r"'([^']*)'")
+
+
+def file_format(path):
+    """"csv" or "jsonl" from the file extension, ignoring a trailing .gz. Raises ValueError otherwise."""
+    name = path.lower()
+    if name.endswith(".gz"):
+        name = name[:-3]
+    if name.endswith(".csv"):
+        return "csv"
+    if name.endswith((".jsonl", ".ndjson", ".json")):
+        return "jsonl"
+    raise ValueError(f"Unknown dump format: {path} (expected .csv or .jsonl, optionally .gz)")
+
+
+def file_signature(path):
+    """Size and modification time: a checkpoint only applies to the file it was written for."""
+    stat = os.stat(path)
+    return f"{stat.st_size}:{stat.st_mtime_ns}"
+
+
+def parse_keywords(value):
+    """Keywords from a CSV cell: a Python list literal as pandas writes it, or comma-separated."""
+    if value.startswith("["):
+        if "\\" not in value and '"' not in value:
+            # repr only switches to double quotes or escapes for keywords containing quotes
+            return QUOTED_ITEM.findall(value)
+        try:
+            keywords = ast.literal_eval(value)
+        except (ValueError, SyntaxError, MemoryError, RecursionError):
+            return []
+        return [kw for kw in keywords if isinstance(kw, str)] if isinstance(keywords, list) else []
+    return value.split(",")
+
+
+def from_csv_row(row):
+    """A listing from a CSV row: empty cells become None and keywords and integers are parsed back."""
+    record = {}
+    for name, value in row.items():
+        if value == "":
+            value = None
+        elif name == "keywords":
+            value = parse_keywords(value)
+        elif name in NUMERIC_FIELDS and FLOAT_INT.match(value):
+            value = int(value[:-2])
+        record[name] = value
+    return record
+
+
+def title_segment(title):
+    """A title's (make, model) as titles.make_model reads it, e.g. ("volkswagen", "golf plus"), or None without both."""
+    make, model = make_model(title or "")
+    if not (make and model):
+        return None
+    return make, model
+
+
+def read_chunks(path, chunk_size=CHUNK_SIZE, start=0):
+    """
+    (records, position) for each chunk of a dump, starting after its first `start` records.
+    CSV records are row dicts of strings, JSONL records are unparsed lines; position counts
+    the records read so far, including those skipped.
+    """
+    if file_format(path) == "csv":
+        opener = gzip.open if path.lower().endswith(".gz") else open
+        with opener(path, "rt", encoding="utf-8", newline="") as f:
+            rows = itertools.islice(csv.DictReader(f), start, None)
+            position = start
+            while True:
+                chunk = list(itertools.islice(rows, chunk_size))
+                if not chunk:
+                    return
+                position += len(chunk)
+                yield chunk, position
+    with open_ndjson(path) as lines:
+        position = 0
+        chunk = []
+        for line in lines:
+            position += 1
+            if position <= start:
+                continue
+            chunk.append(line)
+            if len(chunk) == chunk_size:
+                yield chunk, position
+                chunk = []
+        if chunk:
+            yield chunk, position
+
+
+def prepare_chunk(records, fmt, segment=None):
+    """
+    Cleans a chunk of records into store rows. Runs in the worker processes, with GC
+    paused for the chunk: the records and rows it builds are acyclic and live until the
+    chunk is written, so collections during it free nothing.
+    Returns (rows, invalid records, records skipped for lacking an ad URL or a make/model).
+    """
+    rows = []
+    invalid = skipped = 0
+    with paused_gc():
+        for record in records:
+            try:
+                if fmt == "csv":
+                    record = from_csv_row(record)
+                elif record.strip():
+                    record = json.loads(record)
+                else:
+                    continue
+                car = clean_listing(record)
+            except Exception:
+                invalid += 1
+                continue
+            car_segment = segment or title_segment(car["title"])
+            row = listing_row(car, *car_segment) if car_segment else None
+            if row is None:
+                skipped += 1
+            else:
+                rows.append(row)
+    return rows, invalid, skipped
+
+
+def import_file(store, path, workers=None, chunk_size=CHUNK_SIZE, segment=None, replace=False, restart=False):
+    """
+    Imports one dump into the store, resuming from its checkpoint unless restart is set.
+    workers=1 cleans in this process. Returns counts of the records read, written (new
+    ads), updated (ads already stored or repeated in the dump, overwritten with replace),
+    duplicates (the same, kept as they were without replace), invalid and skipped.
+    """
+    fmt = file_format(path)
+    source = os.path.abspath(path)
+    signature = file_signature(path)
+    saved = None if restart else store.checkpoint(source)
+    start = saved[1] if saved and saved[0] == signature else 0
+    if start:
+        logger.info("%s: resuming after %s records", path, start)
+    counts = collections.Counter(read=0, written=0, updated=0, duplicates=0, invalid=0, skipped=0)
+
+    def write(result, position):
+        rows, invalid, skipped = result
+        written, updated = store.write(rows, replace=replace, checkpoint=(source, signature, position))
+        counts["read"] += len(rows) + invalid + skipped
+        counts["written"] += written
+        counts["updated"] += updated
+        counts["duplicates"] += len(rows) - written - updated
+        counts["invalid"] += invalid
+        counts["skipped"] += skipped
+        logger.info("%s: %s records read, %s written", path, position, counts["written"])
+
+    chunks = read_chunks(path, chunk_size, start)
+    if workers == 1:
+        for records, position in chunks:
+            write(prepare_chunk(records, fmt, segment), position)
+        return dict(counts)
+    workers = workers or os.cpu_count() or 1
+    with ProcessPoolExecutor(workers) as pool:
+        # A bounded window of chunks in flight, written back in file order
+        pending = collections.deque()
+        for records, position in chunks:
+            pending.append((pool.submit(prepare_chunk, records, fmt, segment), position))
+            if len(pending) >= PREFETCH * workers:
+                future, done = pending.popleft()
+                write(future.result(), done)
+        while pending:
+            future, done = pending.popleft()
+            write(future.result(), done)
+    return dict(counts)
+
+
+@click.command()
+@click.argument("paths", nargs=-1, required=True, type=click.Path(exists=True, dir_okay=False))
+@click.option("--store", "store_path", default=LISTING_STORE, show_default=True)
+@click.option("--workers", default=None, type=int, help="Cleaning processes. Defaults to one per CPU.")
+@click.option("--chunk-size", default=CHUNK_SIZE, show_default=True, help="Records per chunk, transaction and checkpoint.")
+@click.option("--segment", default=None, help="Make/model of every listing, e.g. 'Opel/Corsa'. Defaults to each title's make and model.")
+@click.option("--replace", is_flag=True, help="Overwrite ads already in the store, and earlier copies in the dump, instead of keeping them.")
+@click.option("--restart", is_flag=True, help="Ignore checkpoints and import every file from its start.")
+def main(paths, store_path, workers, chunk_size, segment, replace, restart):
+    """Imports CSV and JSONL listing dumps into the listing store."""
+    logging.basicConfig(level=os.environ.get("LOG_LEVEL", "INFO").upper(), format="[%(levelname)s] %(name)s: %(message)s")
+    if segment:
+        make, _, model = segment.partition("/")
+        if not model:
+            raise click.BadParameter(f"expected make/model, got {segment!r}")
+        segment = (make, model)
+    store = ListingStore(store_path)
+    try:
+        for path in paths:
+            try:
+                counts = import_file(store, path, workers, chunk_size, segment, replace, restart)
+            except ValueError as e:
+                raise click.ClickException(str(e))
+            click.echo(f"{path}: {counts}")
+        click.echo(f"Store: {len(store)} listings")
+    finally:
+        store.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,220 @@
+import heapq
+import math
+import re
+import time
+
+from used_car_evaluator.analyzer import similarity_score, rank_candidates
+from used_car_evaluator.titles import TitleIndex, make_model
+
+# Distance units per feature: a difference of one unit counts as much as a
+# categorical mismatch. Chosen to line up with the step thresholds in similarity_score.
+NUMERIC_SCALES = {
+    "year": 2.0,          # years
+    "mileage": 30000.0,   # km
+    "power": 15.0,        # kW
+    "engine_size": 0.3,   # litres
+}
+
+CATEGORICAL_FEATURES = ("engine_type", "transmission", "body_type")
+
+LEAF_SIZE = 16
+
+
+def segment_key(title):
+    """Make/model segment of a listing, as the canonical (make, model) similarity_score matches on."""
+    return tuple(part for part in make_model(title or "") if part)
+
+
+def numeric_value(car, name):
+    value = car.get(name)
+    if value is None or value == "":
+        return None
+    try:
+        if name == "power":
+            m = re.search(r'(\d+)', str(value))
+            return float(m.group(1)) if m else None
+        return float(value)
+    except (ValueError, TypeError):
+        return None
+
+
+class FeatureSpace:
+    """Embeds listings into normalized vectors: scaled numeric features plus one-hot categorical features."""
+
+    def __init__(self, listings):
+        self.numeric = list(NUMERIC_SCALES)
+        self.categories = {}
+        for name in CATEGORICAL_FEATURES:
+            values = sorted({car.get(name) for car in listings if car.get(name)})
+            self.categories[name] = {value: i for i, value in enumerate(values)}
+        # Missing candidate values are imputed with the pool median so they sit mid-range
+        self.fill = {}
+        for name in self.numeric:
+            values = sorted(v for v in (numeric_value(car, name) for car in listings) if v is not None)
+            self.fill[name] = values[len(values) // 2] if values else 0.0
+        self.dims = len(self.numeric) + sum(len(c) for c in self.categories.values())
+
+    def embed(self, car, impute=True):
+        """Returns (vector, active) where active marks the dimensions car actually has values for."""
+        vector = []
+        active = []
+        for name in self.numeric:
+            value = numeric_value(car, name)
+            active.append(value is not None)
+            if value is None:
+                value = self.fill[name] if impute else 0.0
+            vector.append(value / NUMERIC_SCALES[name])
+        # One-hot scaled so that a mismatch contributes exactly 1 to the squared distance
+        onehot = 1 / math.sqrt(2)
+        for name, values in self.categories.items():
+            value = car.get(name)
+            for known in values:
+                vector.append(onehot if value == known else 0.0)
+                active.append(bool(value))
+        return vector, active
+
+
+class _Node:
+    __slots__ = ("axis", "split", "left", "right", "points")
+
+    def __init__(self, axis=None, split=None, left=None, right=None, points=None):
+        self.axis = axis
+        self.split = split
+        self.left = left
+        self.right = right
+        self.points = points
+
+
+class KdTree:
+    """KD-tree over (vector, listing index) points with masked k-nearest-neighbour queries."""
+
+    def __init__(self, points):
+        self.size = len(points)
+        self.root = self._build(points)
+
+    def _build(self, points):
+        if len(points) <= LEAF_SIZE:
+            return _Node(points=points)
+        dims = len(points[0][0])
+        spreads = [
+            max(p[0][d] for p in points) - min(p[0][d] for p in points)
+            for d in range(dims)
+        ]
+        axis = max(range(dims), key=spreads.__getitem__)
+        if spreads[axis] == 0:
+            return _Node(points=points)
+        points = sorted(points, key=lambda p: p[0][axis])
+        mid = len(points) // 2
+        return _Node(
+            axis=axis,
+            split=points[mid][0][axis],
+            left=self._build(points[:mid]),
+            right=self._build(points[mid:]),
+        )
+
+    def query(self, vector, active, k):
+        """Returns up to k (squared distance, listing index) pairs, nearest first. Inactive dimensions are ignored."""
+        heap = []
+        self._search(self.root, vector, active, k, heap)
+        return sorted((-d, i) for d, i in heap)
+
+    def _search(self, node, vector, active, k, heap):
+        if node.points is not None:
+            for point, i in node.points:
+                d = 0.0
+                for q, p, on in zip(vector, point, active):
+                    if on:
+                        d += (q - p) ** 2
+                if len(heap) < k:
+                    heapq.heappush(heap, (-d, i))
+                elif d < -heap[0][0]:
+                    heapq.heapreplace(heap, (-d, i))
+            return
+        diff = vector[node.axis] - node.split if active[node.axis] else 0.0
+        near, far = (node.left, node.right) if diff < 0 else (node.right, node.left)
+        self._search(near, vector, active, k, heap)
+        if len(heap) < k or diff * diff < -heap[0][0]:
+            self._search(far, vector, active, k, heap)
+
+
+class KnnIndex:
+    """
+    Nearest-neighbour index over a listing pool, with one KD-tree per make/model segment.
+    Build it once per pool and reuse it across queries.
+    """
+
+    def __init__(self, listing_pool):
+        self.listings = [car for car in listing_pool if car.get('price')]
+        self.space = FeatureSpace(self.listings)
+        segments = {}
+        for i, car in enumerate(self.listings):
+            vector, _ = self.space.embed(car)
+            segments.setdefault(segment_key(car.get('title')), []).append((vector, i))
+        self.trees = {key: KdTree(points) for key, points in segments.items()}
+
+    def _trees_for(self, input_car):
+        key = segment_key(input_car.get('title'))
+        if key in self.trees:
+            return [self.trees[key]]
+        # Fall back to segments sharing the make, then to the whole pool
+        same_make = [tree for seg, tree in self.trees.items() if key and seg[:1] == key[:1]]
+        return same_make or list(self.trees.values())
+
+    def nearest(self, input_car, k):
+        """Returns up to k (squared distance, listing) pairs for the listings nearest to input_car."""
+        vector, active = self.space.embed(input_car, impute=False)
+        found = []
+        for tree in self._trees_for(input_car):
+            found.extend(tree.query(vector, active, k))
+        found.sort()
+        return [(d, self.listings[i]) for d, i in found[:k]]
+
+    def top_matches(self, input_car, k):
+        """Top k matches as (score, car, match_quality) tuples, in the shape analyze_listing summarizes."""
+        price = input_car.get('price') or 0
+        nearest = self.nearest(input_car, k)
+        nearest.sort(key=lambda x: (x[0], abs((x[1]['price'] or 0) - price)))
+        top = []
+        for _, car in nearest:
+            score, match_quality = similarity_score(input_car, car)
+            top.append((score, car, match_quality))
+        return top
+
+
+def compare_engines(input_cars, listing_pool, k=5):
+    """
+    Report comparing the knn engine against the rule-based scorer:
+    mean top-k overlap and mean per-query latency, plus the one-off index build time.
+    """
+    titles = TitleIndex(listing_pool)
+    start = time.perf_counter()
+    index = KnnIndex(listing_pool)
+    build_seconds = time.perf_counter() - start
+
+    overlaps = []
+    rules_seconds = 0.0
+    knn_seconds = 0.0
+    for input_car in input_cars:
+        start = time.perf_counter()
+        rules_top = rank_candidates(input_car, listing_pool, titles=titles)[:k]
+        rules_seconds += time.perf_counter() - start
+
+        start = time.perf_counter()
+        knn_top = index.top_matches(input_car, k)
+        knn_seconds += time.perf_counter() - start
+
+        rules_ids = {id(car) for _, car, _ in rules_top}
+        knn_ids = {id(car) for _, car, _ in knn_top}
+        if rules_ids:
+            overlaps.append(len(rules_ids & knn_ids) / len(rules_ids))
+
+    queries = len(input_cars) or 1
+    return {
+        "pool_size": len(listing_pool),
+        "queries": len(input_cars),
+        "k": k,
+        "mean_topk_overlap": round(sum(overlaps) / len(overlaps), 3) if overlaps else None,
+        "rules_ms_per_query": round(1000 * rules_seconds / queries, 3),
+        "knn_ms_per_query": round(1000 * knn_seconds / queries, 3),
+        "knn_build_ms": round(1000 * build_seconds, 3),
+    }
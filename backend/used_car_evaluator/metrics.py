@@ -0,0 +1,204 @@
+import threading
+import time
+from contextlib import contextmanager
+
+# Histogram buckets in seconds, from sub-millisecond scoring up to slow page loads
+DEFAULT_BUCKETS = (0.0005, 0.001, 0.005, 0.01, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60)
+
+
+def _escape(value):
+    return str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+def _label_text(labels):
+    if not labels:
+        return ""
+    return "{" + ",".join(f'{k}="{_escape(v)}"' for k, v in labels) + "}"
+
+
+class Counter:
+    def __init__(self, name, help_text):
+        self.name = name
+        self.help = help_text
+        self.values = {}
+
+    def inc(self, amount=1, **labels):
+        key = tuple(sorted(labels.items()))
+        self.values[key] = self.values.get(key, 0) + amount
+
+    def value(self, **labels):
+        return self.values.get(tuple(sorted(labels.items())), 0)
+
+    def render(self):
+        lines = [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} counter"]
+        for key, value in sorted(self.values.items()):
+            lines.append(f"{self.name}{_label_text(key)} {value}")
+        return lines
+
+
+class Histogram:
+    def __init__(self, name, help_text, buckets=DEFAULT_BUCKETS):
+        self.name = name
+        self.help = help_text
+        self.buckets = tuple(buckets)
+        # labels -> [bucket counts..., sum, count]
+        self.values = {}
+
+    def observe(self, value, **labels):
+        key = tuple(sorted(labels.items()))
+        series = self.values.get(key)
+        if series is None:
+            series = self.values[key] = [0] * len(self.buckets) + [0.0, 0]
+        for i, bound in enumerate(self.buckets):
+            if value <= bound:
+                series[i] += 1
+        series[-2] += value
+        series[-1] += 1
+
+    def summary(self, **labels):
+        """Total seconds and observation count for one label set."""
+        series = self.values.get(tuple(sorted(labels.items())))
+        if series is None:
+            return 0.0, 0
+        return series[-2], series[-1]
+
+    def render(self):
+        lines = [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} histogram"]
+        for key, series in sorted(self.values.items()):
+            for bound, count in zip(self.buckets, series):
+                lines.append(f"{self.name}_bucket{_label_text(key + (('le', bound),))} {count}")
+            lines.append(f"{self.name}_bucket{_label_text(key + (('le', '+Inf'),))} {series[-1]}")
+            lines.append(f"{self.name}_sum{_label_text(key)} {series[-2]}")
+            lines.append(f"{self.name}_count{_label_text(key)} {series[-1]}")
+        return lines
+
+
+class Registry:
+    """Holds the process's metrics and renders them in the Prometheus text format."""
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.metrics = {}
+
+    def counter(self, name, help_text):
+        with self.lock:
+            return self.metrics.setdefault(name, Counter(name, help_text))
+
+    def histogram(self, name, help_text, buckets=DEFAULT_BUCKETS):
+        with self.lock:
+            return self.metrics.setdefault(name, Histogram(name, help_text, buckets))
+
+    def render(self):
+        with self.lock:
+            lines = []
+            for metric in self.metrics.values():
+                lines.extend(metric.render())
+            return "\n".join(lines) + "\n"
+
+    def reset(self):
+        with self.lock:
+            for metric in self.metrics.values():
+                metric.values.clear()
+
+    def values(self):
+        """A copy of every metric's values by name, picklable for merge() in another process."""
+        with self.lock:
+            return {
+                name: {key: list(value) if isinstance(value, list) else value for key, value in metric.values.items()}
+                for name, metric in self.metrics.items()
+            }
+
+    def merge(self, values):
+        """Adds values() taken in another process to this registry's metrics of the same names."""
+        with self.lock:
+            for name, series in values.items():
+                metric = self.metrics.get(name)
+                if metric is None:
+                    continue
+                for key, value in series.items():
+                    if isinstance(value, list):
+                        ours = metric.values.setdefault(key, [0] * (len(value) - 2) + [0.0, 0])
+                        metric.values[key] = [a + b for a, b in zip(ours, value)]
+                    else:
+                        metric.values[key] = metric.values.get(key, 0) + value
+
+
+REGISTRY = Registry()
+
+STAGE_SECONDS = REGISTRY.histogram("used_car_stage_seconds", "Time spent per pipeline stage.")
+LISTINGS = REGISTRY.counter("used_car_listings_total", "Listings processed per pipeline stage.")
+PAGES = REGISTRY.counter("used_car_pages_total", "Pages loaded by the scraper, by kind and outcome.")
+
+CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+
+@contextmanager
+def timer(stage):
+    """Records the duration of the enclosed block under the given stage."""
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        elapsed = time.perf_counter() - start
+        with REGISTRY.lock:
+            STAGE_SECONDS.observe(elapsed, stage=stage)
+
+
+def count_listings(stage, amount):
+    with REGISTRY.lock:
+        LISTINGS.inc(amount, stage=stage)
+
+
+def count_page(kind, outcome, amount=1):
+    if not amount:
+        return
+    with REGISTRY.lock:
+        PAGES.inc(amount, kind=kind, outcome=outcome)
+
+
+def stage_breakdown():
+    """{stage: (total seconds, count)} for every stage timed so far."""
+    with REGISTRY.lock:
+        return {
+            dict(key)["stage"]: (series[-2], series[-1])
+            for key, series in STAGE_SECONDS.values.items()
+        }
+
+
+def stage_quantile(stage, q):
+    """
+    Estimated q-quantile of a stage's latency, interpolated within histogram buckets
+    the way Prometheus' histogram_quantile does. Returns None if the stage was never timed.
+    """
+    with REGISTRY.lock:
+        series = STAGE_SECONDS.values.get((("stage", stage),))
+        if series is None or not series[-1]:
+            return None
+        series = list(series)
+    buckets = STAGE_SECONDS.buckets
+    total = series[-1]
+    target = q * total
+    lower_bound = 0.0
+    lower_count = 0
+    for bound, count in zip(buckets, series):
+        if count >= target:
+            if count == lower_count:
+                return bound
+            return lower_bound + (bound - lower_bound) * (target - lower_count) / (count - lower_count)
+        lower_bound, lower_count = bound, count
+    # Beyond the last finite bucket
+    return buckets[-1]
+
+
+def recorded(fn, *args):
+    """
+    Runs fn(*args) in a process pool worker and returns (its result, the metrics it
+    recorded), for REGISTRY.merge() in the parent, as the worker's own registry is never
+    rendered. Pool workers run one task at a time, so the worker's registry is cleared first.
+    """
+    REGISTRY.reset()
+    return fn(*args), REGISTRY.values()
+
+
+def render():
+    return REGISTRY.render()
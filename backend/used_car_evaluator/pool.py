@@ -0,0 +1,183 @@
+import sys
+from array import array
+
+# Field order matches the dicts produced by clean_data
+LISTING_FIELDS = (
+    "title", "year", "mileage", "price", "engine", "engine_type", "engine_size",
+    "transmission", "body_type", "power", "color", "doors", "seats", "city",
+    "seller_type", "fuel_type", "seller_info", "keywords", "url",
+)
+
+# Integer fields, stored in signed 64-bit arrays with MISSING for None
+NUMERIC_FIELDS = ("year", "mileage", "price")
+
+# Repeated text fields, interned into shared lookup tables and stored as codes
+CATEGORICAL_FIELDS = (
+    "engine", "engine_type", "engine_size", "transmission", "body_type", "power",
+    "color", "doors", "seats", "city", "seller_type", "fuel_type",
+)
+
+# Per-listing text, kept as plain strings
+TEXT_FIELDS = ("title", "seller_info", "url")
+
+MISSING = -1
+
+
+class Vocabulary:
+    """Lookup table mapping each distinct value to a small integer code. Code 0 is reserved for None."""
+    __slots__ = ("values", "codes")
+
+    def __init__(self):
+        self.values = [None]
+        self.codes = {None: 0}
+
+    def code(self, value):
+        code = self.codes.get(value)
+        if code is None:
+            code = len(self.values)
+            self.codes[value] = code
+            self.values.append(value)
+        return code
+
+    def __len__(self):
+        return len(self.values) - 1
+
+
+class CompactPool:
+    """
+    Memory-compact listing pool. Categorical fields are dictionary-encoded into
+    array-backed integer codes, keywords into a bitset over a shared keyword table
+    (plus the original code sequence for the few lists a bitset can't give back, i.e.
+    those out of first-seen order or with duplicates).
+    Indexing and iteration return ordinary listing dicts, so the pool can be passed
+    anywhere a list of cleaned listings is accepted.
+    """
+    __slots__ = ("numeric", "categorical", "vocabularies", "text", "keyword_bits", "keyword_order", "keyword_vocabulary")
+
+    def __init__(self, listings=()):
+        self.numeric = {name: array("q") for name in NUMERIC_FIELDS}
+        self.categorical = {name: array("I") for name in CATEGORICAL_FIELDS}
+        self.vocabularies = {name: Vocabulary() for name in CATEGORICAL_FIELDS}
+        self.text = {name: [] for name in TEXT_FIELDS}
+        # Python ints serve as arbitrary-width bitsets; None is kept for listings without a keyword list
+        self.keyword_bits = []
+        # Listing position -> keyword codes in their original order, only where the bitset loses it
+        self.keyword_order = {}
+        self.keyword_vocabulary = Vocabulary()
+        self.extend(listings)
+
+    def append(self, car):
+        for name in NUMERIC_FIELDS:
+            value = car.get(name)
+            self.numeric[name].append(MISSING if value is None else value)
+        for name in CATEGORICAL_FIELDS:
+            self.categorical[name].append(self.vocabularies[name].code(car.get(name)))
+        for name in TEXT_FIELDS:
+            self.text[name].append(car.get(name))
+        keywords = car.get("keywords")
+        if keywords is None:
+            self.keyword_bits.append(None)
+        else:
+            codes = [self.keyword_vocabulary.code(kw) for kw in keywords]
+            bits = 0
+            for code in codes:
+                bits |= 1 << (code - 1)
+            if any(a >= b for a, b in zip(codes, codes[1:])):
+                self.keyword_order[len(self.keyword_bits)] = array("I", codes)
+            self.keyword_bits.append(bits)
+
+    def extend(self, listings):
+        for car in listings:
+            self.append(car)
+
+    def __len__(self):
+        return len(self.keyword_bits)
+
+    def keywords_at(self, i):
+        bits = self.keyword_bits[i]
+        if bits is None:
+            return None
+        values = self.keyword_vocabulary.values
+        if i in self.keyword_order:
+            return [values[code] for code in self.keyword_order[i]]
+        keywords = []
+        code = 1
+        while bits:
+            if bits & 1:
+                keywords.append(values[code])
+            bits >>= 1
+            code += 1
+        return keywords
+
+    def listing(self, i):
+        car = {}
+        for name in LISTING_FIELDS:
+            if name in self.numeric:
+                value = self.numeric[name][i]
+                car[name] = None if value == MISSING else value
+            elif name in self.categorical:
+                car[name] = self.vocabularies[name].values[self.categorical[name][i]]
+            elif name == "keywords":
+                car[name] = self.keywords_at(i)
+            else:
+                car[name] = self.text[name][i]
+        return car
+
+    def __getitem__(self, i):
+        if isinstance(i, slice):
+            return [self.listing(j) for j in range(*i.indices(len(self)))]
+        if i < 0:
+            i += len(self)
+        if not 0 <= i < len(self):
+            raise IndexError("pool index out of range")
+        return self.listing(i)
+
+    def __iter__(self):
+        for i in range(len(self)):
+            yield self.listing(i)
+
+    def nbytes(self):
+        """Approximate bytes held by the compact representation, lookup tables included."""
+        seen = set()
+        total = sys.getsizeof(self.keyword_bits) + sum(_deep_size(b, seen) for b in self.keyword_bits)
+        total += _deep_size(self.keyword_vocabulary.values, seen)
+        total += sys.getsizeof(self.keyword_order) + sum(sys.getsizeof(codes) for codes in self.keyword_order.values())
+        for values in self.numeric.values():
+            total += sys.getsizeof(values)
+        for name, codes in self.categorical.items():
+            total += sys.getsizeof(codes) + _deep_size(self.vocabularies[name].values, seen)
+        for values in self.text.values():
+            total += _deep_size(values, seen)
+        return total
+
+    def memory_report(self, listings=None):
+        """
+        Compares the compact pool against the equivalent list of listing dicts.
+        Each listing dict is measured as owning its own strings, as in a pool parsed
+        from scraped pages or a JSON body. Pass the original listings to measure them instead.
+        """
+        count = len(self)
+        source = self if listings is None else listings
+        dict_bytes = sum(_deep_size(car, set()) for car in source)
+        compact_bytes = self.nbytes()
+        return {
+            "listings": count,
+            "dict_bytes": dict_bytes,
+            "compact_bytes": compact_bytes,
+            "dict_bytes_per_listing": round(dict_bytes / count, 1) if count else 0,
+            "compact_bytes_per_listing": round(compact_bytes / count, 1) if count else 0,
+            "saved_bytes_per_listing": round((dict_bytes - compact_bytes) / count, 1) if count else 0,
+        }
+
+
+def _deep_size(obj, seen):
+    """Size of obj and everything it references, counting each object once. Dict keys are shared field names and not counted."""
+    if id(obj) in seen:
+        return 0
+    seen.add(id(obj))
+    size = sys.getsizeof(obj)
+    if isinstance(obj, dict):
+        size += sum(_deep_size(v, seen) for v in obj.values())
+    elif isinstance(obj, (list, tuple)):
+        size += sum(_deep_size(v, seen) for v in obj)
+    return size
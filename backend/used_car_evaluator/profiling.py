@@ -0,0 +1,158 @@
+import cProfile
+import os
+import pstats
+import sys
+import threading
+import time
+from collections import Counter
+from contextlib import contextmanager
+
+from used_car_evaluator.metrics import stage_breakdown
+
+SAMPLE_INTERVAL = 0.005  # seconds between stack samples
+
+
+class StackSampler:
+    """
+    Samples the call stack of every thread at a fixed interval and counts folded stacks,
+    each prefixed with its thread's name.
+    """
+
+    def __init__(self, interval=SAMPLE_INTERVAL):
+        self.interval = interval
+        self.stacks = Counter()
+        self.active = threading.Event()
+        self.stopped = threading.Event()
+        self.thread = threading.Thread(target=self._run, name="stack-sampler", daemon=True)
+        self.thread.start()
+
+    def _run(self):
+        while not self.stopped.is_set():
+            if self.active.is_set():
+                names = {thread.ident: thread.name for thread in threading.enumerate()}
+                for thread_id, frame in sys._current_frames().items():
+                    if thread_id != self.thread.ident:
+                        self.stacks[self._fold(names.get(thread_id, f"thread-{thread_id}"), frame)] += 1
+            time.sleep(self.interval)
+
+    @staticmethod
+    def _fold(thread_name, frame):
+        names = []
+        while frame is not None:
+            code = frame.f_code
+            names.append(f"{code.co_name} ({os.path.basename(code.co_filename)}:{code.co_firstlineno})")
+            frame = frame.f_back
+        return ";".join([thread_name, *reversed(names)])
+
+    def stop(self):
+        self.stopped.set()
+        self.thread.join()
+
+    def write_folded(self, path):
+        """Writes samples in the folded-stack format read by flamegraph.pl and speedscope."""
+        with open(path, "w", encoding="utf-8") as f:
+            for stack, count in self.stacks.most_common():
+                f.write(f"{stack} {count}\n")
+
+
+class Profiler:
+    """
+    Profiles a run, either as a whole or only inside selected stages.
+    Every stage is timed regardless, so the stage breakdown is always available. Stages
+    are timed here rather than with metrics.timer, as code inside them (clean_data, say)
+    may already record a metrics stage of the same name.
+    When enabled, records a cProfile profile and stack samples of every thread. cProfile
+    only sees the thread that enables it, so threads started while profiling is active
+    (the scraper's FetchScheduler workers, say) get a profile of their own, kept until
+    they exit and merged into the calling thread's.
+    """
+
+    def __init__(self, enabled=False, stages=None):
+        self.enabled = enabled
+        self.stages = set(stages) if stages else None
+        self.order = []
+        self.seconds = {}
+        self.profile = None
+        self.thread_profiles = []
+        self.sampler = None
+        if enabled:
+            self.profile = cProfile.Profile()
+            self.sampler = StackSampler()
+            if self.stages is None:
+                self._resume()
+
+    def _resume(self):
+        threading.setprofile(self._profile_thread)
+        self.profile.enable()
+        self.sampler.active.set()
+
+    def _pause(self):
+        self.sampler.active.clear()
+        self.profile.disable()
+        threading.setprofile(None)
+
+    def _profile_thread(self, frame, event, arg):
+        """threading.setprofile hook: swaps itself for a cProfile profile of the new thread."""
+        profile = cProfile.Profile()
+        try:
+            profile.enable()
+        except ValueError:
+            # Python 3.12+ profiles through sys.monitoring, which already covers every thread
+            return
+        self.thread_profiles.append(profile)
+
+    def stats(self):
+        """pstats.Stats of the calling thread merged with the threads profiled alongside it."""
+        stats = pstats.Stats(self.profile)
+        for profile in list(self.thread_profiles):
+            stats.add(profile)
+        return stats
+
+    @contextmanager
+    def stage(self, name):
+        if name not in self.order:
+            self.order.append(name)
+        selected = self.enabled and self.stages is not None and name in self.stages
+        if selected:
+            self._resume()
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.seconds[name] = self.seconds.get(name, 0.0) + time.perf_counter() - start
+            if selected:
+                self._pause()
+
+    def finish(self, out_prefix):
+        """Stops profiling and writes <out_prefix>.prof and <out_prefix>.folded. Returns their paths."""
+        if not self.enabled:
+            return []
+        if self.stages is None:
+            self._pause()
+        self.sampler.stop()
+        directory = os.path.dirname(out_prefix)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        prof_path = f"{out_prefix}.prof"
+        folded_path = f"{out_prefix}.folded"
+        self.stats().dump_stats(prof_path)
+        self.sampler.write_folded(folded_path)
+        return [prof_path, folded_path]
+
+    def top_functions(self, n=20):
+        """The n functions with the most cumulative time, as (name, calls, own seconds, cumulative seconds)."""
+        if not self.enabled:
+            return []
+        stats = self.stats()
+        rows = []
+        for (filename, line, func), (_, calls, tottime, cumtime, _) in stats.stats.items():
+            name = f"{func} ({os.path.basename(filename)}:{line})" if line else func
+            rows.append((name, calls, tottime, cumtime))
+        rows.sort(key=lambda row: row[3], reverse=True)
+        return rows[:n]
+
+    def breakdown(self, extra_stages=()):
+        """(stage, seconds) for the stages run through this profiler, then any nested stages timed with metrics.timer."""
+        timings = stage_breakdown()
+        nested = [(name, timings[name][0]) for name in extra_stages if name not in self.seconds and name in timings]
+        return [(name, self.seconds[name]) for name in self.order] + nested
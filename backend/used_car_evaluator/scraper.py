@@ -1,11 +1,21 @@
-from playwright.sync_api import sync_playwright, TimeoutError as PlaywrightTimeoutError
+from playwright.sync_api import sync_playwright, Error as PlaywrightError, TimeoutError as PlaywrightTimeoutError
+import logging
+import os
 import re
 from urllib.parse import quote_plus
 
-BASE_URL = "https://www.polovniautomobili.com/auto-oglasi/pretraga"
-SITE_BASE = "https://www.polovniautomobili.com"
+from used_car_evaluator.metrics import timer, count_page, count_listings
+from used_car_evaluator.dedup import Deduplicator
+from used_car_evaluator.fetcher import FetchScheduler, FetchLost, TransientFetchError, TRANSIENT_STATUSES, default_is_transient
 
-def build_url(make, model, price_to, page):
+logger = logging.getLogger(__name__)
+
+# The marketplace can be pointed elsewhere (e.g. the local mock server) with MARKETPLACE_BASE_URL
+SITE_BASE = os.environ.get("MARKETPLACE_BASE_URL", "https://www.polovniautomobili.com").rstrip("/")
+SEARCH_PATH = "/auto-oglasi/pretraga"
+BASE_URL = SITE_BASE + SEARCH_PATH
+
+def build_url(make, model, price_to, page, site_base=None):
     params = [
         f"brand={quote_plus(make.lower())}",
         f"model[]={quote_plus(model.lower())}",
@@ -13,7 +23,8 @@ def build_url(make, model, price_to, page):
     if price_to:
         params.append(f"price_to={price_to}")
     params.append(f"page={page}")
-    return f"{BASE_URL}?{'&'.join(params)}"
+    base_url = BASE_URL if site_base is None else site_base.rstrip("/") + SEARCH_PATH
+    return f"{base_url}?{'&'.join(params)}"
 
 
 def extract_engine_info(text):
@@ -165,284 +176,438 @@ def get_total_pages(page):
         if page_numbers:
             return max(page_numbers)
     except Exception as e:
-        print(f"[DEBUG] Could not determine total pages: {e}")
+        logger.debug("Could not determine total pages: %s", e)
     return 1
 
 
-def scrape_listings(make, model, price_to=None, pages=None):
-    all_listings = []
-    with sync_playwright() as p:
-        browser = p.chromium.launch(headless=True)
-        page = browser.new_page()
-        detail_page = browser.new_page()
-        # First, load the first page to determine total pages
-        url = build_url(make, model, price_to, 1)
-        print(f"[DEBUG] Loading {url}")
-        try:
-            page.goto(url, timeout=60000)
+def is_transient_error(exc):
+    """Whether a page load failure is worth retrying: timeouts, throttling, 5xx and network errors."""
+    if default_is_transient(exc) or isinstance(exc, PlaywrightTimeoutError):
+        return True
+    return isinstance(exc, PlaywrightError) and "net::ERR" in str(exc)
+
+
+def check_response(response, url):
+    if response is not None and response.status in TRANSIENT_STATUSES:
+        raise TransientFetchError(f"HTTP {response.status} loading {url}", response.status)
+
+
+def load_results_page(page, url):
+    """Loads a results page and waits for the listings. Raises on timeout or error."""
+    logger.debug("Loading %s", url)
+    try:
+        with timer("results_page_load"):
+            response = page.goto(url, timeout=60000)
+            check_response(response, url)
             page.wait_for_selector("a.ga-title", timeout=15000)
-        except PlaywrightTimeoutError:
-            print(f"[WARN] Timeout loading first page: {url}")
-            browser.close()
-            return []
-        except Exception as e:
-            print(f"[WARN] Error loading first page: {e}")
-            browser.close()
-            return []
-        total_pages = get_total_pages(page) if pages is None else pages
-        print(f"[DEBUG] Detected {total_pages} pages of results.")
-        for i in range(1, total_pages + 1):
-            url = build_url(make, model, price_to, i)
-            print(f"[DEBUG] Loading {url}")
+    except TransientFetchError as e:
+        count_page("results", f"http_{e.status}")
+        raise
+    except PlaywrightTimeoutError:
+        count_page("results", "timeout")
+        raise
+    except Exception:
+        count_page("results", "error")
+        raise
+    count_page("results", "ok")
+
+
+def load_detail_page(detail_page, url):
+    """Loads an ad's detail page. Raises on timeout or error."""
+    try:
+        with timer("detail_page_load"):
+            response = detail_page.goto(url, timeout=60000)
+            check_response(response, url)
+            detail_page.wait_for_selector("body", timeout=15000)
+            
+            # Wait a bit for dynamic content to load
+            detail_page.wait_for_timeout(2000)
+    except TransientFetchError as e:
+        count_page("detail", f"http_{e.status}")
+        raise
+    except PlaywrightTimeoutError:
+        count_page("detail", "timeout")
+        raise
+    except Exception:
+        count_page("detail", "error")
+        raise
+    count_page("detail", "ok")
+
+
+def empty_details():
+    return {
+        "fuel_type": None,
+        "engine_detail": None,
+        "transmission_detail": None,
+        "seller_info": None,
+        "body_type": None,
+        "power": None,
+        "color": None,
+        "doors": None,
+        "seats": None,
+        "keywords": [],
+    }
+
+
+def scrape_detail_page(detail_page, detail_url, scheduler=None):
+    """
+    Visits an ad's detail page and returns the specifications, seller info and keywords found there.
+    With a scheduler, the page load is retried and rate limited by it.
+    The fetch, retries and waits included, is timed as "detail_fetch" and the parsing as "parse_detail".
+    """
+    try:
+        with timer("detail_fetch"):
+            if scheduler is None:
+                load_detail_page(detail_page, detail_url)
+            else:
+                scheduler.call(lambda url: load_detail_page(detail_page, url), detail_url, "detail")
+        with timer("parse_detail"):
+            return parse_detail_page(detail_page)
+    except FetchLost as e:
+        logger.warning("Gave up on detail page: %s", e)
+    except PlaywrightTimeoutError:
+        logger.warning("Timeout loading detail page: %s", detail_url)
+    except Exception as e:
+        logger.debug("Error loading detail page %s: %s", detail_url, e)
+    return empty_details()
+
+
+def parse_detail_page(detail_page):
+    """Reads the specifications, seller info and keywords from a loaded detail page."""
+    details = empty_details()
+
+    # Extract from detail page using more reliable selectors
+    # Look for specification tables or lists
+    spec_selectors = [
+        "dl.specifications dt, dl.specifications dd",
+        "table.specifications td",
+        ".car-details dt, .car-details dd",
+        ".specs dt, .specs dd",
+        "ul.specifications li",
+        ".technical-data dt, .technical-data dd"
+    ]
+    
+    specs_found = False
+    for selector in spec_selectors:
+        try:
+            spec_elements = detail_page.query_selector_all(selector)
+            if spec_elements:
+                specs_found = True
+                # Parse specifications
+                for i in range(0, len(spec_elements) - 1, 2):
+                    if i + 1 < len(spec_elements):
+                        label = spec_elements[i].inner_text().strip().lower()
+                        value = spec_elements[i + 1].inner_text().strip()
+                        
+                        if 'gorivo' in label or 'fuel' in label:
+                            details["fuel_type"] = value
+                        elif 'kubikaža' in label or 'engine' in label or 'motor' in label:
+                            details["engine_detail"] = value
+                        elif 'menjač' in label or 'transmission' in label or 'gearbox' in label:
+                            details["transmission_detail"] = value
+                        elif 'karoserija' in label or 'body' in label or 'type' in label:
+                            details["body_type"] = value
+                        elif 'snaga' in label or 'power' in label or 'kw' in label:
+                            details["power"] = value
+                        elif 'boja' in label or 'color' in label:
+                            details["color"] = value
+                        elif 'vrata' in label or 'doors' in label:
+                            details["doors"] = value
+                        elif 'sedišta' in label or 'seats' in label:
+                            details["seats"] = value
+                break
+        except Exception:
+            continue
+    
+    # If no structured specs found, try alternative methods
+    if not specs_found:
+        # Try XPath selectors as fallback
+        xpath_fields = [
+            ("fuel_type", "Gorivo"),
+            ("engine_detail", "Kubikaža"),
+            ("transmission_detail", "Menjač"),
+            ("body_type", "Karoserija"),
+        ]
+        for field, label in xpath_fields:
             try:
-                page.goto(url, timeout=60000)
-                page.wait_for_selector("a.ga-title", timeout=15000)
-            except PlaywrightTimeoutError:
-                print(f"[WARN] Timeout loading page {i}: {url}")
-                continue
-            except Exception as e:
-                print(f"[WARN] Error loading page {i}: {e}")
-                continue
-            ads = page.query_selector_all("article.classified")
-            print(f"[DEBUG] Page {i}: found {len(ads)} listings")
-            for ad in ads:
-                try:
-                    title_el = ad.query_selector("a.ga-title")
-                    title = title_el.inner_text().strip() if title_el else None
-                    href = title_el.get_attribute("href") if title_el else None
-                    detail_url = SITE_BASE + href if href and href.startswith("/") else href
-                    subtitle_el = ad.query_selector("div.subtitle")
-                    subtitle = subtitle_el.inner_text().strip() if subtitle_el else ""
-                    
-                    # Extract basic info from subtitle
-                    engine = None
-                    transmission = None
-                    if subtitle:
-                        m = re.search(r"\d\.\d+\s?[A-Za-z]+", subtitle)
-                        if m:
-                            engine = m.group(0)
-                        if "automatski" in subtitle.lower():
-                            transmission = "Automatski"
-                        elif "manuelni" in subtitle.lower():
-                            transmission = "Manuelni"
-                    
-                    city_el = ad.query_selector("div.city")
-                    city = city_el.inner_text().strip() if city_el else None
-                    seller_type = None
-                    adv_text = ad.query_selector("div.advertiserText")
-                    if adv_text and "OGLASIVAČ" in adv_text.inner_text():
-                        seller_type = "Dealer"
-                    badge_el = ad.query_selector("div.badge span")
-                    if badge_el and "Domaće tablice" in badge_el.inner_text():
-                        seller_type = "Private"
-                    
-                    year = None
-                    mileage = None
-                    top_divs = ad.query_selector_all("div.top")
-                    for txt in top_divs:
-                        txt = txt.inner_text().strip()
-                        if not year:
-                            m = re.search(r"(19|20)\d{2}", txt)
-                            if m:
-                                year = m.group(0)
-                        if not mileage and "km" in txt:
-                            mileage = txt
-                    
-                    price = None
-                    price_el = ad.query_selector("span")
-                    if price_el and "€" in price_el.inner_text():
-                        price = price_el.inner_text().strip()
-                    else:
-                        for span in ad.query_selector_all("span"):
-                            txt = span.inner_text().strip()
-                            if "€" in txt:
-                                price = txt
-                                break
-                    
-                    # --- Visit detail page for more info ---
-                    fuel_type = None
-                    engine_detail = None
-                    transmission_detail = None
-                    seller_info = None
-                    body_type = None
-                    engine_type = None
-                    engine_size = None
-                    power = None
-                    color = None
-                    doors = None
-                    seats = None
-                    keywords = []
-                    
-                    if detail_url:
-                        try:
-                            detail_page.goto(detail_url, timeout=60000)
-                            detail_page.wait_for_selector("body", timeout=15000)
-                            
-                            # Wait a bit for dynamic content to load
-                            detail_page.wait_for_timeout(2000)
-                            
-                            # Extract from detail page using more reliable selectors
-                            # Look for specification tables or lists
-                            spec_selectors = [
-                                "dl.specifications dt, dl.specifications dd",
-                                "table.specifications td",
-                                ".car-details dt, .car-details dd",
-                                ".specs dt, .specs dd",
-                                "ul.specifications li",
-                                ".technical-data dt, .technical-data dd"
-                            ]
-                            
-                            specs_found = False
-                            for selector in spec_selectors:
-                                try:
-                                    spec_elements = detail_page.query_selector_all(selector)
-                                    if spec_elements:
-                                        specs_found = True
-                                        # Parse specifications
-                                        for i in range(0, len(spec_elements) - 1, 2):
-                                            if i + 1 < len(spec_elements):
-                                                label = spec_elements[i].inner_text().strip().lower()
-                                                value = spec_elements[i + 1].inner_text().strip()
-                                                
-                                                if 'gorivo' in label or 'fuel' in label:
-                                                    fuel_type = value
-                                                elif 'kubikaža' in label or 'engine' in label or 'motor' in label:
-                                                    engine_detail = value
-                                                elif 'menjač' in label or 'transmission' in label or 'gearbox' in label:
-                                                    transmission_detail = value
-                                                elif 'karoserija' in label or 'body' in label or 'type' in label:
-                                                    body_type = value
-                                                elif 'snaga' in label or 'power' in label or 'kw' in label:
-                                                    power = value
-                                                elif 'boja' in label or 'color' in label:
-                                                    color = value
-                                                elif 'vrata' in label or 'doors' in label:
-                                                    doors = value
-                                                elif 'sedišta' in label or 'seats' in label:
-                                                    seats = value
-                                        break
-                                except Exception:
-                                    continue
-                            
-                            # If no structured specs found, try alternative methods
-                            if not specs_found:
-                                # Try XPath selectors as fallback
-                                try:
-                                    fuel_el = detail_page.query_selector("//dt[contains(text(),'Gorivo')]/following-sibling::dd[1]")
-                                    if fuel_el:
-                                        fuel_type = fuel_el.inner_text().strip()
-                                except:
-                                    pass
-                                
-                                try:
-                                    engine_el = detail_page.query_selector("//dt[contains(text(),'Kubikaža')]/following-sibling::dd[1]")
-                                    if engine_el:
-                                        engine_detail = engine_el.inner_text().strip()
-                                except:
-                                    pass
-                                
-                                try:
-                                    trans_el = detail_page.query_selector("//dt[contains(text(),'Menjač')]/following-sibling::dd[1]")
-                                    if trans_el:
-                                        transmission_detail = trans_el.inner_text().strip()
-                                except:
-                                    pass
-                                
-                                try:
-                                    body_el = detail_page.query_selector("//dt[contains(text(),'Karoserija')]/following-sibling::dd[1]")
-                                    if body_el:
-                                        body_type = body_el.inner_text().strip()
-                                except:
-                                    pass
-                            
-                            # Extract seller info
-                            seller_selectors = [
-                                ".seller-info",
-                                ".advertiser-info",
-                                ".contact-info",
-                                "//dt[contains(text(),'Ime prodavca')]/following-sibling::dd[1]"
-                            ]
-                            
-                            for selector in seller_selectors:
-                                try:
-                                    seller_el = detail_page.query_selector(selector)
-                                    if seller_el:
-                                        seller_info = seller_el.inner_text().strip()
-                                        break
-                                except:
-                                    continue
-                            
-                            # Get description text for keywords
-                            desc_selectors = [
-                                ".description",
-                                ".ad-description",
-                                ".car-description",
-                                ".details-text"
-                            ]
-                            
-                            for selector in desc_selectors:
-                                try:
-                                    desc_el = detail_page.query_selector(selector)
-                                    if desc_el:
-                                        description = desc_el.inner_text().strip()
-                                        keywords = extract_keywords(description)
-                                        break
-                                except:
-                                    continue
-                            
-                            # Also extract keywords from the entire page content
-                            page_content = detail_page.content()
-                            page_keywords = extract_keywords(page_content)
-                            keywords.extend(page_keywords)
-                            
-                        except PlaywrightTimeoutError:
-                            print(f"[WARN] Timeout loading detail page: {detail_url}")
-                        except Exception as e:
-                            print(f"[DEBUG] Error loading detail page {detail_url}: {e}")
-                    
-                    # Extract engine info from title and subtitle
-                    title_subtitle_text = f"{title or ''} {subtitle or ''}"
-                    extracted_engine_type, extracted_engine_size = extract_engine_info(title_subtitle_text)
-                    
-                    # Extract transmission from title and subtitle
-                    extracted_transmission = extract_transmission(title_subtitle_text)
-                    
-                    # Extract body type from title
-                    extracted_body_type = extract_body_type(title or "")
-                    
-                    # Extract keywords from title
-                    title_keywords = extract_keywords(title or "")
-                    keywords.extend(title_keywords)
-                    
-                    # Use detail page info if available, otherwise use extracted info
-                    final_engine_type = fuel_type or extracted_engine_type
-                    final_engine_size = engine_detail or extracted_engine_size
-                    final_transmission = transmission_detail or transmission or extracted_transmission
-                    final_body_type = body_type or extracted_body_type
-                    
-                    all_listings.append({
-                        "title": title,
-                        "year": year,
-                        "mileage": mileage,
-                        "price": price,
-                        "engine": engine_detail or engine,
-                        "engine_type": final_engine_type,
-                        "engine_size": final_engine_size,
-                        "transmission": final_transmission,
-                        "body_type": final_body_type,
-                        "power": power,
-                        "color": color,
-                        "doors": doors,
-                        "seats": seats,
-                        "city": city,
-                        "seller_type": seller_type,
-                        "fuel_type": fuel_type,
-                        "seller_info": seller_info,
-                        "keywords": list(set(keywords)),  # Remove duplicates
-                        "url": detail_url
-                    })
-                except Exception as e:
-                    print(f"[DEBUG] Error parsing ad: {e}")
-        browser.close()
-    return all_listings
+                el = detail_page.query_selector(f"//dt[contains(text(),'{label}')]/following-sibling::dd[1]")
+                if el:
+                    details[field] = el.inner_text().strip()
+            except:
+                pass
+    
+    # Extract seller info
+    seller_selectors = [
+        ".seller-info",
+        ".advertiser-info",
+        ".contact-info",
+        "//dt[contains(text(),'Ime prodavca')]/following-sibling::dd[1]"
+    ]
+    
+    for selector in seller_selectors:
+        try:
+            seller_el = detail_page.query_selector(selector)
+            if seller_el:
+                details["seller_info"] = seller_el.inner_text().strip()
+                break
+        except:
+            continue
+    
+    # Get description text for keywords
+    desc_selectors = [
+        ".description",
+        ".ad-description",
+        ".car-description",
+        ".details-text"
+    ]
+    
+    for selector in desc_selectors:
+        try:
+            desc_el = detail_page.query_selector(selector)
+            if desc_el:
+                description = desc_el.inner_text().strip()
+                details["keywords"] = extract_keywords(description)
+                break
+        except:
+            continue
+    
+    # Also extract keywords from the entire page content
+    page_content = detail_page.content()
+    page_keywords = extract_keywords(page_content)
+    details["keywords"].extend(page_keywords)
+    return details
+
 
+def parse_card(ad, site_base=None):
+    """Reads the summary fields shown on a results-page ad card."""
+    site_base = SITE_BASE if site_base is None else site_base.rstrip("/")
+    title_el = ad.query_selector("a.ga-title")
+    title = title_el.inner_text().strip() if title_el else None
+    href = title_el.get_attribute("href") if title_el else None
+    detail_url = site_base + href if href and href.startswith("/") else href
+    subtitle_el = ad.query_selector("div.subtitle")
+    subtitle = subtitle_el.inner_text().strip() if subtitle_el else ""
+    
+    city_el = ad.query_selector("div.city")
+    city = city_el.inner_text().strip() if city_el else None
+    seller_type = None
+    adv_text = ad.query_selector("div.advertiserText")
+    if adv_text and "OGLASIVAČ" in adv_text.inner_text():
+        seller_type = "Dealer"
+    badge_el = ad.query_selector("div.badge span")
+    if badge_el and "Domaće tablice" in badge_el.inner_text():
+        seller_type = "Private"
+    
+    year = None
+    mileage = None
+    top_divs = ad.query_selector_all("div.top")
+    for txt in top_divs:
+        txt = txt.inner_text().strip()
+        if not year:
+            m = re.search(r"(19|20)\d{2}", txt)
+            if m:
+                year = m.group(0)
+        if not mileage and "km" in txt:
+            mileage = txt
+    
+    price = None
+    price_el = ad.query_selector("span")
+    if price_el and "€" in price_el.inner_text():
+        price = price_el.inner_text().strip()
+    else:
+        for span in ad.query_selector_all("span"):
+            txt = span.inner_text().strip()
+            if "€" in txt:
+                price = txt
+                break
+    
+    return {
+        "title": title,
+        "subtitle": subtitle,
+        "url": detail_url,
+        "city": city,
+        "seller_type": seller_type,
+        "year": year,
+        "mileage": mileage,
+        "price": price,
+    }
+
+
+def build_listing(card, details):
+    """Combines an ad card with its detail-page fields into a raw listing dict."""
+    title = card["title"]
+    subtitle = card["subtitle"]
+    
+    # Extract basic info from subtitle
+    engine = None
+    transmission = None
+    if subtitle:
+        m = re.search(r"\d\.\d+\s?[A-Za-z]+", subtitle)
+        if m:
+            engine = m.group(0)
+        if "automatski" in subtitle.lower():
+            transmission = "Automatski"
+        elif "manuelni" in subtitle.lower():
+            transmission = "Manuelni"
+    
+    keywords = list(details["keywords"])
+    
+    # Extract engine info from title and subtitle
+    title_subtitle_text = f"{title or ''} {subtitle or ''}"
+    extracted_engine_type, extracted_engine_size = extract_engine_info(title_subtitle_text)
+    
+    # Extract transmission from title and subtitle
+    extracted_transmission = extract_transmission(title_subtitle_text)
+    
+    # Extract body type from title
+    extracted_body_type = extract_body_type(title or "")
+    
+    # Extract keywords from title
+    title_keywords = extract_keywords(title or "")
+    keywords.extend(title_keywords)
+    
+    # Use detail page info if available, otherwise use extracted info
+    final_engine_type = details["fuel_type"] or extracted_engine_type
+    final_engine_size = details["engine_detail"] or extracted_engine_size
+    final_transmission = details["transmission_detail"] or transmission or extracted_transmission
+    final_body_type = details["body_type"] or extracted_body_type
+    
+    return {
+        "title": title,
+        "year": card["year"],
+        "mileage": card["mileage"],
+        "price": card["price"],
+        "engine": details["engine_detail"] or engine,
+        "engine_type": final_engine_type,
+        "engine_size": final_engine_size,
+        "transmission": final_transmission,
+        "body_type": final_body_type,
+        "power": details["power"],
+        "color": details["color"],
+        "doors": details["doors"],
+        "seats": details["seats"],
+        "city": card["city"],
+        "seller_type": card["seller_type"],
+        "fuel_type": details["fuel_type"],
+        "seller_info": details["seller_info"],
+        "keywords": list(set(keywords)),  # Remove duplicates
+        "url": card["url"]
+    }
+
+
+def parse_ad(ad, detail_page, site_base=None, scheduler=None, dedup=None):
+    """
+    Parses one results-page ad, visiting its detail page, into a raw listing dict.
+    With a Deduplicator, returns None without visiting the detail page if the ad was already seen.
+    """
+    with timer("parse_ad"):
+        card = parse_card(ad, site_base)
+    if dedup is not None and dedup.check(card):
+        logger.debug("Skipping duplicate ad %s", card["url"])
+        return None
+    # --- Visit detail page for more info ---
+    details = scrape_detail_page(detail_page, card["url"], scheduler) if card["url"] else empty_details()
+    return build_listing(card, details)
+
+
+def open_browser():
+    """Starts Playwright and a headless browser with a results page and a detail page tab."""
+    playwright = sync_playwright().start()
+    with timer("browser_launch"):
+        browser = playwright.chromium.launch(headless=True)
+    return {
+        "playwright": playwright,
+        "browser": browser,
+        "page": browser.new_page(),
+        "detail_page": browser.new_page(),
+    }
+
+
+def close_browser(ctx):
+    ctx["browser"].close()
+    ctx["playwright"].stop()
+
+
+def scrape_results_page(ctx, url, site_base=None, scheduler=None, dedup=None):
+    """
+    Scrapes one results page with a browser context from open_browser(), visiting each ad's
+    detail page. Returns (listings, total pages shown in the pagination).
+    Raises FetchLost (with a scheduler) or the load error if the results page can't be loaded.
+    """
+    page = ctx["page"]
+    if scheduler is None:
+        load_results_page(page, url)
+    else:
+        scheduler.call(lambda u: load_results_page(page, u), url, "page")
+    ads = page.query_selector_all("article.classified")
+    logger.debug("%s: found %s listings", url, len(ads))
+    listings = []
+    for ad in ads:
+        try:
+            listing = parse_ad(ad, ctx["detail_page"], site_base, scheduler, dedup)
+            if listing is not None:
+                listings.append(listing)
+        except Exception as e:
+            logger.debug("Error parsing ad: %s", e)
+    return listings, get_total_pages(page)
+
+
+def scrape_listings(make, model, price_to=None, pages=None, base_url=None,
+                    concurrency=1, host_rps=None, max_retries=3, stats=None):
+    """
+    Scrapes results pages for a make/model and visits every ad's detail page.
+    base_url overrides the marketplace site (default SITE_BASE), e.g. to target the mock server.
+
+    Pages are fetched through a FetchScheduler: up to `concurrency` browsers work in
+    parallel, with the number of requests in flight adapted to observed latency and errors.
+    Transient failures are retried up to max_retries times with jittered backoff, and
+    host_rps caps requests per second to the marketplace.
+
+    Ads seen earlier in the scrape, by ad ID or by title/year/mileage/price fingerprint
+    (promoted ads, results shifting between pages, re-posts), are skipped before their
+    detail page is loaded.
+
+    If stats is a dict, it is filled with the scheduler's counters (requests, retries,
+    pages_retried, pages_lost, ...) and the dedup counts (duplicates_by_id, duplicates_by_fingerprint).
+    """
+    scheduler = FetchScheduler(
+        concurrency=concurrency, host_rps=host_rps, max_retries=max_retries, is_transient=is_transient_error
+    )
+    dedup = Deduplicator()
+
+    def scrape_page(ctx, url):
+        return scrape_results_page(ctx, url, base_url, scheduler, dedup)
+
+    all_listings = []
+    scheduler.start(open_browser, close_browser)
+    try:
+        # The first page also tells us how many pages there are
+        url = build_url(make, model, price_to, 1, base_url)
+        first = scheduler.map([url], scrape_page).get(url)
+        if first is None:
+            logger.warning("Could not load first page: %s", url)
+        else:
+            first_listings, detected_pages = first
+            total_pages = detected_pages if pages is None else pages
+            logger.debug("Detected %s pages of results.", total_pages)
+            if total_pages >= 1:
+                all_listings.extend(first_listings)
+            urls = [build_url(make, model, price_to, i, base_url) for i in range(2, total_pages + 1)]
+            results = scheduler.map(urls, scrape_page)
+            for url in urls:
+                if url in results:
+                    all_listings.extend(results[url][0])
+                else:
+                    logger.warning("Lost page after retries: %s", url)
+    finally:
+        scheduler.close()
+
+    run_stats = dict(scheduler.stats(), **dedup.stats())
+    count_listings("duplicate", run_stats["duplicates"])
+    count_page("results", "lost", run_stats["pages_lost"])
+    count_page("detail", "lost", run_stats["details_lost"])
+    if stats is not None:
+        stats.update(run_stats)
+        stats["listings"] = len(all_listings)
+    count_listings("scraped", len(all_listings))
+    return all_listings
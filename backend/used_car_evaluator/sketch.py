@@ -0,0 +1,164 @@
+import bisect
+import math
+import random
+
+from used_car_evaluator.cleaner import parse_int
+from used_car_evaluator.knn import segment_key
+
+DEFAULT_K = 200
+
+PERCENTILES = (10, 25, 50, 75, 90)
+
+
+class KllSketch:
+    """
+    KLL quantile sketch. Keeps a bounded number of samples (about 3k) regardless of
+    how many values are added, answers rank/quantile queries with roughly 1/k error,
+    and can be merged with other sketches.
+    """
+
+    def __init__(self, k=DEFAULT_K, seed=None):
+        self.k = k
+        self.n = 0
+        self.compactors = [[]]
+        self.rng = random.Random(seed)
+        self._sorted = None
+
+    def _capacity(self, level):
+        depth = len(self.compactors) - level - 1
+        return max(2, int(math.ceil(self.k * (2 / 3) ** depth)))
+
+    def _size(self):
+        return sum(len(c) for c in self.compactors)
+
+    def _max_size(self):
+        return sum(self._capacity(level) for level in range(len(self.compactors)))
+
+    def _compress(self):
+        while self._size() >= self._max_size():
+            for level, compactor in enumerate(self.compactors):
+                if len(compactor) >= self._capacity(level):
+                    if level + 1 == len(self.compactors):
+                        self.compactors.append([])
+                    compactor.sort()
+                    # Keep every other item, promoted one level up with double weight
+                    offset = self.rng.randint(0, 1)
+                    self.compactors[level + 1].extend(compactor[offset::2])
+                    self.compactors[level] = []
+                    break
+
+    def update(self, value):
+        self.compactors[0].append(value)
+        self.n += 1
+        self._sorted = None
+        if len(self.compactors[0]) >= self._capacity(0):
+            self._compress()
+
+    def merge(self, other):
+        """Folds other into this sketch in place and returns self."""
+        while len(self.compactors) < len(other.compactors):
+            self.compactors.append([])
+        for level, compactor in enumerate(other.compactors):
+            self.compactors[level].extend(compactor)
+        self.n += other.n
+        self._sorted = None
+        self._compress()
+        return self
+
+    def _weighted(self):
+        if self._sorted is None:
+            items = sorted(
+                (value, 2 ** level)
+                for level, compactor in enumerate(self.compactors)
+                for value in compactor
+            )
+            values = []
+            cumulative = []
+            total = 0
+            for value, weight in items:
+                total += weight
+                values.append(value)
+                cumulative.append(total)
+            self._sorted = (values, cumulative, total)
+        return self._sorted
+
+    def rank(self, value):
+        """Estimated fraction of added values that are <= value."""
+        values, cumulative, total = self._weighted()
+        if not total:
+            return None
+        i = bisect.bisect_right(values, value)
+        return cumulative[i - 1] / total if i else 0.0
+
+    def quantile(self, q):
+        """Estimated value at quantile q (0..1)."""
+        values, cumulative, total = self._weighted()
+        if not total:
+            return None
+        i = bisect.bisect_left(cumulative, q * total)
+        return values[min(i, len(values) - 1)]
+
+
+def segment_of(car):
+    """
+    (make, model, year, fuel) segment a listing's price is recorded under. Year and
+    fuel are normalized as clean_listing does, so raw and cleaned listings share segments.
+    """
+    make_model = segment_key(car.get('title'))
+    fuel = (car.get('engine_type') or car.get('fuel_type') or "").strip().lower()
+    return make_model, parse_int(car.get('year')), fuel or None
+
+
+class SegmentSketches:
+    """Per make/model/year/fuel price sketches, updated one listing at a time."""
+
+    def __init__(self, k=DEFAULT_K):
+        self.k = k
+        self.sketches = {}
+        # (make/model, year) -> fuels seen, so queries without a fuel can merge across them
+        self.fuels = {}
+
+    def add(self, car):
+        if not car.get('price'):
+            return
+        make_model, year, fuel = segment_of(car)
+        if not make_model:
+            return
+        key = (make_model, year, fuel)
+        sketch = self.sketches.get(key)
+        if sketch is None:
+            sketch = self.sketches[key] = KllSketch(self.k)
+            self.fuels.setdefault((make_model, year), set()).add(fuel)
+        sketch.update(car['price'])
+
+    def add_all(self, listings):
+        for car in listings:
+            self.add(car)
+
+    def sketch_for(self, input_car):
+        """Sketch of the input car's segment. Without a fuel on the input car, all fuels for its make/model/year are merged."""
+        make_model, year, fuel = segment_of(input_car)
+        if fuel is not None:
+            return self.sketches.get((make_model, year, fuel))
+        fuels = self.fuels.get((make_model, year))
+        if not fuels:
+            return None
+        merged = KllSketch(self.k)
+        for f in fuels:
+            merged.merge(self.sketches[(make_model, year, f)])
+        return merged
+
+    def percentiles(self, input_car, percentiles=PERCENTILES):
+        """
+        Market price percentiles for the input car's segment and where its price falls among them.
+        Returns None when no prices have been seen for the segment.
+        """
+        sketch = self.sketch_for(input_car)
+        if sketch is None or not sketch.n:
+            return None
+        price = input_car.get('price')
+        return {
+            "segment_size": sketch.n,
+            "percentiles": {f"p{p}": sketch.quantile(p / 100) for p in percentiles},
+            "input_percentile": round(100 * sketch.rank(price), 1) if price else None,
+        }
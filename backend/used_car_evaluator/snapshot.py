@@ -0,0 +1,131 @@
+import os
+import re
+from datetime import datetime, timezone
+from functools import lru_cache
+
+from used_car_evaluator.dedup import normalize_title
+
+# pyarrow takes a good part of a second to import, so it is imported by the functions
+# that read or write snapshots and the CLI can use SNAPSHOT_DIR without loading it
+
+SNAPSHOT_DIR = "snapshots"
+
+# run-<timestamp>.parquet, or run-<timestamp>-<n>.parquet for later runs in the same microsecond
+RUN_FILE_RE = re.compile(r"^run-(\d{8}T\d{12})(?:-(\d+))?\.parquet$")
+
+@lru_cache(maxsize=None)
+def snapshot_schema():
+    """Arrow schema of a snapshot run. Low-cardinality text fields are dictionary-encoded."""
+    import pyarrow as pa
+    categorical = pa.dictionary(pa.int32(), pa.string())
+    return pa.schema([
+        ("title", pa.string()),
+        ("year", pa.int32()),
+        ("mileage", pa.int64()),
+        ("price", pa.int64()),
+        ("engine", pa.string()),
+        ("engine_type", categorical),
+        ("engine_size", pa.string()),
+        ("transmission", categorical),
+        ("body_type", categorical),
+        ("power", pa.string()),
+        ("color", categorical),
+        ("doors", categorical),
+        ("seats", categorical),
+        ("city", categorical),
+        ("seller_type", categorical),
+        ("fuel_type", categorical),
+        ("seller_info", pa.string()),
+        ("keywords", pa.list_(pa.string())),
+        ("url", pa.string()),
+    ])
+
+
+def write_snapshot(cleaned_listings, snapshot_dir=SNAPSHOT_DIR):
+    """
+    Appends one scrape run of cleaned listings to the snapshot directory.
+    Each run is written as its own Parquet file, so earlier runs are never rewritten.
+    Returns the path of the written file, or None if there was nothing to write.
+    """
+    if not cleaned_listings:
+        return None
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+    schema = snapshot_schema()
+    os.makedirs(snapshot_dir, exist_ok=True)
+    scraped_at = datetime.now(timezone.utc)
+    table = pa.Table.from_pylist(
+        [{name: car.get(name) for name in schema.names} for car in cleaned_listings],
+        schema=schema.with_metadata({"scraped_at": scraped_at.isoformat()}),
+    )
+    base = f"run-{scraped_at.strftime('%Y%m%dT%H%M%S%f')}"
+    path = os.path.join(snapshot_dir, f"{base}.parquet")
+    n = 1
+    while os.path.exists(path):
+        path = os.path.join(snapshot_dir, f"{base}-{n}.parquet")
+        n += 1
+    pq.write_table(table, path, compression="zstd")
+    return path
+
+
+def run_order(name):
+    """Sort key putting run files in the order they were written, with the file name as the tiebreaker."""
+    match = RUN_FILE_RE.match(name)
+    if not match:
+        return (name, 0, name)
+    return (match.group(1), int(match.group(2) or 0), name)
+
+
+def snapshot_files(snapshot_dir=SNAPSHOT_DIR):
+    """Returns the snapshot run files in the order they were written."""
+    if not os.path.isdir(snapshot_dir):
+        return []
+    names = [name for name in os.listdir(snapshot_dir) if name.endswith(".parquet")]
+    return [os.path.join(snapshot_dir, name) for name in sorted(names, key=run_order)]
+
+
+def load_snapshot_table(snapshot_dir=SNAPSHOT_DIR, columns=None):
+    """Memory-maps every run in the snapshot directory into a single Arrow table."""
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+    # ParquetFile rather than read_table, which imports pandas to look for pandas metadata
+    tables = [
+        pq.ParquetFile(path, memory_map=True).read(columns=columns)
+        for path in snapshot_files(snapshot_dir)
+    ]
+    if not tables:
+        return snapshot_schema().empty_table()
+    return pa.concat_tables(tables, promote_options="permissive")
+
+
+def filter_title(table, title):
+    """
+    The rows whose title starts with `title` (e.g. "Opel Corsa"), compared as
+    ListingStore.listings_for does. Each distinct title is only checked once.
+    """
+    import pyarrow as pa
+    import pyarrow.compute as pc
+    prefix = normalize_title(title) + " "
+    titles = table.column("title")
+    distinct = pc.unique(titles)
+    matches = bytes(t is not None and (normalize_title(t) + " ").startswith(prefix) for t in distinct.to_pylist())
+    # Built from a buffer rather than with pa.array, which imports pandas (and would
+    # double an offline CLI evaluation's startup time)
+    mask = pc.cast(pa.Array.from_buffers(pa.uint8(), len(matches), [None, pa.py_buffer(matches)]), pa.bool_())
+    return table.filter(pc.is_in(titles, value_set=distinct.filter(mask)))
+
+
+def load_snapshot(snapshot_dir=SNAPSHOT_DIR, title=None, price_to=None):
+    """
+    Loads the snapshot as a listing pool for analyze_listing, optionally only the
+    listings for one make/model title and priced at most price_to. Returns a list of
+    dicts with the same fields and types clean_data produces.
+    """
+    table = load_snapshot_table(snapshot_dir)
+    if title:
+        table = filter_title(table, title)
+    if price_to is not None:
+        import pyarrow.compute as pc
+        # Unpriced listings are dropped, as the site's price filter drops them
+        table = table.filter(pc.less_equal(table.column("price"), price_to))
+    return table.to_pylist()
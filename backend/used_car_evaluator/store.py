@@ -0,0 +1,199 @@
+import json
+import sqlite3
+import threading
+import time
+from contextlib import contextmanager
+
+from used_car_evaluator.dedup import ad_id_from_url, normalize_title
+
+LISTING_STORE = "listings.db"
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS listings (
+    ad_id TEXT PRIMARY KEY,
+    make TEXT NOT NULL,
+    model TEXT NOT NULL,
+    title_key TEXT NOT NULL,
+    price INTEGER,
+    data TEXT NOT NULL,
+    first_seen REAL NOT NULL,
+    last_seen REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS listings_segment ON listings (make, model);
+CREATE INDEX IF NOT EXISTS listings_title ON listings (title_key);
+CREATE TABLE IF NOT EXISTS imports (
+    source TEXT PRIMARY KEY,
+    signature TEXT NOT NULL,
+    position INTEGER NOT NULL,
+    updated REAL NOT NULL
+);
+"""
+
+
+def connect(path, timeout=30.0):
+    """
+    SQLite connection for use from several processes: WAL journal, a busy timeout and
+    autocommit, with multi-statement writes grouped by transaction(). Threads may share
+    it as long as they serialize their use of it.
+    """
+    conn = sqlite3.connect(path, timeout=timeout, isolation_level=None, check_same_thread=False)
+    conn.execute("PRAGMA journal_mode=WAL")
+    conn.execute("PRAGMA synchronous=NORMAL")
+    return conn
+
+
+def listing_row(car, make, model):
+    """A cleaned listing as a (ad_id, make, model, title_key, price, data) store row, or None without an ad ID."""
+    ad_id = ad_id_from_url(car.get("url"))
+    if ad_id is None:
+        return None
+    return (ad_id, make.lower(), model.lower(), normalize_title(car.get("title")),
+            car.get("price"), json.dumps(car, ensure_ascii=False))
+
+
+@contextmanager
+def transaction(conn):
+    """BEGIN IMMEDIATE ... COMMIT: takes the write lock up front, so read-then-write is atomic."""
+    conn.execute("BEGIN IMMEDIATE")
+    try:
+        yield conn
+    except BaseException:
+        conn.execute("ROLLBACK")
+        raise
+    conn.execute("COMMIT")
+
+
+class ListingStore:
+    """
+    Cleaned listings for the whole market, keyed on ad ID, as kept fresh by the crawler.
+    Re-scraping an ad replaces its data and bumps last_seen.
+    """
+
+    def __init__(self, path=LISTING_STORE, clock=time.time):
+        self.path = path
+        self.clock = clock
+        self.conn = connect(path)
+        self.conn.executescript(SCHEMA)
+        self.lock = threading.Lock()
+
+    def upsert(self, cleaned_listings, make, model):
+        """Stores cleaned listings for a make/model. Returns how many were inserted or replaced."""
+        rows = [row for row in (listing_row(car, make, model) for car in cleaned_listings) if row is not None]
+        return sum(self.write(rows))
+
+    def write(self, rows, replace=True, checkpoint=None):
+        """
+        Stores listing_row()s in order. An ad already in the store, or earlier in rows, is
+        replaced, so the last copy wins; with replace=False it is left as it is and the first
+        copy wins. checkpoint=(source, signature, position) is recorded in the same
+        transaction, for resuming an import. Returns (rows inserted, rows replaced).
+        """
+        now = self.clock()
+        conflict = """DO UPDATE SET
+                       make = excluded.make, model = excluded.model, title_key = excluded.title_key,
+                       price = excluded.price, data = excluded.data, last_seen = excluded.last_seen""" if replace else "DO NOTHING"
+        with self.lock, transaction(self.conn):
+            # New ads get rowids past the current largest, while a replaced ad keeps its own
+            last_rowid = self.conn.execute("SELECT COALESCE(MAX(rowid), 0) FROM listings").fetchone()[0]
+            before = self.conn.total_changes
+            self.conn.executemany(
+                f"""INSERT INTO listings (ad_id, make, model, title_key, price, data, first_seen, last_seen)
+                   VALUES (?, ?, ?, ?, ?, ?, ?, ?)
+                   ON CONFLICT (ad_id) {conflict}""",
+                [row + (now, now) for row in rows],
+            )
+            changed = self.conn.total_changes - before
+            inserted = self.conn.execute("SELECT COUNT(*) FROM listings WHERE rowid > ?", (last_rowid,)).fetchone()[0]
+            if checkpoint is not None:
+                self.conn.execute(
+                    "INSERT OR REPLACE INTO imports (source, signature, position, updated) VALUES (?, ?, ?, ?)",
+                    checkpoint + (now,),
+                )
+        return inserted, changed - inserted
+
+    def checkpoint(self, source):
+        """(signature, position) recorded by the last write() for an import source, or None."""
+        with self.lock:
+            return self.conn.execute("SELECT signature, position FROM imports WHERE source = ?", (source,)).fetchone()
+
+    def listings(self, make=None, model=None, max_age=None):
+        """Stored listings, optionally for one make/model and seen within the last max_age seconds."""
+        where, params = [], []
+        if make:
+            where.append("make = ?")
+            params.append(make.lower())
+        if model:
+            where.append("model = ?")
+            params.append(model.lower())
+        if max_age is not None:
+            where.append("last_seen >= ?")
+            params.append(self.clock() - max_age)
+        sql = "SELECT data FROM listings"
+        if where:
+            sql += " WHERE " + " AND ".join(where)
+        return self._query(sql + " ORDER BY ad_id", params)
+
+    def _title_filter(self, input_car, max_age=None, price_to=None):
+        """WHERE clause and params selecting the listings for input_car's title, or None without a title."""
+        prefix = normalize_title(input_car.get("title"))
+        if not prefix:
+            return None
+        # title keys are only [a-z0-9 ], so the prefix needs no LIKE escaping
+        sql = "(title_key = ? OR title_key LIKE ?)"
+        params = [prefix, prefix + " %"]
+        if max_age is not None:
+            sql += " AND last_seen >= ?"
+            params.append(self.clock() - max_age)
+        if price_to is not None:
+            sql += " AND price <= ?"
+            params.append(price_to)
+        return sql, params
+
+    def listings_for(self, input_car, max_age=None, price_to=None):
+        """
+        Stored listings whose title starts with the input car's title (e.g. "Opel Corsa"),
+        optionally only those priced at most price_to.
+        """
+        where = self._title_filter(input_car, max_age, price_to)
+        if where is None:
+            return []
+        return self._query(f"SELECT data FROM listings WHERE {where[0]} ORDER BY ad_id", where[1])
+
+    def version_for(self, input_car, max_age=None, price_to=None):
+        """
+        Cheap version of what listings_for returns: the row count and newest last_seen,
+        both of which change whenever a matching listing is written, pruned or ages out.
+        None when there are no such listings.
+        """
+        where = self._title_filter(input_car, max_age, price_to)
+        if where is None:
+            return None
+        with self.lock:
+            count, newest = self.conn.execute(
+                f"SELECT COUNT(*), MAX(last_seen) FROM listings WHERE {where[0]}", where[1]
+            ).fetchone()
+        return f"store:{count}:{newest!r}" if count else None
+
+    def _query(self, sql, params):
+        with self.lock:
+            rows = self.conn.execute(sql, params).fetchall()
+        return [json.loads(data) for (data,) in rows]
+
+    def prune(self, max_age):
+        """Deletes listings not seen for max_age seconds (sold or withdrawn ads). Returns the count."""
+        with self.lock, transaction(self.conn):
+            return self.conn.execute("DELETE FROM listings WHERE last_seen < ?", (self.clock() - max_age,)).rowcount
+
+    def __len__(self):
+        with self.lock:
+            return self.conn.execute("SELECT COUNT(*) FROM listings").fetchone()[0]
+
+    def segments(self):
+        """[(make, model, listings)] for every stored segment."""
+        with self.lock:
+            return self.conn.execute(
+                "SELECT make, model, COUNT(*) FROM listings GROUP BY make, model ORDER BY make, model"
+            ).fetchall()
+
+    def close(self):
+        self.conn.close()
@@ -0,0 +1,173 @@
+import gzip
+import heapq
+import io
+import itertools
+import json
+import sys
+import zlib
+
+from used_car_evaluator.analyzer import TOP_K, similarity_score, summarize_matches
+from used_car_evaluator.cleaner import clean_listing
+from used_car_evaluator.metrics import timer, count_listings
+
+NDJSON_TYPE = "application/x-ndjson"
+
+# Listings echoed back when nothing matches, as analyze_listing's sample_listings
+SAMPLE_SIZE = 5
+
+
+class StreamAnalysis:
+    """
+    analyze_listing for pools that arrive one listing at a time. Each listing is cleaned
+    and scored as it is added, and only the k best matches are kept, so memory stays
+    constant however large the pool. Results equal analyze_listing's "rules" engine
+    on the same listings.
+    """
+
+    def __init__(self, input_car, k=TOP_K):
+        self.input_car = input_car
+        self.k = k
+        # Min-heap of the k best (score, -price difference, -position, car, match_quality):
+        # the root is the weakest match kept, with later listings losing ties as in rank_candidates
+        self.heap = []
+        self.sample = []
+        self.read = 0
+        self.invalid = 0
+        self.counter = itertools.count()
+
+    def add(self, record):
+        if not isinstance(record, dict):
+            self.invalid += 1
+            return
+        try:
+            car = clean_listing(record)
+        except Exception:
+            self.invalid += 1
+            return
+        score, match_quality = similarity_score(self.input_car, car)
+        self.read += 1
+        if len(self.sample) < SAMPLE_SIZE:
+            self.sample.append(car)
+        if not (score > 0 and car["price"]):
+            return
+        diff = abs((car["price"] or 0) - (self.input_car["price"] or 0))
+        entry = (score, -diff, -next(self.counter), car, match_quality)
+        if len(self.heap) < self.k:
+            heapq.heappush(self.heap, entry)
+        elif entry[:3] > self.heap[0][:3]:
+            heapq.heapreplace(self.heap, entry)
+
+    def add_all(self, records):
+        with timer("score"):
+            for record in records:
+                self.add(record)
+        return self
+
+    def add_lines(self, lines):
+        """Adds the listings on NDJSON lines; lines that aren't valid JSON count as invalid."""
+        return self.add_all(iter_ndjson(lines, on_invalid=self._invalid_line))
+
+    def _invalid_line(self, line):
+        self.invalid += 1
+
+    def top(self):
+        """The kept matches as (score, car, match_quality), best first."""
+        return [(score, car, quality) for score, _, _, car, quality in sorted(self.heap, key=lambda e: e[:3], reverse=True)]
+
+    def result(self):
+        count_listings("scored", self.read)
+        top = self.top()
+        if not top:
+            result = {
+                "error": "No similar cars found (using similarity scoring).",
+                "sample_listings": self.sample,
+            }
+        else:
+            result = summarize_matches(self.input_car, top)
+        result["listings_read"] = self.read
+        result["invalid_records"] = self.invalid
+        return result
+
+
+def check_input_car(input_car):
+    """
+    Raises ValueError unless input_car has what scoring needs: a title, year and mileage
+    (numbers, or null if unknown) and a numeric price. Listings are only checked as they
+    are cleaned, so a bad input car would otherwise fail every listing or the whole stream.
+    """
+    if not isinstance(input_car, dict):
+        raise ValueError("input_car must be an object")
+    if not input_car.get("title") or not isinstance(input_car["title"], str):
+        raise ValueError("input_car needs a title")
+    for field in ("year", "mileage", "price"):
+        value = input_car.get(field)
+        if field not in input_car or (value is None and field == "price"):
+            raise ValueError(f"input_car needs a {field}")
+        if value is not None and (isinstance(value, bool) or not isinstance(value, (int, float))):
+            raise ValueError(f"input_car {field} must be a number, got {value!r}")
+
+
+def read_header(lines):
+    """
+    The first record of an NDJSON analysis stream, {"input_car": {...}, ...}; the listings follow it.
+    Raises ValueError if it's missing, not an object with an input_car, or the input_car fails check_input_car.
+    """
+    for line in lines:
+        if not line.strip():
+            continue
+        try:
+            header = json.loads(line)
+        except ValueError as e:
+            raise ValueError(f"Invalid header line: {e}") from e
+        if not isinstance(header, dict) or not header.get("input_car"):
+            raise ValueError('The first line must be {"input_car": {...}}')
+        check_input_car(header["input_car"])
+        return header
+    raise ValueError("Empty stream")
+
+
+class LineSplitter:
+    """Turns a stream of (optionally gzip-compressed) byte chunks into complete lines."""
+
+    def __init__(self, gzipped=False):
+        self.decompressor = zlib.decompressobj(wbits=31) if gzipped else None
+        self.buffer = b""
+
+    def feed(self, chunk):
+        if self.decompressor is not None:
+            chunk = self.decompressor.decompress(chunk)
+        lines = (self.buffer + chunk).split(b"\n")
+        self.buffer = lines.pop()
+        return lines
+
+    def flush(self):
+        if self.decompressor is not None:
+            self.buffer += self.decompressor.flush()
+        rest, self.buffer = self.buffer, b""
+        return [rest] if rest.strip() else []
+
+
+def iter_ndjson(lines, on_invalid=None):
+    """Parsed records from NDJSON lines (str or bytes). Blank lines are skipped; bad ones go to on_invalid."""
+    for line in lines:
+        if not line.strip():
+            continue
+        try:
+            yield json.loads(line)
+        except ValueError:
+            if on_invalid is not None:
+                on_invalid(line)
+
+
+def open_ndjson(path):
+    """A text stream over an NDJSON file, "-" for stdin; .gz files are decompressed as they are read."""
+    if path == "-":
+        return io.TextIOWrapper(sys.stdin.buffer, encoding="utf-8")
+    if path.endswith(".gz"):
+        return gzip.open(path, "rt", encoding="utf-8")
+    return open(path, encoding="utf-8")
+
+
+def analyze_stream(input_car, records, k=TOP_K):
+    """analyze_listing over an iterable of raw or cleaned listings, in constant memory."""
+    return StreamAnalysis(input_car, k).add_all(records).result()
@@ -0,0 +1,95 @@
+import random
+
+from used_car_evaluator.scraper import extract_keywords
+
+# (make, model, body type, typical engines) for the generated catalogue
+CATALOG = [
+    ("Volkswagen", "Golf", "Hečbek", [("1.6 TDI", "Dizel", 1598, 77), ("2.0 TDI", "Dizel", 1968, 110), ("1.4 TSI", "Benzin", 1395, 92)]),
+    ("Volkswagen", "Passat", "Karavan", [("2.0 TDI", "Dizel", 1968, 103), ("1.9 TDI", "Dizel", 1896, 77)]),
+    ("Opel", "Corsa", "Hečbek", [("1.2", "Benzin", 1229, 59), ("1.3 CDTI", "Dizel", 1248, 55)]),
+    ("Opel", "Astra", "Karavan", [("1.7 CDTI", "Dizel", 1686, 81), ("1.6", "Benzin + Gas (TNG)", 1598, 85)]),
+    ("Audi", "A4", "Limuzina", [("2.0 TDI", "Dizel", 1968, 105), ("1.8 TFSI", "Benzin", 1798, 118)]),
+    ("BMW", "320", "Limuzina", [("320d", "Dizel", 1995, 120), ("320i", "Benzin", 1997, 125)]),
+    ("Škoda", "Octavia", "Karavan", [("1.6 TDI", "Dizel", 1598, 77), ("1.4 TSI", "Benzin", 1395, 110)]),
+    ("Renault", "Clio", "Hečbek", [("1.5 dCi", "Dizel", 1461, 55), ("1.2 16V", "Benzin", 1149, 55)]),
+    ("Fiat", "Punto", "Hečbek", [("1.3 Multijet", "Dizel", 1248, 55), ("1.2", "Benzin", 1242, 48)]),
+    ("Toyota", "Yaris", "Hečbek", [("1.5 Hybrid", "Hibridni pogon", 1497, 74), ("1.0", "Benzin", 998, 51)]),
+    ("Peugeot", "308", "Hečbek", [("1.6 HDi", "Dizel", 1560, 68), ("1.2 PureTech", "Benzin", 1199, 96)]),
+    ("Mercedes Benz", "C 220", "Limuzina", [("2.2 CDI", "Dizel", 2148, 125)]),
+]
+
+CITIES = ["Beograd", "Novi Sad", "Niš", "Kragujevac", "Subotica", "Čačak", "Kraljevo", "Šabac", "Valjevo", "Zrenjanin"]
+COLORS = ["Crna", "Bela", "Siva", "Srebrna", "Plava", "Crvena", "Teget", "Zelena"]
+TRANSMISSIONS = ["Manuelni 5 brzina", "Manuelni 6 brzina", "Automatski / poluautomatski"]
+DOORS = ["4/5 vrata", "2/3 vrata"]
+SEATS = ["5 sedišta", "4 sedišta", "7 sedišta"]
+SELLERS = ["Auto Plac Grand", "Auto Centar Stojanović", "Dragan", "Milica", "Auto Trend", "Nenad"]
+
+DESCRIPTION_PHRASES = [
+    "Vozilo je registrovan do 2025.", "Prvi vlasnik, servisna knjiga.", "Može zamena za jeftinije.",
+    "Klima uređaj ispravan.", "Navigacija, LED svetla, xenon.", "Kožna sedišta, panoramski krov.",
+    "Alu felne 17 inča.", "Garancija 6 meseci.", "Test vožnja moguća uz najavu.",
+    "Ne menja se.", "Auto je u odličnom stanju.", "Redovno održavan.", "Nove gume.",
+    "Oštećen prednji branik.", "Drugi vlasnik, kupljen u Srbiji.", "Bi-xenon, GPS.",
+]
+
+
+def format_thousands(value):
+    """Formats an integer with "." thousands separators, as the site does (e.g. 185.000)."""
+    return f"{value:,}".replace(",", ".")
+
+
+def generate_description(rng):
+    return " ".join(rng.sample(DESCRIPTION_PHRASES, rng.randint(2, 6)))
+
+
+def generate_raw_listing(rng, i=0):
+    """One raw listing shaped like scrape_listings output, plus the ad's description text."""
+    make, model, body, engines = rng.choice(CATALOG)
+    variant, fuel, cc, kw = rng.choice(engines)
+    year = rng.randint(2003, 2022)
+    mileage = max(5000, int(rng.gauss((2024 - year) * 17000, 25000)) // 1000 * 1000)
+    base = 26000 * (0.87 ** (2024 - year)) * (1 + kw / 300)
+    price = max(500, int(base * rng.uniform(0.75, 1.25)) // 50 * 50)
+    description = generate_description(rng)
+    title = f"{make} {model} {variant}"
+    return {
+        "title": title,
+        "year": f"{year}. godište" if rng.random() < 0.9 else None,
+        "mileage": f"{format_thousands(mileage)} km",
+        "price": f"{format_thousands(price)} €" if rng.random() < 0.97 else "Po dogovoru",
+        "engine": f"{cc} cm3",
+        "engine_type": fuel,
+        "engine_size": f"{cc} cm3",
+        "transmission": rng.choice(TRANSMISSIONS),
+        "body_type": body,
+        "power": f"{kw}/{round(kw * 1.36)} (kW/KS)",
+        "color": rng.choice(COLORS),
+        "doors": rng.choice(DOORS),
+        "seats": rng.choice(SEATS),
+        "city": rng.choice(CITIES),
+        "seller_type": rng.choice(["Dealer", "Private", None]),
+        "fuel_type": fuel,
+        "seller_info": f" {rng.choice(SELLERS)} ",
+        "keywords": sorted(set(extract_keywords(description) + extract_keywords(title))),
+        "url": f"https://www.polovniautomobili.com/auto-oglasi/{20000000 + i}/{make.lower().replace(' ', '-')}-{model.lower().replace(' ', '-')}",
+        "description": description,
+    }
+
+
+def generate_raw_listings(n, seed=0):
+    """n reproducible raw listings for a given seed."""
+    rng = random.Random(seed)
+    return [generate_raw_listing(rng, i) for i in range(n)]
+
+
+def generate_input_car(rng):
+    """An input car as the CLI and the frontend submit it."""
+    make, model, _, _ = rng.choice(CATALOG)
+    year = rng.randint(2005, 2020)
+    return {
+        "title": f"{make} {model}",
+        "year": year,
+        "mileage": rng.randint(50, 250) * 1000,
+        "price": rng.randint(20, 200) * 100,
+    }
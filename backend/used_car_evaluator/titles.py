@@ -0,0 +1,112 @@
+"""
+Canonical make and model of listing titles, and a per-pool index of listings by them.
+
+Titles are normalized with dedup.normalize_title ("Škoda Octavia 1.6-TDI" ->
+"skoda octavia 1 6 tdi") and compared as whole tokens, so "a4" no longer matches
+"a40" and "golf" no longer matches "golf plus".
+"""
+import re
+from functools import lru_cache
+
+from used_car_evaluator.dedup import normalize_title
+
+# Points similarity_score gives for a matching make, and for a matching model
+MAKE_POINTS = 5
+MODEL_POINTS = 5
+
+# Makes spelled with more than one word or under another name, as normalized tokens
+MAKE_ALIASES = {
+    ("vw",): "volkswagen",
+    ("mercedes",): "mercedes benz",
+    ("mercedes", "benz"): "mercedes benz",
+    ("alfa", "romeo"): "alfa romeo",
+    ("land", "rover"): "land rover",
+    ("aston", "martin"): "aston martin",
+    ("rolls", "royce"): "rolls royce",
+    ("chevy",): "chevrolet",
+}
+MAX_MAKE_TOKENS = max(len(key) for key in MAKE_ALIASES)
+
+# Two-word models that are a model of their own, not a variant of the first word
+COMPOUND_MODELS = {
+    ("golf", "plus"), ("golf", "sportsvan"), ("passat", "cc"), ("a4", "allroad"), ("a6", "allroad"),
+    ("c", "max"), ("s", "max"), ("b", "max"), ("grand", "scenic"), ("grand", "espace"), ("grand", "vitara"),
+    ("zafira", "tourer"), ("range", "rover"), ("land", "cruiser"), ("santa", "fe"), ("x", "trail"),
+    ("cr", "v"), ("hr", "v"), ("model", "s"), ("model", "3"), ("model", "x"), ("model", "y"),
+}
+
+# Make-specific model codes that carry the engine, reduced to the model they belong to:
+# BMW series with an engine letter ("320d" -> "320") and Mercedes-Benz classes written
+# together with the engine ("c220" -> "c", "ml350" -> "ml"). Other makes are left alone,
+# as there the letter is a model of its own (Fiat "500l", Peugeot "206cc").
+MODEL_CODE_RES = {
+    "bmw": re.compile(r"^(\d{3})[a-z]{1,2}$"),
+    "mercedes benz": re.compile(r"^([a-z]{1,3})\d{2,3}[a-z]?$"),
+}
+
+
+@lru_cache(maxsize=65536)
+def make_model(title):
+    """
+    (make, model) of a title as canonical strings, e.g. "VW Golf Plus 1.6" -> ("volkswagen", "golf plus").
+    Either is None if the title is too short to have one.
+    """
+    tokens = normalize_title(title).split()
+    if not tokens:
+        return None, None
+    for n in range(min(MAX_MAKE_TOKENS, len(tokens)), 0, -1):
+        if tuple(tokens[:n]) in MAKE_ALIASES:
+            make, rest = MAKE_ALIASES[tuple(tokens[:n])], tokens[n:]
+            break
+    else:
+        make, rest = tokens[0], tokens[1:]
+    if not rest:
+        return make, None
+    if len(rest) > 1 and (rest[0], rest[1]) in COMPOUND_MODELS:
+        return make, f"{rest[0]} {rest[1]}"
+    code = MODEL_CODE_RES.get(make)
+    match = code.match(rest[0]) if code else None
+    return make, match.group(1) if match else rest[0]
+
+
+def title_points(input_title, candidate_title):
+    """similarity_score's points for a candidate's make and model matching the input car's."""
+    make, model = make_model(input_title or "")
+    candidate_make, candidate_model = make_model(candidate_title or "")
+    points = 0
+    if make and make == candidate_make:
+        points += MAKE_POINTS
+    if model and model == candidate_model:
+        points += MODEL_POINTS
+    return points
+
+
+class TitleIndex:
+    """
+    The positions of a pool's listings by canonical make and by model. Built once per
+    pool, it turns title scoring into set lookups: points_for gives every listing's title
+    points for an input car without looking at the listings again.
+    """
+
+    def __init__(self, listing_pool):
+        # Pools repeat a few thousand titles at most, so each distinct title is parsed once
+        by_title = {}
+        for i, car in enumerate(listing_pool):
+            by_title.setdefault(car.get('title'), []).append(i)
+        self.size = sum(len(positions) for positions in by_title.values())
+        self.makes = {}
+        self.models = {}
+        for title, positions in by_title.items():
+            make, model = make_model(title or "")
+            if make:
+                self.makes.setdefault(make, set()).update(positions)
+            if model:
+                self.models.setdefault(model, set()).update(positions)
+
+    def points_for(self, input_title):
+        """{position: title points} for the listings whose make or model matches input_title's."""
+        make, model = make_model(input_title or "")
+        points = dict.fromkeys(self.makes.get(make, ()) if make else (), MAKE_POINTS)
+        for i in self.models.get(model, ()) if model else ():
+            points[i] = points.get(i, 0) + MODEL_POINTS
+        return points
@@ -0,0 +1,204 @@
+import heapq
+import json
+import itertools
+
+from used_car_evaluator.analyzer import similarity_score, summarize_matches, TOP_K
+
+# Candidates kept per watched car beyond the top k, so removals rarely force a full rescan
+RESERVE_FACTOR = 4
+
+
+def listing_id(car):
+    return car.get('url') or json.dumps(car, sort_keys=True, default=str)
+
+
+def verdict_of(result):
+    if result is None:
+        return "no_matches"
+    return "cheaper" if result["is_cheaper"] else "more_expensive"
+
+
+class WatchedCar:
+    """A watched input car and the heap of its best-scoring candidates, worst on top."""
+
+    def __init__(self, watch_id, input_car, depth):
+        self.watch_id = watch_id
+        self.input_car = input_car
+        self.depth = depth
+        # Entries are (score, -price_diff, -seq, id) so the heap root is the weakest candidate
+        self.heap = []
+        self.matches = {}
+        # Best entry pushed out of (or refused by) the full heap. Every qualifying pool
+        # listing that beats it is in the heap; the ones below it may not be.
+        self.bound = None
+        self.result = None
+
+    def offer(self, car, seq):
+        if not car.get('price'):
+            return
+        score, match_quality = similarity_score(self.input_car, car)
+        if score <= 0:
+            return
+        diff = abs((car['price'] or 0) - (self.input_car.get('price') or 0))
+        lid = listing_id(car)
+        entry = (score, -diff, -seq, lid)
+        if len(self.heap) < self.depth:
+            heapq.heappush(self.heap, entry)
+        elif entry > self.heap[0]:
+            dropped = heapq.heapreplace(self.heap, entry)
+            del self.matches[dropped[3]]
+            self._drop(dropped)
+        else:
+            self._drop(entry)
+            return
+        self.matches[lid] = (score, car, match_quality)
+
+    def _drop(self, entry):
+        if self.bound is None or entry > self.bound:
+            self.bound = entry
+
+    def discard(self, lids):
+        hit = [lid for lid in lids if lid in self.matches]
+        if not hit:
+            return
+        for lid in hit:
+            del self.matches[lid]
+        self.heap = [entry for entry in self.heap if entry[3] in self.matches]
+        heapq.heapify(self.heap)
+
+    def needs_rescan(self):
+        """True when the heap no longer provably holds the pool's top k: fewer than k of its entries beat the bound."""
+        if self.bound is None:
+            return False
+        return sum(1 for entry in self.heap if entry > self.bound) < TOP_K
+
+    def top(self):
+        best = sorted(self.heap, reverse=True)[:TOP_K]
+        return [self.matches[entry[3]] for entry in best]
+
+    def summarize(self):
+        top = self.top()
+        self.result = summarize_matches(self.input_car, top) if top else None
+        return self.result
+
+
+class Watchlist:
+    """
+    Keeps analysis results for many watched cars up to date as the listing pool changes.
+    A refresh scores only the added listings against each watched car; removed listings
+    are dropped from the heaps they appear in. A watched car is only rescored against
+    the whole pool when removals leave fewer than k candidates that are known to beat
+    every listing its reserve has dropped.
+    Verdict changes are returned as events and passed to on_event if given.
+    """
+
+    def __init__(self, listings=(), on_event=None, depth=TOP_K * RESERVE_FACTOR):
+        self.depth = depth
+        self.on_event = on_event
+        self.pool = {}
+        self.seq = {}
+        self.counter = itertools.count()
+        self.watched = {}
+        self.scored = 0
+        self.rescans = 0
+        for car in listings:
+            self._store(car)
+
+    def _store(self, car):
+        lid = listing_id(car)
+        self.pool[lid] = car
+        self.seq[lid] = next(self.counter)
+        return lid
+
+    def _rescan(self, watched):
+        watched.heap = []
+        watched.matches = {}
+        watched.bound = None
+        for lid, car in self.pool.items():
+            watched.offer(car, self.seq[lid])
+        self.scored += len(self.pool)
+
+    def add(self, watch_id, input_car):
+        watched = WatchedCar(watch_id, input_car, self.depth)
+        self._rescan(watched)
+        watched.summarize()
+        self.watched[watch_id] = watched
+        return watched.result
+
+    def remove(self, watch_id):
+        self.watched.pop(watch_id, None)
+
+    def result(self, watch_id):
+        return self.watched[watch_id].result
+
+    def verdict(self, watch_id):
+        return verdict_of(self.watched[watch_id].result)
+
+    def apply(self, added=(), removed=()):
+        """
+        Applies a pool change: removed is an iterable of listing ids (or listings),
+        added an iterable of listings. A listing re-added with the same id replaces the old one.
+        Returns the verdict-change events.
+        """
+        removed_ids = {lid if isinstance(lid, str) else listing_id(lid) for lid in removed}
+        added = list(added)
+        for car in added:
+            lid = listing_id(car)
+            if lid in self.pool:
+                removed_ids.add(lid)
+        for lid in removed_ids:
+            self.pool.pop(lid, None)
+            self.seq.pop(lid, None)
+        new_ids = [self._store(car) for car in added]
+
+        events = []
+        for watched in self.watched.values():
+            before = verdict_of(watched.result)
+            watched.discard(removed_ids)
+            if watched.needs_rescan():
+                self.rescans += 1
+                self._rescan(watched)
+            else:
+                for lid, car in zip(new_ids, added):
+                    watched.offer(car, self.seq[lid])
+                self.scored += len(added)
+            watched.summarize()
+            after = verdict_of(watched.result)
+            if after != before:
+                event = {
+                    "watch_id": watched.watch_id,
+                    "previous": before,
+                    "verdict": after,
+                    "result": watched.result,
+                }
+                events.append(event)
+                if self.on_event:
+                    self.on_event(event)
+        return events
+
+    def sync(self, listings):
+        """
+        Treats listings as the complete new pool: works out which listings were added,
+        changed or removed since the last sync and applies only that change.
+        """
+        current = {listing_id(car): car for car in listings}
+        removed = [lid for lid in self.pool if lid not in current]
+        added = [car for lid, car in current.items() if self.pool.get(lid) != car]
+        return self.apply(added=added, removed=removed)
+
+    def stats(self):
+        return {
+            "watched": len(self.watched),
+            "pool_size": len(self.pool),
+            "listings_scored": self.scored,
+            "full_rescans": self.rescans,
+        }
+
+    def save(self, path):
+        with open(path, "w", encoding="utf-8") as f:
+            json.dump({wid: w.input_car for wid, w in self.watched.items()}, f, ensure_ascii=False, indent=2)
+
+    def load(self, path):
+        with open(path, encoding="utf-8") as f:
+            for watch_id, input_car in json.load(f).items():
+                self.add(watch_id, input_car)
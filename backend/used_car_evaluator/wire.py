@@ -0,0 +1,186 @@
+import gzip
+import json
+
+try:
+    import brotli
+except ImportError:  # brotli is optional; gzip is always available
+    brotli = None
+
+try:
+    import msgpack
+except ImportError:  # msgpack is optional; JSON is always available
+    msgpack = None
+
+from used_car_evaluator.pool import LISTING_FIELDS
+
+JSON_TYPE = "application/json"
+MSGPACK_TYPES = ("application/msgpack", "application/x-msgpack", "application/vnd.msgpack")
+
+# Bodies smaller than this aren't worth compressing
+MIN_COMPRESS_BYTES = 1024
+
+# Analysis fields kept on every top_similar entry, whatever the projection
+MATCH_FIELDS = ("score", "match_quality")
+
+DEFAULT_PER_PAGE = 100
+MAX_PER_PAGE = 1000
+
+
+def _accepted(header):
+    """{value: q} from an Accept or Accept-Encoding header."""
+    accepted = {}
+    for part in (header or "").split(","):
+        value, _, params = part.strip().partition(";")
+        if not value:
+            continue
+        q = 1.0
+        for param in params.split(";"):
+            name, _, number = param.strip().partition("=")
+            if name == "q":
+                try:
+                    q = float(number)
+                except ValueError:
+                    q = 0.0
+        accepted[value.strip().lower()] = q
+    return accepted
+
+
+def negotiate_format(accept):
+    """"msgpack" if the client prefers MessagePack (and it is installed), otherwise "json"."""
+    if msgpack is None:
+        return "json"
+    accepted = _accepted(accept)
+    msgpack_q = max((accepted.get(t, 0.0) for t in MSGPACK_TYPES), default=0.0)
+    json_q = max(accepted.get(JSON_TYPE, 0.0), accepted.get("*/*", 0.0))
+    return "msgpack" if msgpack_q > 0 and msgpack_q >= json_q else "json"
+
+
+def negotiate_encoding(accept_encoding):
+    """"br", "gzip" or None, preferring brotli at equal quality."""
+    accepted = _accepted(accept_encoding)
+    candidates = ["br", "gzip"] if brotli is not None else ["gzip"]
+    best, best_q = None, 0.0
+    for encoding in candidates:
+        q = accepted.get(encoding, accepted.get("*", 0.0))
+        if q > best_q:
+            best, best_q = encoding, q
+    return best
+
+
+def parse_fields(value):
+    """
+    The listing fields named in a comma-separated fields= parameter, or None for all.
+    Raises ValueError naming any unknown field.
+    """
+    if not value:
+        return None
+    fields = tuple(dict.fromkeys(f.strip() for f in value.split(",") if f.strip()))
+    unknown = [f for f in fields if f not in LISTING_FIELDS]
+    if unknown:
+        raise ValueError(f"Unknown fields: {', '.join(unknown)}. Expected any of: {', '.join(LISTING_FIELDS)}")
+    return fields or None
+
+
+def project(listing, fields, keep=()):
+    """The listing reduced to `fields` (plus any `keep` fields it has); unchanged when fields is None."""
+    if fields is None:
+        return listing
+    projected = {name: listing.get(name) for name in fields}
+    for name in keep:
+        if name in listing:
+            projected[name] = listing[name]
+    return projected
+
+
+def project_analysis(result, fields):
+    """An analyze result with its top_similar listings projected, keeping their scores and match quality."""
+    if fields is None or "top_similar" not in result:
+        return result
+    return dict(result, top_similar=[project(car, fields, MATCH_FIELDS) for car in result["top_similar"]])
+
+
+def parse_page(page, per_page):
+    """
+    Validated (page, per_page) from query parameters, or None when neither is given.
+    Raises ValueError for non-numeric or out-of-range values.
+    """
+    if page in (None, "") and per_page in (None, ""):
+        return None
+    page = int(page) if page not in (None, "") else 1
+    per_page = int(per_page) if per_page not in (None, "") else DEFAULT_PER_PAGE
+    if page < 1 or not 1 <= per_page <= MAX_PER_PAGE:
+        raise ValueError(f"page must be >= 1 and per_page between 1 and {MAX_PER_PAGE}")
+    return page, per_page
+
+
+def request_options(args):
+    """(fields, (page, per_page) or None) from a request's query parameters. Raises ValueError."""
+    return parse_fields(args.get("fields")), parse_page(args.get("page"), args.get("per_page"))
+
+
+# Response headers paginate sets, which browsers only let cross-origin clients read once exposed
+PAGINATION_HEADERS = ("X-Total-Count", "X-Page", "X-Per-Page", "X-Total-Pages")
+
+
+def paginate(items, page, per_page):
+    """(items on the page, pagination headers)."""
+    start = (page - 1) * per_page
+    total = len(items)
+    headers = {
+        "X-Total-Count": str(total),
+        "X-Page": str(page),
+        "X-Per-Page": str(per_page),
+        "X-Total-Pages": str(max(1, -(-total // per_page))),
+    }
+    return items[start:start + per_page], headers
+
+
+def encode(payload, accept=None, accept_encoding=None):
+    """
+    Serializes a response payload for the client's Accept and Accept-Encoding headers.
+    Returns (body bytes, headers) with Content-Type, Content-Encoding and Vary set.
+    """
+    if negotiate_format(accept) == "msgpack":
+        body = msgpack.packb(payload, use_bin_type=True)
+        content_type = MSGPACK_TYPES[0]
+    else:
+        body = json.dumps(payload, separators=(",", ":")).encode("utf-8")
+        content_type = JSON_TYPE
+    headers = {"Content-Type": content_type, "Vary": "Accept, Accept-Encoding"}
+    encoding = negotiate_encoding(accept_encoding) if len(body) >= MIN_COMPRESS_BYTES else None
+    if encoding == "br":
+        body = brotli.compress(body, quality=4)
+    elif encoding == "gzip":
+        body = gzip.compress(body, compresslevel=5)
+    if encoding:
+        headers["Content-Encoding"] = encoding
+    return body, headers
+
+
+def decode(body, content_type=None, content_encoding=None):
+    """
+    Parses a request body sent as JSON or MessagePack, optionally gzip or brotli compressed.
+    Raises ValueError if it can't be decoded.
+    """
+    encoding = (content_encoding or "").strip().lower()
+    if encoding not in ("", "identity", "gzip") and not (encoding == "br" and brotli is not None):
+        raise ValueError(f"Unsupported Content-Encoding: {content_encoding}")
+    try:
+        if encoding == "gzip":
+            body = gzip.decompress(body)
+        elif encoding == "br":
+            body = brotli.decompress(body)
+    except Exception as e:
+        raise ValueError(f"Could not decompress request body: {e}") from e
+    media_type = (content_type or "").split(";")[0].strip().lower()
+    if media_type in MSGPACK_TYPES:
+        if msgpack is None:
+            raise ValueError("MessagePack request bodies need the msgpack package")
+        try:
+            return msgpack.unpackb(body, raw=False)
+        except Exception as e:
+            raise ValueError(f"Invalid MessagePack body: {e}") from e
+    try:
+        return json.loads(body) if body else None
+    except ValueError as e:
+        raise ValueError(f"Invalid JSON body: {e}") from e